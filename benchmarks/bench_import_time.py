@@ -0,0 +1,130 @@
+"""
+bench_import_time.py: Benchmark the startup time of the CLI.
+
+Created by AB Tech on 2026-10-16.
+This file is part of the https://github.com/ABTech/twiki-to-mediawiki-xml
+
+Copyright (C) 2022-present  AB Tech, Carnegie Mellon University
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# Runs --version and each command of the CLI on empty input with
+# `python -X importtime` and reports the time spent importing (the sum of
+# the top level imports) and the wall time of the best run. Exits with 1 if
+# the import time of any of them is over its budget, so it can guard against
+# a command importing more than it needs. The budgets are for a typical
+# developer machine and can be scaled with --budget-scale.
+#
+# Usage: python benchmarks/bench_import_time.py [--budget-scale 2]
+
+from argparse import ArgumentParser
+from os import makedirs
+from os.path import join
+from subprocess import run  # nosec B404
+from sys import executable
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Dict, List, Tuple
+
+CLI_MODULE = "twiki_to_mediawiki_xml.scripts.twiki_to_mediawiki_xml"
+EXPORTER_ARGS = ["-b", "http://localhost/", "-d", "wiki", "-s", "Wiki"]
+
+# Import time budgets in milliseconds, about 1.5 times the typical time.
+# Importing deepdiff, asyncio or pkg_resources at startup again would go
+# over them.
+BUDGETS = {
+    "--version": 100,
+    "twiki_parser": 100,
+    "twiki_to_mediawiki_format": 100,
+    "mediawiki_xml_exporter": 170,
+    "convert": 200,
+    "validate": 90,
+}
+
+
+def get_cases(work_dir: str) -> Dict[str, List[str]]:
+    """Get the CLI arguments of each case, with empty input in work_dir."""
+    web_path = join(work_dir, "web")
+    pages_path = join(work_dir, "pages.json")
+    names_path = join(work_dir, "names.csv")
+    return {
+        "--version": ["--version"],
+        "twiki_parser": ["twiki_parser", web_path, "-q"],
+        "twiki_to_mediawiki_format": ["twiki_to_mediawiki_format",
+                                      pages_path, "-p", names_path, "-q"],
+        "mediawiki_xml_exporter": ["mediawiki_xml_exporter", pages_path,
+                                   "-q", *EXPORTER_ARGS],
+        "convert": ["convert", web_path, "-p", names_path, "-q",
+                    *EXPORTER_ARGS],
+        "validate": ["validate", pages_path, "-q"],
+    }
+
+
+def make_empty_input(work_dir: str) -> None:
+    """Make an empty TWiki web, pages JSON and page names CSV."""
+    makedirs(join(work_dir, "web"), exist_ok=True)
+    with open(join(work_dir, "pages.json"), "w", encoding="utf-8") as file:
+        file.write("[]\n")
+    with open(join(work_dir, "names.csv"), "w", encoding="utf-8"):
+        pass
+
+
+def run_case(args: List[str]) -> Tuple[float, float]:
+    """Run the CLI once, returning its import and wall time in ms."""
+    start = perf_counter()
+    result = run([executable, "-X", "importtime",  # nosec B603
+                  "-m", CLI_MODULE, *args],
+                 capture_output=True, text=True, check=False)
+    wall = (perf_counter() - start) * 1e3
+    if result.returncode != 0:
+        raise RuntimeError(f"{' '.join(args)} failed:\n{result.stderr}")
+    import_us = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit() and not name.startswith("  "):
+            import_us += int(cumulative)
+    return (import_us / 1e3, wall)
+
+
+def main() -> int:
+    """Run the benchmark, returning 1 if a budget is exceeded."""
+    parser = ArgumentParser(description="Benchmark the CLI startup time")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget-scale", type=float, default=1.0,
+                        help="Multiply the import time budgets by this")
+    args = parser.parse_args()
+
+    over_budget = False
+    with TemporaryDirectory() as work_dir:
+        make_empty_input(work_dir)
+        for case, case_args in get_cases(work_dir).items():
+            times = [run_case(case_args) for _ in range(args.repeat)]
+            import_ms = min(import_time for import_time, _ in times)
+            wall_ms = min(wall for _, wall in times)
+            budget = BUDGETS[case] * args.budget_scale
+            status = "ok"
+            if import_ms > budget:
+                status = "OVER BUDGET"
+                over_budget = True
+            print(f"{case:26} imports {import_ms:7.1f} ms "
+                  f"(budget {budget:5.0f} ms)  wall {wall_ms:7.1f} ms  "
+                  f"{status}")
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
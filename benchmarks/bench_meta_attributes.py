@@ -0,0 +1,131 @@
+"""
+bench_meta_attributes.py: Benchmark parsing TWiki META attributes.
+
+Created by AB Tech on 2026-10-16.
+This file is part of the https://github.com/ABTech/twiki-to-mediawiki-xml
+
+Copyright (C) 2022-present  AB Tech, Carnegie Mellon University
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# Compares TWikiParser.parse_twiki_object with the shlex based version it
+# replaced (kept below). The attribute strings are either the METAs of the
+# .txt files of a TWiki data web or generated METAs of topics with a form
+# and many fields.
+#
+# Usage: python benchmarks/bench_meta_attributes.py [--twiki-data-web PATH]
+
+from argparse import ArgumentParser
+from glob import glob
+from os.path import join
+from random import Random
+from re import sub
+from shlex import split
+from timeit import repeat
+from typing import Callable, List
+
+from twiki_to_mediawiki_xml.twiki_parser import TWikiParser
+
+WORDS = ("Lighting", "Sound", "Rigging", "Truck", "Console", "Dimmer",
+         "Channel", "Cable", "Stage", "Power")
+
+
+def legacy_parse_twiki_object(twiki_object_str: str) -> dict:
+    """Parse a TWiki object string with shlex."""
+    twiki_object = {}
+    twiki_object_attr_strs = split(twiki_object_str, posix=True)
+    for twiki_object_attr_str in twiki_object_attr_strs:
+        twiki_object_attr = twiki_object_attr_str.split('=', 1)
+        twiki_object_attr_name = twiki_object_attr[0]
+        twiki_object_attr_val = sub(r'^\"(.*)\"$', r'\1',
+                                    twiki_object_attr[1])
+        twiki_object[twiki_object_attr_name] = twiki_object_attr_val
+    return twiki_object
+
+
+def generate_meta_strs(num_topics: int, seed: int) -> List[str]:
+    """Generate the META attribute strings of topics with forms."""
+    rand = Random(seed)
+    meta_strs = []
+    for topic in range(num_topics):
+        meta_strs.append(
+            f'author="User{rand.randint(0, 99)}" '
+            f'date="{rand.randint(10**9, 2 * 10**9)}" format="1.1" '
+            f'version="1.{rand.randint(1, 200)}"')
+        meta_strs.append(f'name="{rand.choice(WORDS)}Form"')
+        for field in range(rand.randint(5, 40)):
+            value = " ".join(rand.choice(WORDS)
+                             for _ in range(rand.randint(1, 12)))
+            if rand.random() < 0.2:
+                value += "%_N_%%_Q_%quoted%_Q_% 100%_P_%"
+            meta_strs.append(
+                f'name="Field{field}" attributes="" '
+                f'title="{rand.choice(WORDS)} {field}" value="{value}"')
+        meta_strs.append(
+            f'comment="{rand.choice(WORDS)} {topic}" date="1100000000" '
+            f'name="{rand.choice(WORDS)}.jpg" path="{rand.choice(WORDS)}.jpg" '
+            f'size="{rand.randint(1, 10**6)}" user="User1" version="1"')
+    return meta_strs
+
+
+def load_meta_strs(twiki_data_web_path: str) -> List[str]:
+    """Read the META attribute strings of a TWiki data web."""
+    meta_strs = []
+    for path in sorted(glob(join(twiki_data_web_path, "*.txt"))):
+        with open(path, "r", encoding="cp1252") as file_txt:
+            topic_meta_strs = TWikiParser.find_twiki_meta_strs(
+                file_txt.read())
+        for vals in topic_meta_strs.values():
+            meta_strs.extend(vals)
+    return meta_strs
+
+
+def bench(func: Callable[[str], dict], meta_strs: List[str], number: int,
+          repeats: int) -> float:
+    """Return the best time per attribute string of func in microseconds."""
+    best = min(repeat(lambda: [func(meta_str) for meta_str in meta_strs],
+                      number=number, repeat=repeats))
+    return best / number / len(meta_strs) * 1e6
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = ArgumentParser(description="Benchmark parse_twiki_object")
+    parser.add_argument("--twiki-data-web", default=None,
+                        help="Use the METAs of a TWiki data web")
+    parser.add_argument("--topics", type=int, default=200,
+                        help="Number of generated topics")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--number", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.twiki_data_web is not None:
+        meta_strs = load_meta_strs(args.twiki_data_web)
+    else:
+        meta_strs = generate_meta_strs(args.topics, args.seed)
+    print(f"METAs: {len(meta_strs)}")
+
+    legacy = bench(legacy_parse_twiki_object, meta_strs, args.number,
+                   args.repeat)
+    print(f"shlex parse_twiki_object: {legacy:8.2f} us/META")
+    tokenizer = bench(TWikiParser.parse_twiki_object, meta_strs, args.number,
+                      args.repeat)
+    print(f"parse_twiki_object:       {tokenizer:8.2f} us/META "
+          f"({legacy / tokenizer:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
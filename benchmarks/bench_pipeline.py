@@ -0,0 +1,145 @@
+"""
+bench_pipeline.py: Benchmark each stage of a conversion at several sizes.
+
+Created by AB Tech on 2026-10-16.
+This file is part of the https://github.com/ABTech/twiki-to-mediawiki-xml
+
+Copyright (C) 2022-present  AB Tech, Carnegie Mellon University
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# Generates a synthetic TWiki web (see generate_twiki_web.py) of each size
+# and times TWikiParser.run, TWikiToMediaWikiFormat.run,
+# MediaWikiXMLExporter.run and get_xml_str, and text_formatting over the
+# .txt texts. Each stage is reported in ms per topic, which stays about
+# the same across sizes unless a stage scales worse than linearly. Webs are
+# written to a temporary directory unless --web-dir is given, where they are
+# kept and reused by later runs with the same settings.
+#
+# Usage: python benchmarks/bench_pipeline.py [--topics 1000 10000 100000]
+
+from argparse import ArgumentParser, Namespace
+from datetime import datetime
+from glob import glob
+from os.path import exists, join, relpath
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Callable, Dict, List, Tuple
+
+from generate_twiki_web import add_web_arguments, generate_web
+
+from twiki_to_mediawiki_xml.mediawiki_xml_exporter import MediaWikiXMLExporter
+from twiki_to_mediawiki_xml.twiki_parser import TWikiParser
+from twiki_to_mediawiki_xml.twiki_to_mediawiki_format import \
+    TWikiToMediaWikiFormat
+from twiki_to_mediawiki_xml.twiki_to_mediawiki_format.replace_rules import \
+    text_formatting
+
+STAGES = ("TWikiParser.run", "TWikiToMediaWikiFormat.run",
+          "MediaWikiXMLExporter.run", "get_xml_str", "text_formatting")
+MIGRATION_TIMESTAMP = datetime(2026, 1, 1)
+
+
+def timed(func: Callable[[], object]) -> Tuple[object, float]:
+    """Call func, returning its result and how long it took in seconds."""
+    start = perf_counter()
+    result = func()
+    return (result, perf_counter() - start)
+
+
+def bench_web(web_path: str, names_path: str) -> Dict[str, float]:
+    """Run each stage over a web once, returning their times in seconds."""
+    times = {}
+    # The parser finds topics in a path relative to the current directory
+    parser = TWikiParser(relpath(web_path), None)
+    _, times["TWikiParser.run"] = timed(parser.run)
+
+    # Format and export the parsed pages in-process, like convert
+    twiki_texts = [page["twiki_txt"] for page in parser.get_pages()]
+    formatter = TWikiToMediaWikiFormat(None, names_path,
+                                       twiki_pages=parser.get_pages())
+    _, times["TWikiToMediaWikiFormat.run"] = timed(formatter.run)
+
+    exporter = MediaWikiXMLExporter(
+        None, "Bench", "bench", "http://localhost/wiki/Main_Page",
+        migration_timestamp=MIGRATION_TIMESTAMP,
+        mediawiki_pages=formatter.get_mediawiki_pages())
+    _, times["MediaWikiXMLExporter.run"] = timed(exporter.run)
+    _, times["get_xml_str"] = timed(exporter.get_xml_str)
+
+    _, times["text_formatting"] = timed(
+        lambda: [text_formatting(text) for text in twiki_texts])
+    return times
+
+
+def get_web_dir(base_dir: str, topics: int, args: Namespace) -> str:
+    """Get the directory of a web generated with these settings."""
+    return join(base_dir, f"web-{topics}-{args.revisions}-{args.text_size}-"
+                          f"{args.meta_density}-{args.parent_depth}-"
+                          f"{args.moved_frequency}-{args.seed}")
+
+
+def prepare_web(web_dir: str, topics: int, args: Namespace) -> None:
+    """Generate a web in web_dir unless it was already generated."""
+    web_path = join(web_dir, "web")
+    names_path = join(web_dir, "names.csv")
+    if exists(names_path) and len(glob(join(web_path, "*.txt"))) == topics:
+        return
+    start = perf_counter()
+    generate_web(web_path, names_path, topics, args.revisions,
+                 args.text_size, args.meta_density, args.parent_depth,
+                 args.moved_frequency, args.seed)
+    print(f"Generated {topics} topics in {perf_counter() - start:.1f} s")
+
+
+def run_sizes(base_dir: str, sizes: List[int], args: Namespace) -> None:
+    """Generate and benchmark a web of each size, printing the results."""
+    print(f"{'topics':>8}  {'stage':28} {'total s':>9} {'ms/topic':>9}")
+    for topics in sizes:
+        web_dir = get_web_dir(base_dir, topics, args)
+        prepare_web(web_dir, topics, args)
+        runs = [bench_web(join(web_dir, "web"), join(web_dir, "names.csv"))
+                for _ in range(args.repeat)]
+        best = {stage: min(times[stage] for times in runs)
+                for stage in STAGES}
+        for stage in STAGES:
+            print(f"{topics:8d}  {stage:28} {best[stage]:9.2f} "
+                  f"{best[stage] / topics * 1e3:9.3f}")
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = ArgumentParser(description="Benchmark each stage of a "
+                                        "conversion at several sizes")
+    parser.add_argument("--topics", type=int, nargs="+",
+                        default=[1000, 10000],
+                        help="Sizes of the webs to benchmark (100000 takes "
+                             "a while and a few GB of memory)")
+    parser.add_argument("--web-dir", default=None,
+                        help="Keep generated webs in this directory and "
+                             "reuse them")
+    parser.add_argument("--repeat", type=int, default=1)
+    add_web_arguments(parser)
+    args = parser.parse_args()
+
+    if args.web_dir is not None:
+        run_sizes(args.web_dir, args.topics, args)
+        return
+    with TemporaryDirectory() as base_dir:
+        run_sizes(base_dir, args.topics, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+bench_revision_sort.py: Benchmark sorting RCS revisions.
+
+Created by AB Tech on 2026-10-16.
+This file is part of the https://github.com/ABTech/twiki-to-mediawiki-xml
+
+Copyright (C) 2022-present  AB Tech, Carnegie Mellon University
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# Compares sorting the deltas of a large topic by get_rcs_revision_key with
+# pkg_resources.parse_version, which it replaced, and the time it takes to
+# import pkg_resources. The parse_version part is skipped if setuptools is
+# not installed.
+#
+# Usage: python benchmarks/bench_revision_sort.py [--revisions N]
+
+from argparse import ArgumentParser
+from random import Random
+from subprocess import run  # nosec B404
+from sys import executable
+from timeit import repeat
+from typing import Callable, List
+
+from twiki_to_mediawiki_xml.rcs import get_rcs_revision_key
+
+
+def generate_deltas(num_revisions: int, seed: int) -> List[dict]:
+    """Generate the deltas of a topic in a random order."""
+    deltas = [{"revision": f"1.{number}"}
+              for number in range(1, num_revisions + 1)]
+    Random(seed).shuffle(deltas)
+    return deltas
+
+
+def bench(key: Callable[[str], object], deltas: List[dict], number: int,
+          repeats: int) -> float:
+    """Return the best time to sort the deltas in milliseconds."""
+    best = min(repeat(
+        lambda: sorted(deltas, key=lambda rev: key(rev["revision"])),
+        number=number, repeat=repeats))
+    return best / number * 1e3
+
+
+def bench_import(module: str, repeats: int) -> float:
+    """Return the best time to import a module in a new process in ms."""
+    best = None
+    for _ in range(repeats):
+        result = run([executable, "-X", "importtime", "-c",  # nosec B603
+                      f"import {module}"],
+                     capture_output=True, text=True, check=True)
+        total = int(result.stderr.strip().splitlines()[-1].split("|")[1])
+        best = total if best is None else min(best, total)
+    return best / 1e3
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = ArgumentParser(description="Benchmark sorting RCS revisions")
+    parser.add_argument("--revisions", type=int, default=5000,
+                        help="Number of revisions of the topic")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--number", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    deltas = generate_deltas(args.revisions, args.seed)
+    print(f"Revisions: {len(deltas)}")
+    key = bench(get_rcs_revision_key, deltas, args.number, args.repeat)
+    try:
+        # pylint: disable=import-outside-toplevel
+        from pkg_resources import parse_version
+    except ImportError:
+        print(f"get_rcs_revision_key: {key:8.2f} ms/sort")
+        print("pkg_resources is not installed, skipping parse_version")
+        return
+    legacy = bench(parse_version, deltas, args.number, args.repeat)
+    print(f"parse_version:        {legacy:8.2f} ms/sort")
+    print(f"get_rcs_revision_key: {key:8.2f} ms/sort "
+          f"({legacy / key:.1f}x)")
+    print(f"import pkg_resources: "
+          f"{bench_import('pkg_resources', args.repeat):8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+bench_text_formatting.py: Benchmark TWiki to Wikitext text formatting.
+
+Created by AB Tech on 2026-10-16.
+This file is part of the https://github.com/ABTech/twiki-to-mediawiki-xml
+
+Copyright (C) 2022-present  AB Tech, Carnegie Mellon University
+Copyright (C) 2011-2016     Ryan Castillo
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# Compares the throughput of replace_rules.text_formatting with the
+# sequential uncompiled re.sub rules it replaced (kept below). The corpus is
+# either the .txt files of a TWiki data web or generated pages with the
+# markup found in typical TWiki topics.
+#
+# Usage: python benchmarks/bench_text_formatting.py [--twiki-data-web PATH]
+
+from argparse import ArgumentParser
+from glob import glob
+from os.path import join
+from random import Random
+from re import sub
+from timeit import repeat
+from typing import Callable, List
+
+from twiki_to_mediawiki_xml.twiki_to_mediawiki_format.replace_rules import \
+    text_formatting
+
+LINE_TEMPLATES = (
+    "---+ {Word} {word} {word}",
+    "---++ {Word} {word}",
+    "---+++ {Word} {word} {word} {word}",
+    "   * {Word} {word} *{word} {word}* {word} {WikiWord}.",
+    "      * {word} _{word}_ {word} {word} =code_{word}= {word}.",
+    "         * {word} !{WikiWord} {word} <nop>{WikiWord} {word}.",
+    "\t* {Word} {word} __{word} {word}__ {word}.",
+    "   1. {Word} {word} {word} {word}.",
+    "      1. {word} ==bold_{word}== {word}.",
+    "   $ {Word}: {word} {word} {word}.",
+    "#{WikiWord}",
+    "%$x^{num}$% {word} {word} <img src=\"Media:{word}.png\" />",
+    "<verbatim>",
+    "sudo {word} --{word} /etc/{word}.conf",
+    "</verbatim>",
+    "| *{Word}* | {word} | {num} | {WikiWord} |",
+    "| {word} | {word} {word} | {num} | [[{WikiWord}][{word}]] |",
+    "{Word} {word} {word} {WikiWord} {word} {word} {word} ({word}) {word}, "
+    "{word} {word} {word}: {word} {word} {word} {word} {word} {num}.",
+    "{Word} {word} {word} {word} {word} *{word}* {word} {word} {word}; "
+    "{word} {word} {word} {word} {word} {word} {word} {word} {word}.",
+    "",
+)
+
+WORDS = ("the", "light", "board", "cable", "truck", "show", "stage",
+         "power", "sound", "rigging", "console", "channel", "dimmer", "gel",
+         "focus", "strike", "load", "crew", "house", "patch")
+
+
+def generate_page(rand: Random, num_lines: int) -> str:
+    """Generate the text of a page with typical TWiki markup."""
+    def word() -> str:
+        return rand.choice(WORDS)
+
+    lines = []
+    for _ in range(num_lines):
+        lines.append(rand.choice(LINE_TEMPLATES).format(
+            word=word(), Word=word().capitalize(),
+            WikiWord=word().capitalize() + word().capitalize(),
+            num=rand.randint(0, 999)))
+    return "\n".join(lines) + "\n"
+
+
+def generate_corpus(num_pages: int, seed: int) -> List[str]:
+    """Generate the texts of pages of varying length."""
+    rand = Random(seed)
+    return [generate_page(rand, rand.randint(10, 300))
+            for _ in range(num_pages)]
+
+
+def load_corpus(twiki_data_web_path: str) -> List[str]:
+    """Read the texts of the topics of a TWiki data web."""
+    corpus = []
+    for path in sorted(glob(join(twiki_data_web_path, "*.txt"))):
+        with open(path, "r", encoding="cp1252") as file_txt:
+            corpus.append(file_txt.read())
+    return corpus
+
+
+def legacy_text_formatting(to_convert: str) -> str:
+    """Convert text with the sequential rules replaced by the rule engine."""
+    # pylint: disable=line-too-long
+
+    out = to_convert
+
+    # LatexModePlugin -> Extension:Math
+    out = sub(r'%\$(.*?)\$%', r"<math>$1<\/math>", out)
+
+    # DirectedGraphPlugin -> Extension:GraphViz
+    out = sub(r'<(\/?)dot>', r"<$1graphviz>", out)
+
+    # <verbatim>
+    out = sub(r'<(\/?)verbatim>', r"<$1pre>", out)
+
+    # Anchors
+    out = sub(r'^\s*#(\S+)\s*$', r'<div id="<nop>$1"><\/div>', out)  # replace anchors with empty div's  # noqa: E501
+
+    # WikiWords
+    out = sub(r'<nop>([A-Z]{1}\w+?[A-Z]{1})', r"!$1", out)  # change <nop> to ! in front of Twiki words.  # noqa: E501
+    out = sub(r'!([A-Z]{1}\w+?[A-Z]{1})', r"$1", out)  # remove ! in front of Twiki words.  # noqa: E501
+    out = sub(r'<nop>', r"", out)  # remove <nop>
+
+    # Images (attachments only) and links wrapped around images
+    out = sub(r'<img .*?src="Media:(.+?)".*?\/>', r"[[File:$1]]", out)  # inline images  # noqa: E501
+    out = sub(r'\[\[\s*(.+?)\s*\|\s*\[\[File:(.*?)\]\]\s*\]\]', r"[[File:$2|link=$1]]", out)  # external links around images  # noqa: E501
+    out = sub(r'\[\s*(.+?)\s+\[\[File:(.*?)\]\]\s*\]', r"[[File:$2|link=$1]]", out)  # internal links around images  # noqa: E501
+
+    # Formatting
+    out = sub(r'(^|[\s\(])\*(\S+?|\S[^\n]*?\S)\*($|(?=[\s\)\.\,\:\;\!\?]))', r"\1'''\2'''", out)  # bold  # noqa: E501
+    out = sub(r'(^|[\s\(])\_\_(\S+?|\S[^\n]*?\S)\_\_($|(?=[\s\)\.\,\:\;\!\?]))', r"\1'''''\2'''''", out)  # italic bold  # noqa: E501
+    out = sub(r'(^|[\s\(])\_(\S+?|\S[^\n]*?\S)\_($|(?=[\s\)\.\,\:\;\!\?]))', r"\1''\2''", out)  # italic  # noqa: E501
+    out = sub(r'/(^|[\s\(])==(\S+?|\S[^\n]*?\S)==($|(?=[\s\)\.\,\:\;\!\?]))', r"1'''<tt>\2<\/tt>'''", out)  # monospaced bold  # noqa: E501
+    out = sub(r'/(^|[\s\(])=(\S+?|\S[^\n]*?\S)=($|(?=[\s\)\.\,\:\;\!\?]))', r"\1<tt>\2<\/tt>", out)  # monospaced  # noqa: E501
+    out = sub(r'/(^|[\n\r])---\+\+\+\+\+\+([^\n\r]*)', r"\1======\2 ======", out)  # H6  # noqa: E501
+    out = sub(r'/(^|[\n\r])---\+\+\+\+\+([^\n\r]*)', r"\1=====\2 =====", out)  # H5  # noqa: E501
+    out = sub(r'/(^|[\n\r])---\+\+\+\+([^\n\r]*)', r"\1====\2 ====", out)  # H4
+    out = sub(r'/(^|[\n\r])---\+\+\+([^\n\r]*)', r"\1===\2 ===", out)  # H3
+    out = sub(r'/(^|[\n\r])---\+\+([^\n\r]*)', r"\1==\2 ==", out)  # H2
+    out = sub(r'/(^|[\n\r])---\+([^\n\r]*)', r"\1=\2 =", out)  # H1
+
+    # Bullets
+    out = sub(r'(^|[\n\r])[ ]{3}\* ', r"$1\* ", out)  # level 1 bullet
+    out = sub(r'(^|[\n\r])[\t]{1}\* ', r"$1\* ", out)  # level 1 bullet: Handle single tabs (from twiki .txt files)  # noqa: E501
+    out = sub(r'(^|[\n\r])[ ]{6}\* ', r"$1\*\* ", out)  # level 2 bullet
+    out = sub(r'(^|[\n\r])[\t]{2}\* ', r"$1\*\* ", out)  # level 1 bullet: Handle double tabs  # noqa: E501
+    out = sub(r'(^|[\n\r])[ ]{9}\* ', r"$1\*\*\* ", out)  # level 3 bullet
+    out = sub(r'(^|[\n\r])[\t]{3}\* ', r"$1\*\*\* ", out)  # level 3 bullet: Handle tabbed version  # noqa: E501
+    out = sub(r'(^|[\n\r])[ ]{12}\* ', r"$1\*\*\*\* ", out)  # level 4 bullet
+    out = sub(r'(^|[\n\r])[ ]{15}\* ', r"$1\*\*\*\*\* ", out)  # level 5 bullet
+    out = sub(r'(^|[\n\r])[ ]{18}\* ', r"$1\*\*\*\*\*\* ", out)  # level 6 bullet  # noqa: E501
+    out = sub(r'(^|[\n\r])[ ]{21}\* ', r"$1\*\*\*\*\*\*\* ", out)  # level 7 bullet  # noqa: E501
+    out = sub(r'(^|[\n\r])[ ]{24}\* ', r"$1\*\*\*\*\*\*\*\* ", out)  # level 8 bullet  # noqa: E501
+    out = sub(r'(^|[\n\r])[ ]{27}\* ', r"$1\*\*\*\*\*\*\*\*\* ", out)  # level 9 bullet  # noqa: E501
+    out = sub(r'(^|[\n\r])[ ]{30}\* ', r"$1\*\*\*\*\*\*\*\*\*\* ", out)  # level 10 bullet  # noqa: E501
+
+    # Numbering
+    out = sub(r'(^|[\n\r])[ ]{3}[0-9]\.? ', r"$1\# ", out)  # level 1 bullet
+    out = sub(r'(^|[\n\r])[\t]{1}[0-9]\.? ', r"$1\# ", out)  # level 1 bullet: handle 1 tab  # noqa: E501
+    out = sub(r'(^|[\n\r])[ ]{6}[0-9]\.? ', r"$1\#\# ", out)  # level 2 bullet
+    out = sub(r'(^|[\n\r])[\t]{2}[0-9]\.? ', r"$1\#\# ", out)  # level 2 bullet: handle 2 tabs  # noqa: E501
+    out = sub(r'(^|[\n\r])[ ]{9}[0-9]\.? ', r"$1\#\#\# ", out)  # level 3 bullet  # noqa: E501
+    out = sub(r'(^|[\n\r])[\t]{3}[0-9]\.? ', r"$1\#\#\# ", out)  # level 3 bullet: handle 3 tabs  # noqa: E501
+    out = sub(r'(^|[\n\r])[ ]{12}[0-9]\.? ', r"$1\#\#\#\# ", out)  # level 4 bullet  # noqa: E501
+    out = sub(r'(^|[\n\r])[ ]{15}[0-9]\.? ', r"$1\#\#\#\#\# ", out)  # level 5 bullet  # noqa: E501
+    out = sub(r'(^|[\n\r])[ ]{18}[0-9]\.? ', r"$1\#\#\#\#\#\# ", out)  # level 6 bullet  # noqa: E501
+    out = sub(r'(^|[\n\r])[ ]{21}[0-9]\.? ', r"$1\#\#\#\#\#\#\# ", out)  # level 7 bullet  # noqa: E501
+    out = sub(r'(^|[\n\r])[ ]{24}[0-9]\.? ', r"$1\#\#\#\#\#\#\#\# ", out)  # level 8 bullet  # noqa: E501
+    out = sub(r'(^|[\n\r])[ ]{27}[0-9]\.? ', r"$1\#\#\#\#\#\#\#\#\# ", out)  # level 9 bullet  # noqa: E501
+    out = sub(r'(^|[\n\r])[ ]{30}[0-9]\.? ', r"$1\#\#\#\#\#\#\#\#\#\# ", out)  # level 10 bullet  # noqa: E501
+
+    # Definitions
+    # There must be a better MW convention
+    out = sub(r'(^|[\n\r])[ ]{3}\$ ([^\:]*)', r"$1\; $2 ", out)  # $ definition: term  # noqa: E501
+
+    return out
+
+
+def bench(func: Callable[[str], str], corpus: List[str], size: int,
+          number: int, repeats: int) -> float:
+    """Return the best throughput of func over the corpus in MB/s."""
+    best = min(repeat(lambda: [func(text) for text in corpus],
+                      number=number, repeat=repeats))
+    return size * number / best / 1e6
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = ArgumentParser(description="Benchmark text_formatting")
+    parser.add_argument("--twiki-data-web", default=None,
+                        help="Use the .txt files of a TWiki data web")
+    parser.add_argument("--pages", type=int, default=200,
+                        help="Number of generated pages")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--number", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.twiki_data_web is not None:
+        corpus = load_corpus(args.twiki_data_web)
+    else:
+        corpus = generate_corpus(args.pages, args.seed)
+    size = sum(len(text.encode("utf-8")) for text in corpus)
+    print(f"corpus: {len(corpus)} pages, {size / 1e6:.2f} MB")
+
+    legacy = bench(legacy_text_formatting, corpus, size, args.number,
+                   args.repeat)
+    print(f"legacy text_formatting: {legacy:8.2f} MB/s")
+    engine = bench(text_formatting, corpus, size, args.number, args.repeat)
+    print(f"text_formatting:        {engine:8.2f} MB/s "
+          f"({engine / legacy:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
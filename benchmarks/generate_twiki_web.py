@@ -0,0 +1,236 @@
+"""
+generate_twiki_web.py: Generate a synthetic TWiki data web.
+
+Created by AB Tech on 2026-10-16.
+This file is part of the https://github.com/ABTech/twiki-to-mediawiki-xml
+
+Copyright (C) 2022-present  AB Tech, Carnegie Mellon University
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# Writes a TWiki data web of generated topics for the benchmarks: a .txt
+# file and an RCS ,v file per topic, like TWiki writes them. Each revision
+# edits a few lines of the one before and has a TOPICINFO META, the ,v file
+# holds the head text and a reverse edit script per older revision (so co
+# can check them out), and topics have FORM, FIELD and FILEATTACHMENT METAs,
+# TOPICPARENT chains and TOPICMOVED METAs as configured. A page name
+# replacement CSV for the web is written next to it. The same settings and
+# seed always generate the same web.
+#
+# Usage: python benchmarks/generate_twiki_web.py OUT_DIR [--topics N] ...
+
+from argparse import ArgumentParser
+from os import makedirs
+from os.path import join
+from random import Random
+from time import gmtime, strftime
+from typing import List
+
+from bench_text_formatting import generate_page
+
+from twiki_to_mediawiki_xml.rcs import make_rcs_edit_script
+
+START_DATE = 1104537600  # 2005-01-01
+REVISION_SECONDS = 86400
+LINE_BYTES = 45  # About the average length of a generated line
+AUTHORS = ("JaneDoe", "JohnSmith", "AlexKim", "SamLee", "TWikiGuest")
+
+
+def get_topic_name(index: int) -> str:
+    """Get the name of a topic."""
+    return f"BenchTopic{index}"
+
+
+def get_mediawiki_name(index: int) -> str:
+    """Get the MediaWiki name of a topic."""
+    return f"Bench_Topic_{index}"
+
+
+def get_parent(index: int, parent_depth: int) -> int:
+    """Get the index of a topic's parent, or -1 if it has none.
+
+    Topics are in chains of parent_depth + 1 topics, each the parent of the
+    next, so the deepest topics have parent_depth ancestors.
+    """
+    if index % (parent_depth + 1) == 0:
+        return -1
+    return index - 1
+
+
+def generate_line(rand: Random) -> str:
+    """Generate a line of typical TWiki markup."""
+    return generate_page(rand, 1).rstrip("\n")
+
+
+def generate_metas(rand: Random, index: int, meta_density: float,
+                   date: int) -> List[str]:
+    """Generate the META lines at the end of a topic.
+
+    There are about meta_density FIELD and FILEATTACHMENT METAs on average.
+    """
+    num_metas = int(meta_density) + (rand.random() < meta_density % 1)
+    num_fields = rand.randint(0, num_metas)
+    metas = []
+    if num_fields > 0:
+        metas.append('%META:FORM{name="BenchForm"}%')
+    for field in range(num_fields):
+        value = generate_line(rand).replace("%", "%25").replace('"', "%22")
+        value = value.replace("{", "%7B").replace("}", "%7D")
+        metas.append(f'%META:FIELD{{name="Field{field}" title="Field '
+                     f'{field}" value="{value}"}}%')
+    for attachment in range(num_metas - num_fields):
+        metas.append(f'%META:FILEATTACHMENT{{name="file{attachment}.png" '
+                     f'attachment="file{attachment}.png" attr="" comment="" '
+                     f'date="{date}" path="file{attachment}.png" '
+                     f'size="{rand.randint(100, 100000)}" '
+                     f'user="{AUTHORS[index % len(AUTHORS)]}" '
+                     f'version="1"}}%')
+    return metas
+
+
+def format_rcs_date(date: int) -> str:
+    """Format a timestamp as an RCS date."""
+    return strftime("%Y.%m.%d.%H.%M.%S", gmtime(date))
+
+
+def quote_rcs_string(text: str) -> str:
+    """Quote a string for an RCS file."""
+    return "@" + text.replace("@", "@@") + "@"
+
+
+def write_rcs_file(rcs_path: str, texts: List[str], dates: List[int],
+                   authors: List[str]) -> None:
+    """Write the revisions of a topic (oldest first) as an RCS file."""
+    revisions = [f"1.{number}" for number in range(1, len(texts) + 1)]
+    out = [f"head\t{revisions[-1]};\naccess;\nsymbols;\nlocks; strict;\n"
+           "comment\t@# @;\nexpand\t@o@;\n\n"]
+    for index in reversed(range(len(texts))):
+        next_revision = revisions[index - 1] if index > 0 else ""
+        out.append(f"\n{revisions[index]}\n"
+                   f"date\t{format_rcs_date(dates[index])};\t"
+                   f"author {authors[index]};\tstate Exp;\n"
+                   f"branches;\nnext\t{next_revision};\n")
+    out.append("\n\ndesc\n@none\n@\n")
+    for index in reversed(range(len(texts))):
+        if index == len(texts) - 1:
+            text = texts[index]
+        else:
+            text = make_rcs_edit_script(texts[index + 1], texts[index])
+        out.append(f"\n\n{revisions[index]}\nlog\n@@\ntext\n"
+                   f"{quote_rcs_string(text)}\n")
+    with open(rcs_path, "w", encoding="cp1252", newline="\n") as file_v:
+        file_v.write("".join(out))
+
+
+# pylint: disable=too-many-arguments,too-many-locals
+def generate_topic(web_path: str, index: int, rand: Random, revisions: int,
+                   text_size: int, meta_density: float, parent_depth: int,
+                   moved_frequency: float) -> None:
+    """Write the .txt and ,v files of a topic."""
+    name = get_topic_name(index)
+    parent = get_parent(index, parent_depth)
+    num_revisions = rand.randint(1, max(1, 2 * revisions - 1))
+    # The revision the topic was moved in (if it was moved)
+    moved = None
+    if rand.random() < moved_frequency:
+        moved = rand.randint(1, num_revisions)
+    lines = [generate_line(rand)
+             for _ in range(max(1, text_size // LINE_BYTES))]
+    metas = generate_metas(rand, index, meta_density,
+                           START_DATE + index * 60)
+    texts, dates, authors = [], [], []
+    for number in range(1, num_revisions + 1):
+        date = START_DATE + index * 60 + number * REVISION_SECONDS
+        author = rand.choice(AUTHORS)
+        if number > 1:
+            for _ in range(rand.randint(1, 4)):
+                position = rand.randrange(len(lines) + 1)
+                if rand.random() < 0.5 and position < len(lines):
+                    lines[position] = generate_line(rand)
+                else:
+                    lines.insert(position, generate_line(rand))
+        head = [f'%META:TOPICINFO{{author="{author}" date="{date}" '
+                f'format="1.1" version="1.{number}"}}%']
+        if parent != -1:
+            head.append(f'%META:TOPICPARENT{{name="{get_topic_name(parent)}"'
+                        f'}}%')
+        if number == moved:
+            metas.append(f'%META:TOPICMOVED{{by="{author}" date="{date}" '
+                         f'from="Bench.Old{name}" to="Bench.{name}"}}%')
+        texts.append("\n".join(head + lines + metas) + "\n")
+        dates.append(date)
+        authors.append(author)
+
+    with open(join(web_path, f"{name}.txt"), "w", encoding="cp1252",
+              newline="\n") as file_txt:
+        file_txt.write(texts[-1])
+    write_rcs_file(join(web_path, f"{name}.txt,v"), texts, dates, authors)
+
+
+# pylint: disable=too-many-arguments
+def generate_web(web_path: str, names_path: str, topics: int,
+                 revisions: int = 5, text_size: int = 2000,
+                 meta_density: float = 2.0, parent_depth: int = 3,
+                 moved_frequency: float = 0.05, seed: int = 0) -> None:
+    """Write a TWiki data web and its page name replacement CSV.
+
+    Topics have 1 to 2 * revisions - 1 revisions (revisions on average) and
+    texts of about text_size bytes.
+    """
+    makedirs(web_path, exist_ok=True)
+    rand = Random(seed)
+    for index in range(topics):
+        generate_topic(web_path, index, rand, revisions, text_size,
+                       meta_density, parent_depth, moved_frequency)
+    with open(names_path, "w", encoding="utf-8") as file_names:
+        for index in range(topics):
+            file_names.write(f"{get_topic_name(index)},"
+                             f"{get_mediawiki_name(index)}\n")
+
+
+def add_web_arguments(parser: ArgumentParser) -> None:
+    """Add the arguments of generate_web to an argument parser."""
+    parser.add_argument("--revisions", type=int, default=5,
+                        help="Average number of revisions per topic")
+    parser.add_argument("--text-size", type=int, default=2000,
+                        help="About how many bytes each text has")
+    parser.add_argument("--meta-density", type=float, default=2.0,
+                        help="Average number of FIELD and FILEATTACHMENT "
+                             "METAs per topic")
+    parser.add_argument("--parent-depth", type=int, default=3,
+                        help="Most TOPICPARENT ancestors of a topic")
+    parser.add_argument("--moved-frequency", type=float, default=0.05,
+                        help="Fraction of topics with a TOPICMOVED META")
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def main() -> None:
+    """Generate a web."""
+    parser = ArgumentParser(description="Generate a synthetic TWiki web")
+    parser.add_argument("out_dir",
+                        help="Directory to write the web (web/) and page "
+                             "name replacement CSV (names.csv) to")
+    parser.add_argument("--topics", type=int, default=1000)
+    add_web_arguments(parser)
+    args = parser.parse_args()
+
+    generate_web(join(args.out_dir, "web"), join(args.out_dir, "names.csv"),
+                 args.topics, args.revisions, args.text_size,
+                 args.meta_density, args.parent_depth, args.moved_frequency,
+                 args.seed)
+
+
+if __name__ == "__main__":
+    main()
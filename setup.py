@@ -69,8 +69,7 @@ setup(
     install_requires=[
         'deepdiff>=5,<6',
         'editrcs>=0.5.3,<6',
-        'lxml>=4,<5',
-        'setuptools>=62,<63'
+        'lxml>=4.5,<5'
     ],
     extras_require={
         'dev': [
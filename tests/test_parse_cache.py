@@ -0,0 +1,130 @@
+"""
+test_parse_cache.py: Tests for the persistent parse cache.
+
+Created by AB Tech on 2026-10-16.
+This file is part of the https://github.com/ABTech/twiki-to-mediawiki-xml
+
+Copyright (C) 2022-present  AB Tech, Carnegie Mellon University
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import sys
+from logging import WARNING
+from os import chmod
+from os.path import dirname
+from subprocess import run  # nosec B404
+
+from twiki_to_mediawiki_xml.twiki_parser import TWikiParser
+
+TOPIC_TXT = ('%META:TOPICINFO{author="JaneDoe" date="1104624000" '
+             'format="1.1" version="1.2"}%\nHello\n')
+
+# The edit script of 1.1 deletes a line that is not there, so applying it
+# fails with an RcsError and the parser falls back to co
+TOPIC_V = f"""head\t1.2;
+access;
+symbols;
+locks; strict;
+comment\t@# @;
+expand\t@o@;
+
+
+1.2
+date\t2005.01.02.00.00.00;\tauthor JaneDoe;\tstate Exp;
+branches;
+next\t1.1;
+
+1.1
+date\t2005.01.01.00.00.00;\tauthor JaneDoe;\tstate Exp;
+branches;
+next\t;
+
+
+desc
+@@
+
+
+1.2
+log
+@none
+@
+text
+@{TOPIC_TXT}@
+
+
+1.1
+log
+@none
+@
+text
+@d5 1
+@
+"""
+
+# Prints the head text for any revision, like co would for this file
+FAKE_CO = f"""#!{sys.executable}
+import sys
+sys.stdout.write({TOPIC_TXT!r})
+"""
+
+
+def write_topic(tmp_path):
+    """Write the topic and a fake co, returning their paths."""
+    web_path = tmp_path / "web"
+    web_path.mkdir()
+    twiki_txt_path = web_path / "BrokenTopic.txt"
+    twiki_txt_path.write_text(TOPIC_TXT, encoding="cp1252")
+    (web_path / "BrokenTopic.txt,v").write_text(TOPIC_V, encoding="cp1252")
+    co_path = tmp_path / "co"
+    co_path.write_text(FAKE_CO, encoding="utf-8")
+    chmod(co_path, 0o755)
+    return str(twiki_txt_path), str(co_path)
+
+
+def test_cache_topic_that_logged_exception(tmp_path, caplog):
+    """A topic whose warnings have exception arguments is cached."""
+    twiki_txt_path, co_path = write_topic(tmp_path)
+    cache_dir = str(tmp_path / "cache")
+    caplog.set_level(WARNING)
+
+    parser = TWikiParser(str(tmp_path / "web"), co_path, cache_dir=cache_dir)
+    page = parser.parse_metadata_cached(twiki_txt_path)
+    parser.co_pool.close()
+    assert page["revisions"]["deltas"][1]["text"] == TOPIC_TXT
+    assert parser.stats.to_dict()["counters"].get("cache_hits") is None
+    cold_messages = [record.getMessage() for record in caplog.records]
+    assert any("Could not apply RCS deltas" in message
+               for message in cold_messages)
+
+    caplog.clear()
+    parser = TWikiParser(str(tmp_path / "web"), co_path, cache_dir=cache_dir)
+    assert parser.parse_metadata_cached(twiki_txt_path) == page
+    assert parser.stats.to_dict()["counters"]["cache_hits"] == 1
+    assert [record.getMessage() for record in caplog.records] == \
+        cold_messages
+
+
+def test_cli_prints_warnings_on_cold_and_warm_runs(tmp_path):
+    """Capturing warnings for the cache does not stop them being printed."""
+    _, co_path = write_topic(tmp_path)
+    cmd = [sys.executable, "-m",
+           "twiki_to_mediawiki_xml.scripts.twiki_to_mediawiki_xml",
+           "twiki_parser", "web", "-c", co_path, "-q",
+           "--cache-dir", "cache"]
+    env = {"PYTHONPATH": dirname(dirname(__file__))}
+    for _ in ("cold", "warm"):
+        result = run(cmd, cwd=tmp_path, env=env, capture_output=True,
+                     text=True, check=True)  # nosec B603
+        assert "Could not apply RCS deltas" in result.stderr
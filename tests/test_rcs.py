@@ -0,0 +1,156 @@
+"""
+test_rcs.py: Tests for pure-Python RCS revision checkout.
+
+Created by AB Tech on 2026-10-16.
+This file is part of the https://github.com/ABTech/twiki-to-mediawiki-xml
+
+Copyright (C) 2022-present  AB Tech, Carnegie Mellon University
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# The fixtures in fixtures/rcs are ,v files with the texts each revision was
+# checked in with (TOPIC/REVISION.txt). Their deltas were made with GNU
+# diff -n, which is what ci runs, not with make_rcs_edit_script.
+
+from glob import glob
+from os.path import basename, dirname, join, splitext
+from shutil import which
+
+import pytest
+from editrcs import ParseRcs, RcsError
+
+from twiki_to_mediawiki_xml.rcs import (apply_rcs_edit_script, co_checkout,
+                                        iter_rcs_trunk_texts)
+from twiki_to_mediawiki_xml.rcs_file import RcsFile
+from twiki_to_mediawiki_xml.twiki_parser import TWikiParser
+
+FIXTURES_PATH = join(dirname(__file__), "fixtures", "rcs")
+TOPICS = ("BranchTopic", "MultiHunkTopic", "NoNewlineTopic")
+
+
+def get_v_path(topic: str) -> str:
+    """Get the path of a fixture topic's ,v file."""
+    return join(FIXTURES_PATH, f"{topic}.txt,v")
+
+
+def read_expected_texts(topic: str) -> dict:
+    """Read the texts each revision of a fixture topic was checked in with."""
+    texts = {}
+    for path in glob(join(FIXTURES_PATH, topic, "*.txt")):
+        with open(path, "rb") as file_txt:
+            texts[splitext(basename(path))[0]] = \
+                file_txt.read().decode("cp1252")
+    return texts
+
+
+def parse_rcs(topic: str, use_rcs_file: bool):
+    """Parse a fixture topic's ,v file with RcsFile or editrcs."""
+    if use_rcs_file:
+        return RcsFile(get_v_path(topic))
+    with open(get_v_path(topic), "r", encoding="cp1252",
+              newline="") as file_v:
+        return ParseRcs(file_v.read())
+
+
+@pytest.mark.parametrize("use_rcs_file", (True, False))
+@pytest.mark.parametrize("topic", TOPICS)
+def test_iter_rcs_trunk_texts(topic, use_rcs_file):
+    """Every trunk revision is checked out as it was checked in."""
+    expected = read_expected_texts(topic)
+    rcs = parse_rcs(topic, use_rcs_file)
+    texts = {revision: text
+             for revision, text, _ in iter_rcs_trunk_texts(rcs)}
+    assert list(texts) == sorted((revision for revision in expected
+                                  if revision.count(".") == 1),
+                                 key=lambda revision: -int(revision[2:]))
+    assert texts == {revision: text for revision, text in expected.items()
+                     if revision in texts}
+
+
+@pytest.mark.parametrize("topic", TOPICS)
+def test_edit_scripts_turn_newer_text_into_older(topic):
+    """Yielded edit scripts turn the text yielded before into each text."""
+    newer_text = None
+    with RcsFile(get_v_path(topic)) as rcs:
+        for _, text, edit_script in iter_rcs_trunk_texts(rcs, True):
+            if edit_script is None:
+                assert newer_text is None
+            else:
+                assert apply_rcs_edit_script(newer_text, edit_script) == text
+            newer_text = text
+
+
+def test_branch_revisions_apply_forward():
+    """Branch deltas apply forward from the revision they branch from."""
+    expected = read_expected_texts("BranchTopic")
+    with RcsFile(get_v_path("BranchTopic")) as rcs:
+        deltas = {delta.getRevision(): delta for delta in rcs.deltas}
+        assert deltas["1.2"].getBranches() == ["1.2.1.1"]
+        assert deltas["1.2.1.1"].getNext() == "1.2.1.2"
+        text = expected["1.2"]
+        for revision in ("1.2.1.1", "1.2.1.2"):
+            text = apply_rcs_edit_script(text, deltas[revision].getText())
+            assert text == expected[revision]
+
+
+def test_branch_revisions_need_co():
+    """Branch revisions are left to co, which is needed to check them out."""
+    with pytest.raises(RcsError, match="1.2.1.1 without co"):
+        TWikiParser.parse_twiki_revisions(None, get_v_path("BranchTopic"),
+                                          None)
+
+
+def test_apply_rcs_edit_script_hunks():
+    """Deletes and appends in one script all refer to the source lines."""
+    source = "one\ntwo\nthree\nfour\nfive\n"
+    edit_script = "d1 1\na2 2\n2a\n2b\nd4 2\na5 1\nfive!\n"
+    assert apply_rcs_edit_script(source, edit_script) == \
+        "two\n2a\n2b\nthree\nfive!\n"
+
+
+def test_apply_rcs_edit_script_without_trailing_newline():
+    """A last line without a newline ends the script and the text."""
+    assert apply_rcs_edit_script("a\nb\nc\n", "d2 2\na3 2\nB\nc") == \
+        "a\nB\nc"
+    assert apply_rcs_edit_script("a\nB\nc", "d2 2\na3 2\nb\nc\n") == \
+        "a\nb\nc\n"
+
+
+@pytest.mark.parametrize("edit_script", ("d4 1\n", "a9 1\nx\n", "a1 2\nx\n",
+                                         "x1 1\n", "d2 1\nd1 1\n"))
+def test_apply_rcs_edit_script_errors(edit_script):
+    """Invalid or out of range commands raise RcsError."""
+    with pytest.raises(RcsError):
+        apply_rcs_edit_script("a\nb\nc\n", edit_script)
+
+
+def test_at_signs_are_unquoted():
+    """Doubled @ in strings are read as one @."""
+    expected = read_expected_texts("MultiHunkTopic")
+    with RcsFile(get_v_path("MultiHunkTopic")) as rcs:
+        logs = {delta.getRevision(): delta.getLog() for delta in rcs.deltas}
+        texts = {revision: text
+                 for revision, text, _ in iter_rcs_trunk_texts(rcs)}
+    assert logs["1.2"] == "Edited by jane@example.com\n"
+    assert "@@@@" not in texts["1.4"] and "@@ 2005" in texts["1.4"]
+    assert texts == expected
+
+
+@pytest.mark.skipif(which("co") is None, reason="RCS co is not installed")
+@pytest.mark.parametrize("topic", TOPICS)
+def test_fixtures_match_co(topic):
+    """Every revision of the fixtures checks out the same with co."""
+    for revision, text in read_expected_texts(topic).items():
+        assert co_checkout(which("co"), get_v_path(topic), revision) == text
@@ -0,0 +1,101 @@
+"""
+test_rcs_file.py: Tests for memory-mapped reading of RCS ,v files.
+
+Created by AB Tech on 2026-10-16.
+This file is part of the https://github.com/ABTech/twiki-to-mediawiki-xml
+
+Copyright (C) 2022-present  AB Tech, Carnegie Mellon University
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from logging import WARNING
+from os.path import dirname, join
+from shutil import copyfile
+
+from twiki_to_mediawiki_xml import rcs
+from twiki_to_mediawiki_xml.revision_texts import RevisionTexts
+from twiki_to_mediawiki_xml.twiki_parser import TWikiParser
+
+FIXTURES_PATH = join(dirname(__file__), "fixtures", "rcs")
+CRLF_V_PATH = join(FIXTURES_PATH, "CrlfTopic.txt,v")
+CRLF_REVISIONS = ("1.3", "1.2", "1.1")
+
+
+def read_expected_text(topic: str, revision: str) -> str:
+    """Read the text a revision was checked in with, like a .txt file."""
+    with open(join(FIXTURES_PATH, topic, f"{revision}.txt"), "r",
+              encoding="cp1252") as file_txt:
+        return file_txt.read()
+
+
+def test_crlf_texts_are_normalized():
+    """Texts of CRLF topics have LF line endings, with or without editrcs."""
+    expected = {revision: read_expected_text("CrlfTopic", revision)
+                for revision in CRLF_REVISIONS}
+    for raw_rcs in (False, True):
+        revisions = TWikiParser.parse_twiki_revisions(
+            None, CRLF_V_PATH, None, raw_rcs=raw_rcs)
+        texts = {revision["revision"]: revision["text"]
+                 for revision in revisions["deltas"]}
+        assert texts == expected
+        assert all("\r" not in revision["log"]
+                   for revision in revisions["deltas"])
+
+
+def test_crlf_edit_scripts_apply_to_normalized_texts():
+    """Edit scripts kept in deltas mode apply to the normalized texts."""
+    revisions = TWikiParser.parse_twiki_revisions(
+        None, CRLF_V_PATH, None, edit_scripts=True)
+    revision_texts = RevisionTexts(revisions)
+    for revision in revisions["deltas"]:
+        assert revision_texts.get_text(revision) == \
+            read_expected_text("CrlfTopic", revision["revision"])
+    assert all("\r" not in revision.get("edit_script", "")
+               for revision in revisions["deltas"])
+
+
+def test_crlf_edit_scripts_only_made_in_deltas_mode(monkeypatch):
+    """Edit scripts of CRLF topics are only made again in deltas mode."""
+    calls = []
+    make_rcs_edit_script = rcs.make_rcs_edit_script
+
+    def counting_make_rcs_edit_script(source: str, target: str) -> str:
+        calls.append((source, target))
+        return make_rcs_edit_script(source, target)
+
+    monkeypatch.setattr(rcs, "make_rcs_edit_script",
+                        counting_make_rcs_edit_script)
+    for raw_rcs in (False, True):
+        TWikiParser.parse_twiki_revisions(None, CRLF_V_PATH, None,
+                                          raw_rcs=raw_rcs)
+    assert calls == []
+    TWikiParser.parse_twiki_revisions(None, CRLF_V_PATH, None,
+                                      edit_scripts=True)
+    assert len(calls) == len(CRLF_REVISIONS) - 1
+
+
+def test_crlf_head_matches_txt(tmp_path, caplog):
+    """The head revision of a CRLF topic matches its .txt file."""
+    web_path = tmp_path / "web"
+    web_path.mkdir()
+    twiki_txt_path = str(web_path / "CrlfTopic.txt")
+    copyfile(join(FIXTURES_PATH, "CrlfTopic", "1.3.txt"), twiki_txt_path)
+    copyfile(CRLF_V_PATH, f"{twiki_txt_path},v")
+    caplog.set_level(WARNING)
+    for raw_rcs in (False, True):
+        page = TWikiParser(str(web_path), None,
+                           raw_rcs=raw_rcs).parse_metadata(twiki_txt_path)
+        assert page["revisions"]["deltas"][0]["text"] == page["twiki_txt"]
+    assert [record.getMessage() for record in caplog.records] == []
@@ -0,0 +1,160 @@
+"""
+test_replace_rules.py: Tests for the TWiki text formatting rules.
+
+Created by AB Tech on 2026-10-16.
+This file is part of the https://github.com/ABTech/twiki-to-mediawiki-xml
+
+Copyright (C) 2022-present  AB Tech, Carnegie Mellon University
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import pytest
+
+from twiki_to_mediawiki_xml.twiki_to_mediawiki_format.replace_rules import \
+    text_formatting
+
+MARKUP_CASES = (
+    ("%$x^2$%", "<math>x^2</math>"),
+    ("a <dot>digraph</dot> b", "a <graphviz>digraph</graphviz> b"),
+    ("<verbatim>*x*</verbatim>", "<pre>*x*</pre>"),
+    ("a<nop>b", "ab"),
+    ("<nop>WikiWord !WikiWord", "WikiWord WikiWord"),
+    ("!lower and !A", "!lower and !A"),
+)
+
+IMAGE_CASES = (
+    ('<img src="Media:a.png" alt="x" />', "[[File:a.png]]"),
+    ('<img alt="x" src="http://x/a.png" />',
+     '<img alt="x" src="http://x/a.png" />'),
+    ("[[http://x.org | [[File:a.png]] ]]",
+     "[[File:a.png|link=http://x.org]]"),
+    ("[ Page [[File:a.png]] ]", "[[File:a.png|link=Page]]"),
+)
+
+EMPHASIS_CASES = (
+    ("*bold*", "'''bold'''"),
+    ("a *two words* b", "a '''two words''' b"),
+    ("__bi__", "'''''bi'''''"),
+    ("_it_", "''it''"),
+    ("_a_b_", "''a_b''"),
+    ("==bf==", "'''<tt>bf</tt>'''"),
+    ("=mono=", "<tt>mono</tt>"),
+    ("=a= and =b=", "<tt>a</tt> and <tt>b</tt>"),
+    ("(*x*)", "('''x''')"),
+    ("*x*.", "'''x'''."),
+    # Not emphasis: inside a word, padded, or spanning lines.
+    ("a*x*", "a*x*"),
+    ("*x*y", "*x*y"),
+    ("2*3*4", "2*3*4"),
+    ("* x*", "* x*"),
+    ("*x *", "*x *"),
+    ("*a\nb*", "*a\nb*"),
+)
+
+HEADING_CASES = (
+    ("---+ One", "= One ="),
+    ("---++ Two", "== Two =="),
+    ("---+++ Three", "=== Three ==="),
+    ("---++++ Four", "==== Four ===="),
+    ("---+++++ Five", "===== Five ====="),
+    ("---++++++ Six", "====== Six ======"),
+    ("---+NoSpace", "=NoSpace ="),
+    ("---+ Title\r\nx", "= Title =\r\nx"),
+    (" ---+ No", " ---+ No"),
+)
+
+LIST_CASES = (
+    ("   * one", "* one"),
+    ("      * two", "** two"),
+    ("         * three", "*** three"),
+    ("\t* tab", "* tab"),
+    ("\t\t* tabs", "** tabs"),
+    (" " * 30 + "* ten", "*" * 10 + " ten"),
+    ("   1 one", "# one"),
+    ("   1. one", "# one"),
+    ("      2. two", "## two"),
+    ("\t3 tab", "# tab"),
+    # Not lists: indents that aren't multiples of three spaces, bold text,
+    # and numbers or letters that aren't a single digit.
+    ("  * two spaces", "  * two spaces"),
+    ("    * four spaces", "    * four spaces"),
+    ("   *bold*", "   '''bold'''"),
+    ("   12. twelve", "   12. twelve"),
+    ("   a. letter", "   a. letter"),
+)
+
+DEFINITION_CASES = (
+    ("   $ Term: def", "; Term : def"),
+    ("   $ NoColon", "; NoColon "),
+    ("      $ Deep: def", "      $ Deep: def"),
+)
+
+ANCHOR_CASES = (
+    ("#Anchor", '<div id="Anchor"></div>'),
+    ("  #Anchor  ", '<div id="Anchor"></div>'),
+    ("#Anchor more", "#Anchor more"),
+    ("# Not", "# Not"),
+    ("a #NotAnchor", "a #NotAnchor"),
+)
+
+
+@pytest.mark.parametrize("twiki, mediawiki", MARKUP_CASES)
+def test_markup(twiki, mediawiki):
+    """Test that TWiki tags become their MediaWiki equivalents."""
+    assert text_formatting(twiki) == mediawiki
+
+
+@pytest.mark.parametrize("twiki, mediawiki", IMAGE_CASES)
+def test_images(twiki, mediawiki):
+    """Test that attached images and image links become files."""
+    assert text_formatting(twiki) == mediawiki
+
+
+@pytest.mark.parametrize("twiki, mediawiki", EMPHASIS_CASES)
+def test_emphasis(twiki, mediawiki):
+    """Test bold, italic and monospace text."""
+    assert text_formatting(twiki) == mediawiki
+
+
+@pytest.mark.parametrize("twiki, mediawiki", HEADING_CASES)
+def test_headings(twiki, mediawiki):
+    """Test that ---+ headings become = headings =."""
+    assert text_formatting(twiki) == mediawiki
+
+
+@pytest.mark.parametrize("twiki, mediawiki", LIST_CASES)
+def test_lists(twiki, mediawiki):
+    """Test bullets and numbering at each depth."""
+    assert text_formatting(twiki) == mediawiki
+
+
+@pytest.mark.parametrize("twiki, mediawiki", DEFINITION_CASES)
+def test_definitions(twiki, mediawiki):
+    """Test that only top level definitions become ; term : definition."""
+    assert text_formatting(twiki) == mediawiki
+
+
+@pytest.mark.parametrize("twiki, mediawiki", ANCHOR_CASES)
+def test_anchors(twiki, mediawiki):
+    """Test that #Anchor lines become empty divs with that id."""
+    assert text_formatting(twiki) == mediawiki
+
+
+def test_rules_combine():
+    """Test a page using several rule groups at once."""
+    twiki = "---+ *Bold* heading\n   * =mono= item\n   1. _it_\n#Top\n"
+    assert text_formatting(twiki) == (
+        "= '''Bold''' heading =\n* <tt>mono</tt> item\n# ''it''\n"
+        '<div id="Top"></div>\n')
@@ -0,0 +1,100 @@
+"""
+test_revision_texts.py: Tests for getting revision texts in deltas mode.
+
+Created by AB Tech on 2026-10-16.
+This file is part of the https://github.com/ABTech/twiki-to-mediawiki-xml
+
+Copyright (C) 2022-present  AB Tech, Carnegie Mellon University
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+import sys
+from os import chmod
+from os.path import dirname, join
+from random import Random
+
+import pytest
+
+from twiki_to_mediawiki_xml.revision_texts import RevisionTexts, get_trunk
+from twiki_to_mediawiki_xml.twiki_parser import TWikiParser
+
+FIXTURES_PATH = join(dirname(__file__), "fixtures", "rcs")
+
+# Prints the fixture text of a revision, like co would for the fixtures
+# (co -q -pREVISION TOPIC.txt,v), for the branch revisions
+FAKE_CO = f"""#!{sys.executable}
+import sys
+from os.path import basename, join
+topic = basename(sys.argv[3])[:-len(".txt,v")]
+with open(join({FIXTURES_PATH!r}, topic, sys.argv[2][2:] + ".txt"),
+          "rb") as file_txt:
+    sys.stdout.buffer.write(file_txt.read())
+"""
+
+
+@pytest.fixture(name="co_path")
+def fixture_co_path(tmp_path):
+    """Write a fake co for the fixtures, returning its path."""
+    co_path = tmp_path / "co"
+    co_path.write_text(FAKE_CO, encoding="utf-8")
+    chmod(co_path, 0o755)
+    return str(co_path)
+
+
+def parse_revisions(topic: str, co_path: str, edit_scripts: bool) -> dict:
+    """Parse the revisions of a fixture topic in full or deltas mode."""
+    return TWikiParser.parse_twiki_revisions(
+        None, join(FIXTURES_PATH, f"{topic}.txt,v"), co_path,
+        edit_scripts=edit_scripts)
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("topic", ("MultiHunkTopic", "BranchTopic"))
+def test_revision_texts_match_full_mode(topic, seed, co_path):
+    """Texts are the full mode texts in any order, evicting from the cache."""
+    full_texts = {revision["revision"]: revision["text"] for revision
+                  in parse_revisions(topic, co_path, False)["deltas"]}
+    revisions = parse_revisions(topic, co_path, True)
+    trunk = get_trunk(revisions)
+    # Only the head of the trunk has its text, not the first revision
+    assert "text" in trunk[0] and "text" not in trunk[-1]
+    assert trunk[-1]["revision"] == "1.1"
+
+    revision_texts = RevisionTexts(revisions, cache_size=1)
+    deltas = list(revisions["deltas"])
+    Random(seed).shuffle(deltas)
+    for revision in deltas:
+        assert revision_texts.get_text(revision) == \
+            full_texts[revision["revision"]]
+        assert len(revision_texts.cache) <= revision_texts.cache_size
+    assert revision_texts.cache_size < len(trunk)
+
+    # The first and last revisions again, after others were evicted
+    for revision in (trunk[-1], trunk[0], trunk[-1]):
+        assert revision_texts.get_text(revision) == \
+            full_texts[revision["revision"]]
+
+
+def test_revision_texts_branch_without_text():
+    """Branch revisions need their text, they have no trunk to start from."""
+    revisions = {"head": "1.2", "deltas": [
+        {"revision": "1.2", "next": "1.1", "text": "b\n"},
+        {"revision": "1.1", "next": None, "edit_script": "d1 1\na1 1\na\n"},
+        {"revision": "1.1.1.1", "next": None, "edit_script": "d1 1\n"}]}
+    revision_texts = RevisionTexts(revisions)
+    assert revision_texts.get_text(revisions["deltas"][1]) == "a\n"
+    with pytest.raises(ValueError, match="1.1.1.1 .* not on the trunk"):
+        revision_texts.get_text(revisions["deltas"][2])
@@ -0,0 +1,139 @@
+"""
+test_shards.py: Tests for the sharded XML export.
+
+Created by AB Tech on 2026-10-16.
+This file is part of the https://github.com/ABTech/twiki-to-mediawiki-xml
+
+Copyright (C) 2022-present  AB Tech, Carnegie Mellon University
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+from datetime import datetime
+from io import BytesIO
+from os.path import dirname, getsize, join
+from shutil import copyfile
+
+import pytest
+from lxml.etree import fromstring, parse  # nosec B410
+
+from twiki_to_mediawiki_xml.mediawiki_xml_exporter import MediaWikiXMLExporter
+from twiki_to_mediawiki_xml.twiki_parser import TWikiParser
+
+FIXTURES_PATH = join(dirname(__file__), "fixtures", "rcs")
+NS = "{http://www.mediawiki.org/xml/export-0.11/}"
+# Topics with only trunk revisions, so they can be checked out without co,
+# and the last revision of each
+RCS_TOPICS = (("CrlfTopic", "1.3"), ("MultiHunkTopic", "1.4"),
+              ("NoNewlineTopic", "1.4"))
+PLAIN_TOPIC_TXT = ('%META:TOPICINFO{{author="JaneDoe" date="1104537600" '
+                   'format="1.1" version="1.1"}}%\nPlain topic {}.\n')
+
+
+def parse_web(tmp_path, monkeypatch) -> list:
+    """Parse a web of the RCS fixtures and topics without revisions.
+
+    One page was moved, so it also has a redirect page.
+    """
+    web_path = tmp_path / "web"
+    web_path.mkdir()
+    for topic, head in RCS_TOPICS:
+        copyfile(join(FIXTURES_PATH, f"{topic}.txt,v"),
+                 web_path / f"{topic}.txt,v")
+        copyfile(join(FIXTURES_PATH, topic, f"{head}.txt"),
+                 web_path / f"{topic}.txt")
+    for topic_i in range(5):
+        (web_path / f"PlainTopic{topic_i}.txt").write_text(
+            PLAIN_TOPIC_TXT.format(topic_i), encoding="cp1252")
+    # Data paths are found relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    pages = sorted(TWikiParser("web", None).iter_pages(),
+                   key=lambda page: page["page_name"])
+    pages[0]["old_page_name"] = "OldCrlfTopic"
+    return pages
+
+
+def make_exporter(pages: list) -> MediaWikiXMLExporter:
+    """Make an exporter of the pages."""
+    return MediaWikiXMLExporter(
+        None, "Test Wiki", "testwiki", "https://wiki.example.com/",
+        migration_timestamp=datetime(2022, 6, 1), mediawiki_pages=pages)
+
+
+def get_titles_and_ids(xml_root) -> tuple:
+    """Get the page titles and the page and revision IDs of a dump."""
+    titles = [title.text for title in xml_root.iter(f"{NS}title")]
+    page_ids = [page.find(f"{NS}id").text
+                for page in xml_root.iter(f"{NS}page")]
+    rev_ids = [rev.find(f"{NS}id").text
+               for rev in xml_root.iter(f"{NS}revision")]
+    return titles, page_ids, rev_ids
+
+
+@pytest.mark.parametrize("shards, max_bytes, jobs", (
+    (3, None, 1),
+    (None, 6000, 1),
+    (None, 6000, 2),
+    (None, 1, 1),
+))
+def test_write_xml_shards(tmp_path, monkeypatch, shards, max_bytes, jobs):
+    """Shards have disjoint IDs and together have the pages of the dump."""
+    pages = parse_web(tmp_path, monkeypatch)
+    out_file = BytesIO()
+    make_exporter(pages).write_xml(out_file)
+    titles, page_ids, rev_ids = get_titles_and_ids(
+        fromstring(out_file.getvalue()))
+
+    paths = make_exporter(pages).write_xml_shards(
+        join(str(tmp_path), "dump.xml"), shards, max_bytes, jobs)
+    assert len(paths) > 1
+    assert paths[0] == join(str(tmp_path), "dump-1.xml")
+    shard_titles = []
+    shard_page_ids = set()
+    shard_rev_ids = set()
+    for path in paths:
+        # Each shard is a dump of its own
+        xml_root = parse(path).getroot()
+        assert xml_root.tag == f"{NS}mediawiki"
+        assert xml_root.find(f"{NS}siteinfo") is not None
+        path_titles, path_page_ids, path_rev_ids = get_titles_and_ids(
+            xml_root)
+        assert len(path_titles) > 0
+        assert shard_page_ids.isdisjoint(path_page_ids)
+        assert shard_rev_ids.isdisjoint(path_rev_ids)
+        shard_titles += path_titles
+        shard_page_ids.update(path_page_ids)
+        shard_rev_ids.update(path_rev_ids)
+        # Only a shard of a single page (and its redirect) can be bigger
+        if max_bytes is not None and len(set(path_titles) -
+                                         {"OldCrlfTopic"}) > 1:
+            assert getsize(path) <= max_bytes
+    assert shard_titles == titles
+    assert len(shard_page_ids) == len(page_ids)
+    assert len(shard_rev_ids) == len(rev_ids)
+    # The first shard is numbered like the dump
+    assert get_titles_and_ids(parse(paths[0]).getroot())[1][0] == "1"
+
+
+def test_split_shards():
+    """Shards are balanced by size or limited to max_bytes."""
+    split_shards = MediaWikiXMLExporter.split_shards
+    assert split_shards([1, 1, 1, 1], shards=2) == [(0, 2), (2, 4)]
+    assert split_shards([3, 1, 1, 1], shards=2) == [(0, 1), (1, 4)]
+    assert split_shards([1, 1, 1, 1], shards=8) == [
+        (0, 1), (1, 2), (2, 3), (3, 4)]
+    assert split_shards([2, 2, 5, 1], max_bytes=4) == [
+        (0, 2), (2, 3), (3, 4)]
+    assert split_shards([], shards=2) == [(0, 0)]
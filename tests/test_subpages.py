@@ -0,0 +1,104 @@
+"""
+test_subpages.py: Tests for converting TWiki parents to subpages.
+
+Created by AB Tech on 2026-10-16.
+This file is part of the https://github.com/ABTech/twiki-to-mediawiki-xml
+
+Copyright (C) 2022-present  AB Tech, Carnegie Mellon University
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+from logging import WARNING
+from sys import getrecursionlimit
+
+from twiki_to_mediawiki_xml.twiki_to_mediawiki_format.subpages import \
+    TwikiToMediaWikiSubpages
+
+
+def make_page(page_name: str, parent_name: str = None) -> dict:
+    """Make a parsed page with an optional TOPICPARENT."""
+    metas = {}
+    if parent_name is not None:
+        metas["TOPICPARENT"] = [{"name": parent_name}]
+    return {"page_name": page_name, "metas": metas}
+
+
+def convert(pages: list) -> list:
+    """Return the page names after the subpage conversion."""
+    subpages = TwikiToMediaWikiSubpages(pages, copy_pages=True)
+    subpages.run()
+    return [page["page_name"] for page in subpages.get_pages()]
+
+
+def get_warnings(caplog) -> list:
+    """Return the warnings logged by the subpage conversion."""
+    return [record.getMessage() for record in caplog.records
+            if record.levelno == WARNING]
+
+
+def test_parents_become_subpages(caplog):
+    """Test that parents are prefixed and web names are dropped."""
+    pages = [make_page("A"), make_page("B", "A"), make_page("C", "Web.B"),
+             make_page("D", "WebHome")]
+    assert convert(pages) == ["A", "A/B", "A/B/C", "D"]
+    assert not get_warnings(caplog)
+
+
+def test_two_page_cycle(caplog):
+    """Test that a two page cycle is broken at the first page found."""
+    pages = [make_page("A", "B"), make_page("B", "A")]
+    assert convert(pages) == ["A", "A/B"]
+    assert get_warnings(caplog) == [
+        "Ignoring parent topic B of A to break the TOPICPARENT cycle "
+        "A -> B -> A"]
+
+
+def test_cycle_below_other_pages(caplog):
+    """Test that pages outside a cycle keep their parents."""
+    pages = [make_page("A"), make_page("B", "C"), make_page("C", "B"),
+             make_page("D", "A"), make_page("E", "D")]
+    assert convert(pages) == ["A", "B", "B/C", "A/D", "A/D/E"]
+    assert get_warnings(caplog) == [
+        "Ignoring parent topic C of B to break the TOPICPARENT cycle "
+        "B -> C -> B"]
+
+
+def test_self_parent(caplog):
+    """Test that a page that is its own parent is left alone."""
+    assert convert([make_page("A", "A")]) == ["A"]
+    assert get_warnings(caplog) == [
+        "Ignoring parent topic of same name for A"]
+
+
+def test_missing_parent(caplog):
+    """Test that a parent without a page is still used in the name."""
+    pages = [make_page("B", "Missing"), make_page("C", "B")]
+    assert convert(pages) == ["Missing/B", "Missing/B/C"]
+    assert not get_warnings(caplog)
+
+
+def test_deep_chain(caplog):
+    """Test a chain of parents much deeper than the recursion limit."""
+    depth = getrecursionlimit() * 3
+    names = [f"P{i}" for i in range(depth)]
+    # Children first, so each page has to resolve all of its ancestors
+    pages = [make_page(names[i], names[i - 1])
+             for i in range(depth - 1, 0, -1)] + [make_page(names[0])]
+    page_names = convert(pages)
+    assert page_names[-1] == "P0"
+    assert page_names[0] == "/".join(names)
+    assert page_names[depth // 2] == "/".join(names[:depth - depth // 2])
+    assert not get_warnings(caplog)
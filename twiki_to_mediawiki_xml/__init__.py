@@ -21,11 +21,27 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
-from importlib.metadata import PackageNotFoundError, version
-
-__version__ = None
-try:
-    __version__ = version("twiki-to-mediawiki-xml")
-except PackageNotFoundError:
-    # package is not installed
-    pass
+# Looking up the version imports importlib.metadata, which takes longer than
+# starting the CLI otherwise, so it is only looked up when it is first used.
+
+from functools import lru_cache
+from typing import Any, Optional
+
+
+@lru_cache(maxsize=None)
+def get_version() -> Optional[str]:
+    """Get the installed version of the package (if installed)."""
+    # pylint: disable=import-outside-toplevel
+    from importlib.metadata import PackageNotFoundError, version
+    try:
+        return version("twiki-to-mediawiki-xml")
+    except PackageNotFoundError:
+        # package is not installed
+        return None
+
+
+def __getattr__(name: str) -> Any:
+    """Look up __version__ when it is first used."""
+    if name == "__version__":
+        return get_version()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,154 @@
+"""
+co_pool.py: Run RCS co checkouts concurrently.
+
+Created by AB Tech on 2026-10-16.
+This file is part of the https://github.com/ABTech/twiki-to-mediawiki-xml
+
+Copyright (C) 2022-present  AB Tech, Carnegie Mellon University
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# Most of the time of a co call is starting the process and re-parsing the
+# ,v file, so checkouts are run concurrently: an asyncio event loop in a
+# background thread runs co with asyncio.create_subprocess_exec, and a
+# semaphore keeps up to concurrency processes running at once. Checkouts can
+# be prefetched (for the rest of a page, or for pages that have not been
+# parsed yet) so processes stay in flight across revisions and pages, and
+# checkout() then waits for the prefetched result.
+#
+# Each process has its own pool, so with worker processes up to
+# jobs * concurrency co processes run at once.
+#
+# asyncio takes longer to import than starting the CLI otherwise, so it is
+# only imported once the event loop is started.
+
+# pylint: disable=import-outside-toplevel
+
+from subprocess import CalledProcessError  # nosec B404
+from threading import Thread
+from time import perf_counter
+from typing import TYPE_CHECKING, Dict, Iterable, Optional, Tuple
+
+from twiki_to_mediawiki_xml.parallel import resolve_jobs
+from twiki_to_mediawiki_xml.rcs import decode_co_output, get_co_command
+from twiki_to_mediawiki_xml.stats import Stats
+
+if TYPE_CHECKING:
+    from asyncio import AbstractEventLoop, Semaphore
+    from concurrent.futures import Future
+
+
+class CoPool():
+    """Run co checkouts with up to concurrency processes at once."""
+
+    def __init__(self, co_path: str, concurrency: int = 1,
+                 stats: Optional[Stats] = None):
+        """Initialize the pool (the event loop is started when needed).
+
+        The number of co calls and their total latency (from starting co to
+        its exit) are added to stats as co_calls and co_seconds.
+        """
+        self.co_path = co_path
+        self.concurrency = resolve_jobs(concurrency)
+        self.stats = Stats() if stats is None else stats
+        self.loop: Optional["AbstractEventLoop"] = None
+        self.thread: Optional[Thread] = None
+        self.semaphore: Optional["Semaphore"] = None
+        self.prefetched: Dict[Tuple[str, str], "Future"] = {}
+
+    def __getstate__(self) -> dict:
+        """Pickle without the event loop (each process starts its own)."""
+        state = self.__dict__.copy()
+        state.update(loop=None, thread=None, semaphore=None, prefetched={})
+        return state
+
+    def start(self) -> "AbstractEventLoop":
+        """Start the event loop thread if it is not already running."""
+        if self.loop is None:
+            from asyncio import new_event_loop
+            self.loop = new_event_loop()
+            self.thread = Thread(target=self.loop.run_forever,
+                                 name="co-pool", daemon=True)
+            self.thread.start()
+        return self.loop
+
+    def close(self) -> None:
+        """Cancel any checkouts that are left and stop the event loop."""
+        if self.loop is None:
+            return
+        from asyncio import run_coroutine_threadsafe
+        self.prefetched = {}
+        run_coroutine_threadsafe(self.cancel_all(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+        self.loop = None
+        self.thread = None
+        self.semaphore = None
+
+    @staticmethod
+    async def cancel_all() -> None:
+        """Cancel every other task of the event loop."""
+        from asyncio import all_tasks, current_task, gather
+        tasks = [task for task in all_tasks() if task is not current_task()]
+        for task in tasks:
+            task.cancel()
+        await gather(*tasks, return_exceptions=True)
+
+    async def run_co(self, twiki_v_path: str, revision: str) -> str:
+        """Check out a revision's text once a process slot is free."""
+        from asyncio import CancelledError, Semaphore, create_subprocess_exec
+        from asyncio.subprocess import PIPE
+        if self.semaphore is None:
+            self.semaphore = Semaphore(self.concurrency)
+        cmd = get_co_command(self.co_path, twiki_v_path, revision)
+        async with self.semaphore:
+            start = perf_counter()
+            process = await create_subprocess_exec(*cmd, stdout=PIPE)
+            try:
+                output, _ = await process.communicate()
+            except CancelledError:
+                process.kill()
+                await process.wait()
+                raise
+            self.stats.add("co_calls")
+            self.stats.add("co_seconds", perf_counter() - start)
+        if process.returncode != 0:
+            raise CalledProcessError(process.returncode, cmd, output)
+        return decode_co_output(output)
+
+    def submit(self, twiki_v_path: str, revision: str) -> "Future":
+        """Start checking out a revision, returning a future of its text."""
+        from asyncio import run_coroutine_threadsafe
+        return run_coroutine_threadsafe(self.run_co(twiki_v_path, revision),
+                                        self.start())
+
+    def prefetch(self, twiki_v_path: str, revisions: Iterable[str]) -> None:
+        """Start checking out revisions to be got later with checkout."""
+        for revision in revisions:
+            if (twiki_v_path, revision) not in self.prefetched:
+                self.prefetched[(twiki_v_path, revision)] = self.submit(
+                    twiki_v_path, revision)
+
+    def pending(self) -> int:
+        """Get the number of prefetched checkouts not yet got."""
+        return len(self.prefetched)
+
+    def checkout(self, twiki_v_path: str, revision: str) -> str:
+        """Check out a revision's text, waiting for it if prefetched."""
+        future = self.prefetched.pop((twiki_v_path, revision), None)
+        if future is None:
+            future = self.submit(twiki_v_path, revision)
+        return future.result()
@@ -22,33 +22,85 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
 from datetime import datetime
+from io import BytesIO
+from itertools import islice
 # from hashlib import sha1
-from json import load
 from logging import getLogger
+from os.path import getsize, splitext
 from re import sub
-from typing import List, Tuple
+from typing import (BinaryIO, Iterable, Iterator, List, Optional, Sequence,
+                    Set, Tuple)
+
+from lxml.etree import (Element, QName, SubElement, indent,  # nosec B410
+                        tostring, xmlfile)
+
+from twiki_to_mediawiki_xml import get_version
+from twiki_to_mediawiki_xml.pages_json import load_pages
+from twiki_to_mediawiki_xml.parallel import imap_ordered, resolve_jobs
+from twiki_to_mediawiki_xml.rcs import get_rcs_revision_key
+from twiki_to_mediawiki_xml.revision_texts import (RevisionTexts,
+                                                   get_revision_text,
+                                                   get_twiki_txt,
+                                                   iter_revisions,
+                                                   resolve_text_blobs)
+from twiki_to_mediawiki_xml.stats import Stats
+
+# A dump can be split into shards, separate <mediawiki> files that can be
+# written by worker processes and imported concurrently. Each shard gets its
+# own range of page and revision IDs, sized by an upper bound of the IDs its
+# pages can use (every move adds a redirect page and two revisions), so the
+# IDs of all shards are disjoint. The IDs of the first shard start at 1 like
+# in a single dump. Shards are balanced (or limited) by an estimate of their
+# size: the bytes of the texts of the revisions (a move's revision repeats the
+# page's text) plus the rest of a revision element, after the <mediawiki> and
+# <siteinfo> every shard starts with.
+REVISION_XML_BYTES = 450
 
-from lxml.etree import Element, QName, SubElement, tostring  # nosec B410
-from pkg_resources import parse_version
+logger = getLogger(__name__)
 
-from twiki_to_mediawiki_xml import __version__
+_WORKER_EXPORTER = None
 
-logger = getLogger(__name__)
 
+def _init_exporter_worker(exporter: "MediaWikiXMLExporter") -> None:
+    """Set the exporter used by a worker process."""
+    global _WORKER_EXPORTER  # pylint: disable=global-statement
+    _WORKER_EXPORTER = exporter
+    _WORKER_EXPORTER.stats.start_worker()
+
+
+def _write_shard_worker(task: Tuple[dict, List[dict]]) -> Tuple[str, dict]:
+    """Write a shard of pages in a worker process.
+
+    Returns the path of the shard and the stats collected while writing it.
+    """
+    path = _WORKER_EXPORTER.write_xml_shard(*task)
+    return (path, _WORKER_EXPORTER.stats.take())
 
-# pylint: disable=too-many-instance-attributes
+
+# pylint: disable=too-many-instance-attributes,too-many-public-methods
 class MediaWikiXMLExporter():
     """Convert TWiki to JSON."""
 
     def __init__(self,  # pylint: disable=too-many-arguments
-                 mediawiki_json_path: str,
+                 mediawiki_json_path: Optional[str],
                  site_name: str,
                  db_name: str,
                  base_page_url: str,
                  namespace: int = 0,
                  migration_username: str = "TWiki_Migration",
-                 migration_timestamp: datetime = None):
-        """Initialize the MediaWiki exporter class."""
+                 migration_timestamp: datetime = None,
+                 mediawiki_pages: Optional[Iterable[dict]] = None,
+                 stats: Optional[Stats] = None,
+                 page_names: Optional[Set[str]] = None,
+                 num_pages: Optional[int] = None):
+        """Initialize the MediaWiki exporter class.
+
+        Pages are read from mediawiki_json_path unless mediawiki_pages is
+        given. If the names of all pages and the number of pages are given,
+        write_xml reads the pages only once. Timings and counters (including
+        the pages, revisions, moves and redirects exported) are added to
+        stats (if given).
+        """
         self.mediawiki_json_path = mediawiki_json_path
         self.site_name = site_name
         self.db_name = db_name
@@ -60,95 +112,338 @@ class MediaWikiXMLExporter():
         else:
             self.migration_timestamp = migration_timestamp
 
-        self.mediawiki_json = None
+        self.mediawiki_json = mediawiki_pages
         self.mediawiki_xml_root = None
+        self.page_names = page_names
+        self.num_pages = num_pages
+        self.stats = Stats() if stats is None else stats
+
+    def __getstate__(self) -> dict:
+        """Pickle without the pages (workers are given their shard's)."""
+        state = self.__dict__.copy()
+        state["mediawiki_json"] = None
+        state["mediawiki_xml_root"] = None
+        return state
 
     # pylint: disable=too-many-locals
     def run(self) -> None:
         """Run the conversion."""
         # Read JSON
-        with open(self.mediawiki_json_path, "r", encoding="utf-8") as file_txt:
-            self.mediawiki_json = load(file_txt)
+        self.mediawiki_json = list(self.load_mediawiki_pages())
 
         # Create XML root
         self.mediawiki_xml_root = self.generate_xml_root()
 
         # siteinfo section
-        site_info = SubElement(self.mediawiki_xml_root, 'siteinfo')
-        SubElement(site_info, 'sitename').text = self.site_name
-        SubElement(site_info, 'dbname').text = self.db_name
-        SubElement(site_info, 'base').text = self.base_page_url
-        site_info_generator = SubElement(site_info, 'generator')
-        site_info_generator.text = "twiki-to-mediawiki-xml"
-        if __version__ is not None:
-            site_info_generator.text += f" {__version__}"
-        SubElement(site_info, 'case').text = "first-letter"
-
-        # siteinfo namespaces section
-        site_info_namespaces = SubElement(site_info, 'namspaces')
-        namespaces_list = self.generate_default_namspaces_list(self.site_name)
-        for namespace_item in namespaces_list:
-            namespace = SubElement(
-                site_info_namespaces,
-                'namespace',
-                attrib=namespace_item[0])
-            if namespace_item[1] is not None:
-                namespace.text = namespace_item[1]
+        self.mediawiki_xml_root.append(self.generate_xml_site_info(
+            self.site_name, self.db_name, self.base_page_url))
 
         # pages
+        with self.stats.stage("export.page_names"):
+            page_names = self.get_page_names(self.mediawiki_json)
+        self.stats.set_total("export.pages", len(self.mediawiki_json))
         rev_counter = 1
         page_counter = 1
         for page_in in self.mediawiki_json:
-            page = self.generate_xml_page_header(
-                self.mediawiki_xml_root,
-                page_in["page_name"],
-                self.namespace,
-                page_counter
-            )
-            page_counter += 1
-
-            # Assume latest revision matches text, so use latest revision data
-            # instead of latest txt or TOPICINFO
-            last_rev = None
-            if "revisions" in page_in:
-                new_revs, rev_counter, page_counter = (
-                    self.convert_twiki_deltas_to_mw_revs(
-                        page_in["revisions"]["deltas"],
-                        self.mediawiki_xml_root, self.namespace,
-                        page_in["page_name"],
-                        self.mediawiki_json,
-                        rev_counter,
-                        page_counter))
-                for rev in new_revs:
-                    page.append(rev[0])
-                last_rev = new_revs[-1][1]
+            with self.stats.page("export.pages", page_in["page_name"]):
+                _, rev_counter, page_counter = self.generate_xml_page(
+                    self.mediawiki_xml_root, page_in, page_names,
+                    rev_counter, page_counter)
+
+    def write_xml(self, out_file: BinaryIO) -> None:
+        """Run the conversion, writing each page to a file when it is done.
+
+        Writes the same XML as get_xml_str() after run(), but only one page
+        (and its redirects) is held in memory at a time.
+        """
+        # Moves need to know every page name, so read those first (unless
+        # they were given)
+        page_names = self.page_names
+        num_pages = self.num_pages
+        if page_names is None or num_pages is None:
+            page_names = set()
+            num_pages = 0
+            with self.stats.stage("export.page_names"):
+                for page in self.load_mediawiki_pages():
+                    page_names.add(page["page_name"])
+                    num_pages += 1
+        self.stats.set_total("export.pages", num_pages)
+        self.write_xml_pages(out_file, self.load_mediawiki_pages(),
+                             page_names)
+
+    # pylint: disable=too-many-arguments
+    def write_xml_pages(self,
+                        out_file: BinaryIO,
+                        pages: Iterable[dict],
+                        page_names: Set[str],
+                        rev_counter: int = 1,
+                        page_counter: int = 1) -> None:
+        """Write a dump of pages, numbering them from the counters."""
+        xml_root = self.generate_xml_root()
+        # xmlfile would declare a prefix for the xml namespace, so use xml:
+        xml_root_attrib = {}
+        for attr_name, attr_val in xml_root.attrib.items():
+            attr_qname = QName(attr_name)
+            if attr_qname.namespace == "http://www.w3.org/XML/1998/namespace":
+                attr_name = f"xml:{attr_qname.localname}"
+            xml_root_attrib[attr_name] = attr_val
+        with xmlfile(out_file, encoding="utf-8") as xml_file:
+            with xml_file.element(xml_root.tag, attrib=xml_root_attrib,
+                                  nsmap=xml_root.nsmap):
+                self.write_xml_child(xml_file, self.generate_xml_site_info(
+                    self.site_name, self.db_name, self.base_page_url))
+
+                # Pages are generated into a scratch root and written out
+                pages_root = Element(xml_root.tag)
+                for page_in in pages:
+                    with self.stats.page("export.pages",
+                                         page_in["page_name"]):
+                        _, rev_counter, page_counter = self.generate_xml_page(
+                            pages_root, page_in, page_names, rev_counter,
+                            page_counter)
+                        for page in pages_root:
+                            self.write_xml_child(xml_file, page)
+                        pages_root.clear()
+                        xml_file.flush()
+                xml_file.write("\n")
+        out_file.write(b"\n")
+
+    def write_xml_shards(self,
+                         out_path: str,
+                         shards: Optional[int] = None,
+                         max_bytes: Optional[int] = None,
+                         jobs: int = 1) -> List[str]:
+        """Write the dump as shards, returning their paths.
+
+        Pages are split into about shards equally sized shards, or into
+        shards of up to about max_bytes. Shards are named after out_path
+        (dump.xml is written as dump-1.xml, dump-2.xml, ...) and are written
+        by jobs worker processes.
+        """
+        page_names = set()
+        page_stats = []
+        with self.stats.stage("export.page_names"):
+            for page in self.load_mediawiki_pages():
+                page_names.add(page["page_name"])
+                page_stats.append(self.get_page_stats(page))
+        self.page_names = page_names
+        self.stats.set_total("export.pages", len(page_stats))
+        if max_bytes is not None:
+            max_bytes = max(max_bytes - self.get_header_bytes(), 0)
+        shard_ranges = self.split_shards(
+            [stats[2] for stats in page_stats], shards, max_bytes)
+
+        shard_list = []
+        page_counter = 1
+        rev_counter = 1
+        for index, (start, end) in enumerate(shard_ranges):
+            shard_list.append({
+                "path": self.get_shard_path(out_path, index,
+                                            len(shard_ranges)),
+                "start": start,
+                "end": end,
+                "page_counter": page_counter,
+                "rev_counter": rev_counter,
+            })
+            for page_ids, rev_ids, _ in page_stats[start:end]:
+                page_counter += page_ids
+                rev_counter += rev_ids
+
+        tasks = self.iter_shard_tasks(shard_list)
+        jobs = resolve_jobs(jobs)
+        if jobs > 1:
+            paths = []
+            for path, worker_stats in imap_ordered(
+                    _write_shard_worker, tasks, jobs, chunksize=1,
+                    initializer=_init_exporter_worker, initargs=(self,)):
+                self.stats.merge(worker_stats)
+                paths.append(path)
+            return paths
+        return [self.write_xml_shard(*task) for task in tasks]
+
+    def iter_shard_tasks(
+            self, shard_list: List[dict]) -> Iterator[Tuple[dict, List[dict]]]:
+        """Yield each shard with its pages."""
+        pages = self.load_mediawiki_pages()
+        for shard in shard_list:
+            yield (shard, list(islice(pages, shard["end"] - shard["start"])))
+
+    def write_xml_shard(self, shard: dict, pages: List[dict]) -> str:
+        """Write a shard of pages to its file, returning its path."""
+        with open(shard["path"], "wb") as out_file:
+            self.write_xml_pages(out_file, pages, self.page_names,
+                                 shard["rev_counter"], shard["page_counter"])
+        self.stats.add("bytes_written", getsize(shard["path"]))
+        logger.info("Wrote %d pages to %s", len(pages), shard["path"])
+        return shard["path"]
+
+    def get_header_bytes(self) -> int:
+        """Get the bytes of a dump without pages, which each shard has."""
+        out_file = BytesIO()
+        self.write_xml_pages(out_file, [], set())
+        return len(out_file.getvalue())
+
+    @staticmethod
+    def get_page_stats(page: dict) -> Tuple[int, int, int]:
+        """Get the most page and revision IDs a page can use and its size.
+
+        The size is an estimate of the bytes of its XML.
+        """
+        revisions = list(iter_revisions(page))
+        moves = sum(len(revision["metas"].get("TOPICMOVED", []))
+                    for revision in revisions)
+        if "old_page_name" in page:
+            moves += 1
+        twiki_txt_bytes = len((get_twiki_txt(page) or "").encode("utf-8"))
+        size = 0
+        for revision in revisions:
+            text = get_revision_text(page, revision)
+            # Texts held as edit scripts are about the size of the head's
+            if text is None:
+                size += twiki_txt_bytes
             else:
-                if ("TOPICINFO" not in page_in["metas"] or
-                        len(page_in["metas"]["TOPICINFO"]) < 1):
-                    logger.warning('Cannot convert %s without either '
-                                   'revisions or TOPICINFO.',
-                                   page_in["page_name"])
-                    continue
-                logger.warning('Using TOPICINFO for %s since no revisions.',
+                size += len(text.encode("utf-8"))
+        size += twiki_txt_bytes * ((len(revisions) == 0) + moves)
+        size += REVISION_XML_BYTES * (max(len(revisions), 1) + 2 * moves)
+        return (1 + moves, max(len(revisions), 1) + 2 * moves, size)
+
+    @staticmethod
+    def split_shards(sizes: Sequence[int],
+                     shards: Optional[int] = None,
+                     max_bytes: Optional[int] = None) -> List[Tuple[int, int]]:
+        """Split pages by size into (start, end) ranges of shards.
+
+        There are at most shards ranges of about equal size, each up to
+        about max_bytes (unless it is a single page). There is always at
+        least one range, even if there are no pages.
+        """
+        total = sum(sizes)
+        shard_ranges = []
+        start = 0
+        shard_size = 0
+        before = 0
+        for index, size in enumerate(sizes):
+            too_big = max_bytes is not None and shard_size + size > max_bytes
+            next_share = (shards is not None and
+                          len(shard_ranges) + 1 < shards and
+                          before >= total * (len(shard_ranges) + 1) / shards)
+            if index > start and (too_big or next_share):
+                shard_ranges.append((start, index))
+                start = index
+                shard_size = 0
+            shard_size += size
+            before += size
+        shard_ranges.append((start, len(sizes)))
+        return shard_ranges
+
+    @staticmethod
+    def get_shard_path(out_path: str, index: int, count: int) -> str:
+        """Get the path of a shard, numbered from 1 and zero padded."""
+        root, ext = splitext(out_path)
+        return f"{root}-{index + 1:0{len(str(count))}d}{ext}"
+
+    @staticmethod
+    def get_page_names(pages: Iterable[dict]) -> Set[str]:
+        """Get the names of all pages, to check moves against."""
+        return {page["page_name"] for page in pages}
+
+    def load_mediawiki_pages(self) -> Iterator[dict]:
+        """Read the MediaWiki pages, unless they were given."""
+        if self.mediawiki_json is not None:
+            return iter(self.mediawiki_json)
+        self.stats.add("bytes_read", getsize(self.mediawiki_json_path))
+        return load_pages(self.mediawiki_json_path)
+
+    @staticmethod
+    def write_xml_child(xml_file: xmlfile, element: Element) -> None:
+        """Write a pretty printed child of the root to an XML file."""
+        indent(element, level=1)
+        xml_file.write("\n  ")
+        xml_file.write(element)
+
+    # pylint: disable=too-many-arguments
+    def generate_xml_page(self,
+                          xml_root: Element,
+                          page_in: dict,
+                          page_names: Set[str],
+                          rev_counter: int,
+                          page_counter: int) -> Tuple[Element, int, int]:
+        """Generate a page element (and any redirect pages) in xml_root."""
+        start_rev_counter = rev_counter
+        start_page_counter = page_counter
+        page, rev_counter, page_counter = self.generate_xml_page_revisions(
+            xml_root, page_in, page_names, rev_counter, page_counter)
+        # Every move adds a move revision and a redirect page with its own
+        # revision
+        redirects = page_counter - start_page_counter - 1
+        self.stats.add("pages")
+        self.stats.add("revisions", rev_counter - start_rev_counter)
+        self.stats.add("moves", redirects)
+        self.stats.add("redirects", redirects)
+        return (page, rev_counter, page_counter)
+
+    # pylint: disable=too-many-arguments
+    def generate_xml_page_revisions(
+            self,
+            xml_root: Element,
+            page_in: dict,
+            page_names: Set[str],
+            rev_counter: int,
+            page_counter: int) -> Tuple[Element, int, int]:
+        """Generate a page element with its revisions and any redirects."""
+        resolve_text_blobs(page_in)
+        page = self.generate_xml_page_header(
+            xml_root,
+            page_in["page_name"],
+            self.namespace,
+            page_counter
+        )
+        page_counter += 1
+
+        # Assume latest revision matches text, so use latest revision data
+        # instead of latest txt or TOPICINFO
+        last_rev = None
+        if "revisions" in page_in:
+            new_revs, rev_counter, page_counter = (
+                self.convert_twiki_deltas_to_mw_revs(
+                    page_in["revisions"]["deltas"],
+                    xml_root, self.namespace,
+                    page_in["page_name"],
+                    page_names,
+                    rev_counter,
+                    page_counter,
+                    RevisionTexts(page_in["revisions"])))
+            for rev in new_revs:
+                page.append(rev[0])
+            last_rev = new_revs[-1][1]
+        else:
+            if ("TOPICINFO" not in page_in["metas"] or
+                    len(page_in["metas"]["TOPICINFO"]) < 1):
+                logger.warning('Cannot convert %s without either '
+                               'revisions or TOPICINFO.',
                                page_in["page_name"])
-                if len(page_in["metas"]["TOPICINFO"]) > 1:
-                    logger.warning('Page %s has multiple TOPICINFO, using '
-                                   'first one.', page_in["page_name"])
-                revision = self.convert_twiki_page_to_mw_rev(
-                    page_in, rev_counter, None)
-                rev_counter += 1
-                last_rev = revision[1]
-                page.append(revision[0])
-
-            if "old_page_name" in page_in and last_rev is not None:
-                old_name = page_in["old_page_name"]
-                new_name = page_in["page_name"]
-                rev_name, rev_counter, page_counter = (
-                    self.convert_twiki_deltas_to_mw_move(
-                        last_rev, old_name, new_name, self.mediawiki_xml_root,
-                        self.namespace, self.migration_username,
-                        self.migration_timestamp, rev_counter, page_counter))
-                page.append(rev_name[0])
+                return (page, rev_counter, page_counter)
+            logger.warning('Using TOPICINFO for %s since no revisions.',
+                           page_in["page_name"])
+            if len(page_in["metas"]["TOPICINFO"]) > 1:
+                logger.warning('Page %s has multiple TOPICINFO, using '
+                               'first one.', page_in["page_name"])
+            revision = self.convert_twiki_page_to_mw_rev(
+                page_in, rev_counter, None)
+            rev_counter += 1
+            last_rev = revision[1]
+            page.append(revision[0])
+
+        if "old_page_name" in page_in and last_rev is not None:
+            old_name = page_in["old_page_name"]
+            new_name = page_in["page_name"]
+            rev_name, rev_counter, page_counter = (
+                self.convert_twiki_deltas_to_mw_move(
+                    last_rev, old_name, new_name, xml_root,
+                    self.namespace, self.migration_username,
+                    self.migration_timestamp, rev_counter, page_counter))
+            page.append(rev_name[0])
+        return (page, rev_counter, page_counter)
 
     def get_xml_str(self) -> str:
         """Get converted XML as string."""
@@ -181,6 +476,34 @@ class MediaWikiXMLExporter():
             }
         )
 
+    @staticmethod
+    def generate_xml_site_info(site_name: str,
+                               db_name: str,
+                               base_page_url: str) -> Element:
+        """Generate the MediaWiki siteinfo section."""
+        site_info = Element('siteinfo')
+        SubElement(site_info, 'sitename').text = site_name
+        SubElement(site_info, 'dbname').text = db_name
+        SubElement(site_info, 'base').text = base_page_url
+        site_info_generator = SubElement(site_info, 'generator')
+        site_info_generator.text = "twiki-to-mediawiki-xml"
+        if get_version() is not None:
+            site_info_generator.text += f" {get_version()}"
+        SubElement(site_info, 'case').text = "first-letter"
+
+        # siteinfo namespaces section
+        site_info_namespaces = SubElement(site_info, 'namspaces')
+        namespaces_list = (
+            MediaWikiXMLExporter.generate_default_namspaces_list(site_name))
+        for namespace_item in namespaces_list:
+            namespace = SubElement(
+                site_info_namespaces,
+                'namespace',
+                attrib=namespace_item[0])
+            if namespace_item[1] is not None:
+                namespace.text = namespace_item[1]
+        return site_info
+
     @staticmethod
     def generate_xml_page_header(
             xml_root: Element,
@@ -284,10 +607,20 @@ class MediaWikiXMLExporter():
         })
 
     @staticmethod
-    def convert_twiki_rev_to_mw_rev(twiki_revision: dict, rev_id: int,
-                                    parent_id: int = None
-                                    ) -> Tuple[Element, dict]:
-        """Convert a TWiki revision to a MediaWiki revision."""
+    def convert_twiki_rev_to_mw_rev(
+            twiki_revision: dict, rev_id: int,
+            parent_id: int = None,
+            revision_texts: Optional[RevisionTexts] = None
+    ) -> Tuple[Element, dict]:
+        """Convert a TWiki revision to a MediaWiki revision.
+
+        The text is taken from revision_texts if given, so revisions that only
+        hold an edit script can be converted.
+        """
+        if revision_texts is None:
+            text = twiki_revision["text"]
+        else:
+            text = revision_texts.get_text(twiki_revision)
         timestamp = (
             MediaWikiXMLExporter.parse_twiki_delta_date(twiki_revision["date"])
         )
@@ -296,7 +629,7 @@ class MediaWikiXMLExporter():
             # datetime.utcfromtimestamp(int(twiki_revision["date"])),
             timestamp,
             {"username": twiki_revision["author"]},
-            twiki_revision["text"],
+            text,
             parent_id
         )
 
@@ -322,17 +655,18 @@ class MediaWikiXMLExporter():
             mediawiki_xml_root: dict,
             namespace: int,
             new_page_name: str,
-            all_pages: list,
+            page_names: Set[str],
             rev_counter: int,
-            page_counter: int
+            page_counter: int,
+            revision_texts: Optional[RevisionTexts] = None
     ) -> Tuple[List[Tuple[Element, dict]], int, int]:
         """Convert TWiki deltas to MediaWiki revisions."""
         out = []
         deltas_sorted = sorted(
             deltas,
-            key=lambda rev: parse_version(rev['revision']))
+            key=lambda rev: get_rcs_revision_key(rev['revision']))
         revision_mapping = {}
-        moves_handled = []
+        moves_handled = set()
         last_rev = None
         for delta in deltas_sorted:
             parent_id = None
@@ -340,7 +674,7 @@ class MediaWikiXMLExporter():
                 parent_id = revision_mapping[delta["next"]]
 
             revision = MediaWikiXMLExporter.convert_twiki_rev_to_mw_rev(
-                delta, rev_counter, parent_id)
+                delta, rev_counter, parent_id, revision_texts)
             last_rev = revision[1]
             revision_mapping[delta["revision"]] = rev_counter
             rev_counter += 1
@@ -355,13 +689,12 @@ class MediaWikiXMLExporter():
                         old_name = meta_moved["from"].split(".")[1]
                         new_name = meta_moved["to"].split(".")[1]
                         username = meta_moved["by"]
-                        moves_handled.append(move_date_int)
+                        moves_handled.add(move_date_int)
                         if old_name == new_name:
                             logger.warning("Ignoring move between wikis, %s "
                                            "(%s)", new_name, new_page_name)
                             continue
-                        if any(page['page_name'] == old_name for page in
-                               all_pages):
+                        if old_name in page_names:
                             logger.warning("Ignoring move from %s to %s "
                                            "because old name exists as page "
                                            "(%s)",
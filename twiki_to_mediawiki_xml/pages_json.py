@@ -0,0 +1,64 @@
+"""
+pages_json.py: Read and write pages as JSON or NDJSON.
+
+Created by AB Tech on 2026-10-16.
+This file is part of the https://github.com/ABTech/twiki-to-mediawiki-xml
+
+Copyright (C) 2022-present  AB Tech, Carnegie Mellon University
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# The intermediate files between tools are either a JSON array of pages
+# (json) or line-delimited JSON with one page per line (ndjson). NDJSON can
+# be written and read one page at a time, so memory is bounded by the
+# largest page instead of the whole web.
+
+from json import dumps, load, loads
+from typing import Iterable, Iterator, TextIO
+
+PAGES_FORMATS = ("json", "ndjson")
+
+
+def load_pages(pages_path: str) -> Iterator[dict]:
+    """Read pages from a JSON or NDJSON file.
+
+    The format is detected from the first character of the file. NDJSON is
+    read one line at a time.
+    """
+    with open(pages_path, "r", encoding="utf-8") as file_pages:
+        first_char = file_pages.read(1)
+        while first_char.isspace():
+            first_char = file_pages.read(1)
+        file_pages.seek(0)
+        if first_char == "[":
+            yield from load(file_pages)
+            return
+        for line in file_pages:
+            if line.strip() != "":
+                yield loads(line)
+
+
+def dump_pages(pages: Iterable[dict], out_file: TextIO,
+               pages_format: str = "json") -> None:
+    """Write pages to a file as JSON or NDJSON."""
+    if pages_format == "ndjson":
+        for page in pages:
+            out_file.write(dumps(page))
+            out_file.write("\n")
+    elif pages_format == "json":
+        out_file.write(dumps(list(pages), indent=4))
+        out_file.write("\n")
+    else:
+        raise ValueError(f"Unknown pages format {pages_format}")
@@ -0,0 +1,119 @@
+"""
+parallel.py: Process pool helpers.
+
+Created by AB Tech on 2026-10-16.
+This file is part of the https://github.com/ABTech/twiki-to-mediawiki-xml
+
+Copyright (C) 2022-present  AB Tech, Carnegie Mellon University
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# The process pool modules are imported when a pool is first used, since
+# importing them takes longer than starting the CLI otherwise and most runs
+# only use one process.
+
+from collections import deque
+from itertools import islice
+from logging import Handler, LogRecord, getLogger
+from os import cpu_count
+from typing import Any, Callable, Iterable, Iterator, List, Optional
+
+DEFAULT_CHUNKSIZE = 16
+
+
+class ForwardLogHandler(Handler):
+    """Hand log records from worker processes to the parent's loggers."""
+
+    def emit(self, record: LogRecord) -> None:
+        """Forward a record to the logger of the same name."""
+        record_logger = getLogger(record.name)
+        if record_logger.isEnabledFor(record.levelno):
+            record_logger.handle(record)
+
+
+def resolve_jobs(jobs: int) -> int:
+    """Return the number of worker processes, 0 or less meaning all CPUs."""
+    if jobs < 1:
+        return cpu_count() or 1
+    return jobs
+
+
+def _init_worker(log_queue: Any, log_level: int,
+                 initializer: Optional[Callable], initargs: tuple) -> None:
+    """Send worker log records to the parent and run the initializer."""
+    # pylint: disable=import-outside-toplevel
+    from logging.handlers import QueueHandler
+    root_logger = getLogger()
+    root_logger.handlers = [QueueHandler(log_queue)]
+    root_logger.setLevel(log_level)
+    if initializer is not None:
+        initializer(*initargs)
+
+
+def _run_chunk(func: Callable, chunk: List[Any]) -> List[Any]:
+    """Run func over a chunk of items in a worker."""
+    return [func(item) for item in chunk]
+
+
+def _iter_chunks(items: Iterable[Any], chunksize: int) -> Iterator[List[Any]]:
+    """Split items into lists of up to chunksize items."""
+    items = iter(items)
+    while True:
+        chunk = list(islice(items, chunksize))
+        if len(chunk) == 0:
+            return
+        yield chunk
+
+
+# pylint: disable=too-many-arguments,too-many-locals
+def imap_ordered(func: Callable,
+                 items: Iterable[Any],
+                 jobs: int,
+                 chunksize: int = DEFAULT_CHUNKSIZE,
+                 initializer: Optional[Callable] = None,
+                 initargs: tuple = ()) -> Iterator[Any]:
+    """Map func over items in a process pool, yielding results in order.
+
+    Items are submitted in chunks and only a few chunks per worker are in
+    flight at once, so items can be a generator. func and initializer must be
+    picklable (module-level functions). Worker log records are forwarded to
+    the loggers of this process.
+    """
+    # pylint: disable=import-outside-toplevel
+    from concurrent.futures import ProcessPoolExecutor
+    from logging.handlers import QueueListener
+    from multiprocessing import get_context
+    context = get_context()
+    log_queue = context.Queue()
+    listener = QueueListener(log_queue, ForwardLogHandler())
+    listener.start()
+    try:
+        with ProcessPoolExecutor(
+                max_workers=jobs,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(log_queue, getLogger().getEffectiveLevel(),
+                          initializer, initargs)) as executor:
+            chunks = _iter_chunks(items, chunksize)
+            pending = deque(
+                executor.submit(_run_chunk, func, chunk)
+                for chunk in islice(chunks, jobs * 2))
+            while len(pending) > 0:
+                results = pending.popleft().result()
+                for chunk in islice(chunks, 1):
+                    pending.append(executor.submit(_run_chunk, func, chunk))
+                yield from results
+    finally:
+        listener.stop()
@@ -0,0 +1,136 @@
+"""
+parse_cache.py: Persistent cache of parsed TWiki pages.
+
+Created by AB Tech on 2026-10-16.
+This file is part of the https://github.com/ABTech/twiki-to-mediawiki-xml
+
+Copyright (C) 2022-present  AB Tech, Carnegie Mellon University
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# Entries are keyed on the .txt path and store a key made of the mtime,
+# size and SHA-256 of both the .txt and ,v files plus the parser settings.
+# An entry is only used if the key still matches, so changing either file
+# (or how the parser is run) invalidates it.
+
+from hashlib import sha256
+from json import dumps, loads
+from logging import Filter, LogRecord
+from os import makedirs, stat
+from os.path import exists, join
+from sqlite3 import Connection, connect
+from typing import List, Optional
+from zlib import compress, decompress
+
+CACHE_FILE_NAME = "parse_cache.sqlite3"
+CACHE_FORMAT = 2
+
+
+class LogCapture(Filter):  # pylint: disable=too-few-public-methods
+    """Capture log records so they can be repeated for cached pages.
+
+    Added to a logger as a filter, so records are still handled as usual
+    (including by logging.lastResort if no handlers are configured).
+    """
+
+    def __init__(self):
+        """Initialize with no records."""
+        super().__init__()
+        self.records: List[list] = []
+
+    def filter(self, record: LogRecord) -> bool:
+        """Keep the level and formatted message of a record, passing it on.
+
+        The message is formatted now since its arguments (like exceptions)
+        may not be JSON serializable.
+        """
+        self.records.append([record.levelno, record.getMessage()])
+        return True
+
+
+class ParseCache():
+    """Cache parsed TWiki pages in a SQLite database in a directory."""
+
+    def __init__(self, cache_dir: str, settings: dict):
+        """Initialize the cache with the settings that affect parsing."""
+        self.cache_dir = cache_dir
+        self.settings = dumps({"cache_format": CACHE_FORMAT, **settings},
+                              sort_keys=True)
+        self.connection = None
+
+    def __getstate__(self) -> dict:
+        """Pickle without the connection (each process opens its own)."""
+        state = self.__dict__.copy()
+        state["connection"] = None
+        return state
+
+    def connect(self) -> Connection:
+        """Open the cache database if it is not already open."""
+        if self.connection is None:
+            makedirs(self.cache_dir, exist_ok=True)
+            self.connection = connect(join(self.cache_dir, CACHE_FILE_NAME),
+                                      timeout=60)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                "twiki_txt_path TEXT PRIMARY KEY, "
+                "file_key TEXT NOT NULL, "
+                "entry BLOB NOT NULL)")
+            self.connection.commit()
+        return self.connection
+
+    def get_file_key(self, twiki_txt_path: str) -> str:
+        """Get the key of a page's current files and parser settings."""
+        file_key = [self.settings]
+        for path in (twiki_txt_path, f'{twiki_txt_path},v'):
+            if not exists(path):
+                file_key.append(None)
+                continue
+            path_stat = stat(path)
+            path_hash = sha256()
+            with open(path, "rb") as file_in:
+                while True:
+                    block = file_in.read(1 << 20)
+                    if len(block) == 0:
+                        break
+                    path_hash.update(block)
+            file_key.append([path_stat.st_mtime_ns, path_stat.st_size,
+                             path_hash.hexdigest()])
+        return dumps(file_key)
+
+    def get(self, twiki_txt_path: str, file_key: str) -> Optional[dict]:
+        """Get a cached entry if its key matches, otherwise None."""
+        row = self.connect().execute(
+            "SELECT entry FROM pages WHERE twiki_txt_path = ? AND "
+            "file_key = ?", (twiki_txt_path, file_key)).fetchone()
+        if row is None:
+            return None
+        return loads(decompress(row[0]))
+
+    def has(self, twiki_txt_path: str, file_key: str) -> bool:
+        """Check if there is a cached entry whose key matches."""
+        row = self.connect().execute(
+            "SELECT 1 FROM pages WHERE twiki_txt_path = ? AND "
+            "file_key = ?", (twiki_txt_path, file_key)).fetchone()
+        return row is not None
+
+    def put(self, twiki_txt_path: str, file_key: str, entry: dict) -> None:
+        """Store an entry, replacing any older entry for the page."""
+        connection = self.connect()
+        connection.execute(
+            "INSERT OR REPLACE INTO pages (twiki_txt_path, file_key, entry) "
+            "VALUES (?, ?, ?)",
+            (twiki_txt_path, file_key, compress(dumps(entry).encode())))
+        connection.commit()
@@ -0,0 +1,200 @@
+"""
+rcs.py: Pure-Python RCS revision checkout.
+
+Created by AB Tech on 2026-10-16.
+This file is part of the https://github.com/ABTech/twiki-to-mediawiki-xml
+
+Copyright (C) 2022-present  AB Tech, Carnegie Mellon University
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# RCS stores the head revision of the trunk as full text and every older
+# trunk revision as a reverse delta: an edit script (the same format as
+# `diff -n`) that turns the next newer revision into the older one. Walking
+# the `next` chain from the head and applying each script in turn yields
+# every trunk revision from a single parse of the ,v file, instead of one
+# `co` process (which re-parses the whole file) per revision.
+#
+# Keyword expansion is not performed. TWiki writes its ,v files with
+# `expand @o@` (or `@b@`), so this matches `co`; for other files `co` can be
+# used to check the output.
+
+from functools import lru_cache
+from re import compile as re_compile
+from typing import Iterator, List, Optional, Tuple
+
+from editrcs import Rcs, RcsError
+
+RCS_EDIT_COMMAND = re_compile(r'([ad])([0-9]+) ([0-9]+)\n?')
+RCS_REVISION_KEY_CACHE_SIZE = 4096
+
+# A trunk revision, its text and (optionally) its edit script
+TrunkText = Tuple[str, str, Optional[str]]
+
+
+@lru_cache(maxsize=RCS_REVISION_KEY_CACHE_SIZE)
+def get_rcs_revision_key(revision: str) -> Tuple[int, ...]:
+    """Get a key to sort RCS revision numbers by (1.9 before 1.10)."""
+    try:
+        return tuple(int(number) for number in revision.split("."))
+    except ValueError as error:
+        raise RcsError(f"Invalid RCS revision number '{revision}'") from error
+
+
+def split_rcs_lines(text: str) -> List[str]:
+    """Split text into lines, keeping line endings.
+
+    Only newlines end a line in RCS, unlike with str.splitlines().
+    """
+    lines = text.split('\n')
+    last_line = lines.pop()
+    out = [f"{line}\n" for line in lines]
+    if last_line != "":
+        out.append(last_line)
+    return out
+
+
+def apply_rcs_edit_script(source: str, edit_script: str) -> str:
+    """Apply an RCS edit script to the text of a revision.
+
+    Commands are 'dL N' (delete N lines starting at line L) and 'aL N'
+    (append the N following lines of the script after line L). Line numbers
+    refer to the source text and commands are in increasing order.
+    """
+    source_lines = split_rcs_lines(source)
+    script_lines = split_rcs_lines(edit_script)
+    out = []
+    source_pos = 0  # Index of the next source line to copy
+    script_pos = 0
+    while script_pos < len(script_lines):
+        command = RCS_EDIT_COMMAND.fullmatch(script_lines[script_pos])
+        if command is None:
+            raise RcsError(
+                f"Invalid RCS edit command '{script_lines[script_pos]}'")
+        script_pos += 1
+        line, count = int(command[2]), int(command[3])
+        if command[1] == 'd':
+            start = line - 1
+            if start < source_pos or start + count > len(source_lines):
+                raise RcsError(f"RCS delete out of range 'd{line} {count}'")
+            out.extend(source_lines[source_pos:start])
+            source_pos = start + count
+        else:
+            if line < source_pos or line > len(source_lines):
+                raise RcsError(f"RCS append out of range 'a{line} {count}'")
+            if script_pos + count > len(script_lines):
+                raise RcsError(f"RCS append too short 'a{line} {count}'")
+            out.extend(source_lines[source_pos:line])
+            source_pos = line
+            out.extend(script_lines[script_pos:script_pos + count])
+            script_pos += count
+    out.extend(source_lines[source_pos:])
+    return "".join(out)
+
+
+def make_rcs_edit_script(source: str, target: str) -> str:
+    """Make an RCS edit script that turns source into target."""
+    # Imported here since only the deltas texts mode (and its CR edit
+    # scripts) needs it
+    # pylint: disable=import-outside-toplevel
+    from difflib import SequenceMatcher
+    source_lines = split_rcs_lines(source)
+    target_lines = split_rcs_lines(target)
+    opcodes = SequenceMatcher(None, source_lines,
+                              target_lines).get_opcodes()
+    if (target != "" and not target.endswith("\n") and
+            opcodes[-1][0] == "delete"):
+        # The last line of target has no newline, so it has to be the end of
+        # the script: replace from its opcode to the end of source instead
+        last = max(i for i, opcode in enumerate(opcodes)
+                   if opcode[0] != "delete")
+        opcodes[last:] = [("replace", opcodes[last][1], len(source_lines),
+                           opcodes[last][3], len(target_lines))]
+    edit_script = []
+    for tag, source_start, source_end, target_start, target_end in opcodes:
+        if tag in ("replace", "delete"):
+            edit_script.append(
+                f"d{source_start + 1} {source_end - source_start}\n")
+        if tag in ("replace", "insert"):
+            edit_script.append(
+                f"a{source_end} {target_end - target_start}\n")
+            edit_script.extend(target_lines[target_start:target_end])
+    return "".join(edit_script)
+
+
+def normalize_newlines(text: str) -> str:
+    """Translate CRLF and CR line endings to LF, like reading in text mode."""
+    return text.replace("\r\n", "\n").replace("\r", "\n")
+
+
+def iter_rcs_trunk_texts(rcs: Rcs,
+                         edit_scripts: bool = False) -> Iterator[TrunkText]:
+    """Yield (revision, text, edit_script) for the trunk, from the head.
+
+    Texts have their line endings normalized like the .txt file and co
+    output, while the edit scripts are applied to the texts as stored (RCS
+    only counts LF as a line ending). If edit_scripts is set, edit_script
+    turns the text yielded before into this one (None for the head); it is
+    made again from the normalized texts if a stored text or script has a
+    CR. Otherwise edit_script is always None.
+    Revisions on branches are forward deltas and are not yielded.
+    """
+    deltas = {}
+    rcs.mapDeltas(lambda delta: deltas.setdefault(delta.getRevision(), delta))
+    revision = rcs.getHead()
+    if revision not in deltas:
+        return
+    raw_text = deltas[revision].getText()
+    text = normalize_newlines(raw_text)
+    edit_script = None
+    seen = set()
+    while True:
+        seen.add(revision)
+        yield (revision, text, edit_script)
+        revision = deltas[revision].getNext()
+        if revision == "" or revision is None:
+            break
+        if revision not in deltas or revision in seen:
+            raise RcsError(f"Broken RCS next chain at revision {revision}")
+        raw_edit_script = deltas[revision].getText()
+        newer_raw_text, newer_text = raw_text, text
+        raw_text = apply_rcs_edit_script(newer_raw_text, raw_edit_script)
+        text = normalize_newlines(raw_text)
+        if not edit_scripts:
+            edit_script = None
+        elif "\r" in newer_raw_text or "\r" in raw_edit_script:
+            edit_script = make_rcs_edit_script(newer_text, text)
+        else:
+            edit_script = raw_edit_script
+
+
+def get_co_command(co_path: str, twiki_v_path: str,
+                   revision: str) -> List[str]:
+    """Get the co command that prints a revision's text."""
+    return [co_path, "-q", f"-p{revision}", twiki_v_path]
+
+
+def decode_co_output(output: bytes) -> str:
+    """Decode the output of co like check_output(text=True) does."""
+    return normalize_newlines(output.decode("cp1252"))
+
+
+def co_checkout(co_path: str, twiki_v_path: str, revision: str) -> str:
+    """Check out a revision's text with the RCS co command."""
+    # Imported here since only checkouts with co need it
+    # pylint: disable=import-outside-toplevel
+    from subprocess import check_output  # nosec B404
+    cmd = get_co_command(co_path, twiki_v_path, revision)
+    return decode_co_output(check_output(cmd))  # nosec B603
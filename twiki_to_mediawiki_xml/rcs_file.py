@@ -0,0 +1,319 @@
+"""
+rcs_file.py: Memory-mapped reading of RCS ,v files.
+
+Created by AB Tech on 2026-10-16.
+This file is part of the https://github.com/ABTech/twiki-to-mediawiki-xml
+
+Copyright (C) 2022-present  AB Tech, Carnegie Mellon University
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# editrcs parses a ,v file from a str, so the whole file has to be decoded
+# first and every log and text is copied out of it while parsing. RcsFile
+# memory-maps the file and parses its structure (see rcsfile(5)) on bytes,
+# only keeping the offsets of the @-quoted strings. Logs and texts are
+# decoded from cp1252 when they are asked for, so texts that are never used
+# (like branch deltas when co is used for them) are never decoded. Line
+# endings are kept as stored, since edit scripts only count LF as one.
+#
+# RcsFile and RcsFileDelta have the getters of editrcs's Rcs and RcsDelta
+# (returning the same values) so they can be used in their place.
+# Unknown phrases (newphrase in rcsfile(5)) are skipped.
+
+# pylint: disable=invalid-name
+
+from mmap import ACCESS_READ, mmap
+from re import compile as re_compile
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from editrcs import RcsError
+
+RCS_ENCODING = "cp1252"
+# A word (num, id or sym), a colon, a semicolon or the start of a string
+RCS_TOKEN = re_compile(
+    rb'[ \x08\t\n\x0b\x0c\r]*'
+    rb'(?:([^ \x08\t\n\x0b\x0c\r$,:;@]+)|([:;])|(@))')
+RCS_NUM = re_compile(rb'[0-9.]+')
+RCS_DELTA_KEYWORDS = (b"date", b"author", b"state", b"branches", b"next")
+
+# A string is kept as the (start, end) offsets of its quoted contents
+RcsString = Tuple[int, int]
+RcsValue = Union[bytes, RcsString]
+
+
+class RcsFileDelta():
+    """A delta of a memory-mapped RCS file."""
+
+    def __init__(self, rcs_file: "RcsFile", revision: str,
+                 phrases: Dict[bytes, List[RcsValue]]):
+        """Initialize a delta from the phrases of its delta node."""
+        self.rcs_file = rcs_file
+        self.revision = revision
+        self.phrases = phrases
+        self.log = None
+        self.text = None
+
+    def getRevision(self) -> str:
+        """Get the revision number."""
+        return self.revision
+
+    def getCommitId(self) -> Optional[str]:
+        """Get the commit ID (if any)."""
+        return self.rcs_file.get_word(self.phrases, b"commitid", None)
+
+    def getDate(self) -> str:
+        """Get the date (as in the file, like 2022.05.22.12.00.00)."""
+        return self.rcs_file.get_word(self.phrases, b"date")
+
+    def getAuthor(self) -> str:
+        """Get the author."""
+        return self.rcs_file.get_word(self.phrases, b"author")
+
+    def getState(self) -> str:
+        """Get the state, or "" if there is none."""
+        return self.rcs_file.get_word(self.phrases, b"state")
+
+    def getBranches(self) -> List[str]:
+        """Get the first revisions of the branches from this delta."""
+        return self.rcs_file.get_words(self.phrases, b"branches")
+
+    def getNext(self) -> str:
+        """Get the next revision (the previous one on the trunk) or ""."""
+        return self.rcs_file.get_word(self.phrases, b"next")
+
+    def getLog(self) -> str:
+        """Get the log message, decoding it."""
+        if self.log is None:
+            raise RcsError(f"No deltatext for revision {self.revision}")
+        return self.rcs_file.decode_string(self.log)
+
+    def getText(self) -> str:
+        """Get the text (or edit script if not the head), decoding it."""
+        if self.text is None:
+            raise RcsError(f"No deltatext for revision {self.revision}")
+        return self.rcs_file.decode_string(self.text)
+
+
+class RcsFile():  # pylint: disable=too-many-public-methods
+    """A memory-mapped RCS file.
+
+    Use as a context manager; logs and texts can only be read while the file
+    is open.
+    """
+
+    def __init__(self, rcs_path: str):
+        """Memory-map an RCS file and parse its structure."""
+        self.rcs_path = rcs_path
+        self.data = None
+        self.pos = 0
+        self.admin = {}
+        self.deltas = []
+        self.desc = None
+        with open(rcs_path, "rb") as file_v:
+            try:
+                self.data = mmap(file_v.fileno(), 0, access=ACCESS_READ)
+            except ValueError as error:
+                raise RcsError(f"Cannot map {rcs_path}: {error}") from error
+        try:
+            self.parse()
+        except RcsError:
+            self.close()
+            raise
+
+    def __enter__(self) -> "RcsFile":
+        """Return the file."""
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """Close the file."""
+        self.close()
+
+    def close(self) -> None:
+        """Unmap the file."""
+        if self.data is not None:
+            self.data.close()
+            self.data = None
+
+    def parse(self) -> None:
+        """Parse the admin, delta, desc and deltatext sections."""
+        self.admin = self.read_phrases()
+        if b"head" not in self.admin:
+            raise self.error("missing 'head'")
+        deltas_by_rev = {}
+        while self.peek_token() != b"desc":
+            revision = self.read_num()
+            if revision in deltas_by_rev:
+                raise RcsError(f"Duplicate revision {revision} in "
+                               f"{self.rcs_path}")
+            phrases = self.read_phrases()
+            for keyword in RCS_DELTA_KEYWORDS:
+                if keyword not in phrases:
+                    raise self.error(f"missing '{keyword.decode()}' for "
+                                     f"revision {revision}")
+            delta = RcsFileDelta(self, revision, phrases)
+            deltas_by_rev[revision] = delta
+            self.deltas.append(delta)
+
+        self.read_keyword(b"desc")
+        self.desc = self.read_string()
+
+        while self.peek_token() is not None:
+            revision = self.read_num()
+            if revision not in deltas_by_rev:
+                raise RcsError(f"Deltatext for unknown revision {revision} "
+                               f"in {self.rcs_path}")
+            delta = deltas_by_rev[revision]
+            self.read_keyword(b"log")
+            delta.log = self.read_string()
+            while self.read_token() != b"text":
+                # Skip a newphrase
+                while self.read_value() != b";":
+                    pass
+            delta.text = self.read_string()
+
+    def error(self, msg: str) -> RcsError:
+        """Make a syntax error at the current offset."""
+        return RcsError(f"Syntax error in {self.rcs_path}: {msg} at offset "
+                        f"{self.pos}")
+
+    def read_token(self) -> bytes:
+        """Read a word, ':', ';' or '@' (the start of a string)."""
+        token = RCS_TOKEN.match(self.data, self.pos)
+        if token is None:
+            raise self.error("expected a token")
+        self.pos = token.end()
+        return token[token.lastindex]
+
+    def peek_token(self) -> Optional[bytes]:
+        """Get the next token without reading it, or None at the end."""
+        token = RCS_TOKEN.match(self.data, self.pos)
+        if token is None:
+            return None
+        return token[token.lastindex]
+
+    def read_keyword(self, keyword: bytes) -> None:
+        """Read a keyword."""
+        if self.read_token() != keyword:
+            raise self.error(f"expected '{keyword.decode()}'")
+
+    def read_num(self) -> str:
+        """Read a revision number."""
+        token = self.read_token()
+        if RCS_NUM.fullmatch(token) is None:
+            raise self.error("expected a revision number")
+        return token.decode(RCS_ENCODING)
+
+    def read_string(self) -> RcsString:
+        """Read an @-quoted string, returning the offsets of its contents."""
+        if self.read_token() != b"@":
+            raise self.error("expected a string")
+        start = self.pos
+        end = self.data.find(b"@", start)
+        while end != -1 and self.data[end + 1:end + 2] == b"@":
+            end = self.data.find(b"@", end + 2)
+        if end == -1:
+            raise self.error("unterminated string")
+        self.pos = end + 1
+        return (start, end)
+
+    def read_value(self) -> RcsValue:
+        """Read a token, or a string if it starts one."""
+        if self.peek_token() == b"@":
+            return self.read_string()
+        return self.read_token()
+
+    def read_phrases(self) -> Dict[bytes, List[RcsValue]]:
+        """Read 'keyword value... ;' phrases up to a revision or desc."""
+        phrases = {}
+        while True:
+            keyword = self.peek_token()
+            if keyword is None:
+                raise self.error("expected a phrase")
+            if keyword == b"desc" or RCS_NUM.fullmatch(keyword) is not None:
+                return phrases
+            self.read_token()
+            values = []
+            value = self.read_value()
+            while value != b";":
+                values.append(value)
+                value = self.read_value()
+            phrases[keyword] = values
+
+    def decode_string(self, string: RcsString) -> str:
+        """Decode and unquote a string."""
+        start, end = string
+        return self.data[start:end].replace(b"@@", b"@").decode(RCS_ENCODING)
+
+    def get_words(self, phrases: Dict[bytes, List[RcsValue]],
+                  keyword: bytes) -> List[str]:
+        """Get the decoded words of a phrase (none if it is missing)."""
+        return [value.decode(RCS_ENCODING)
+                for value in phrases.get(keyword, [])
+                if isinstance(value, bytes) and value != b":"]
+
+    def get_word(self, phrases: Dict[bytes, List[RcsValue]],
+                 keyword: bytes, default: Optional[str] = "") -> Optional[str]:
+        """Get the decoded word of a phrase, or default if there is none."""
+        words = self.get_words(phrases, keyword)
+        if len(words) == 0:
+            return default
+        return words[0]
+
+    def get_map(self, keyword: bytes) -> Dict[str, str]:
+        """Get the decoded 'name:num' pairs of an admin phrase."""
+        words = self.get_words(self.admin, keyword)
+        return dict(zip(words[0::2], words[1::2]))
+
+    def get_admin_string(self, keyword: bytes) -> Optional[str]:
+        """Get the decoded string of an admin phrase (if any)."""
+        for value in self.admin.get(keyword, []):
+            if isinstance(value, tuple):
+                return self.decode_string(value)
+        return None
+
+    def getHead(self) -> str:
+        """Get the head revision, or "" if there is none."""
+        return self.get_word(self.admin, b"head")
+
+    def getBranch(self) -> Optional[str]:
+        """Get the default branch (if any)."""
+        if b"branch" not in self.admin:
+            return None
+        return self.get_word(self.admin, b"branch")
+
+    def getAccess(self) -> str:
+        """Get the space separated users that may modify the file."""
+        return " ".join(self.get_words(self.admin, b"access"))
+
+    def getSymbols(self) -> Dict[str, str]:
+        """Get the symbolic names of revisions."""
+        return self.get_map(b"symbols")
+
+    def getLocks(self) -> Dict[str, str]:
+        """Get the locked revisions by user."""
+        return self.get_map(b"locks")
+
+    def getComment(self) -> Optional[str]:
+        """Get the comment leader (if any)."""
+        return self.get_admin_string(b"comment")
+
+    def getDesc(self) -> str:
+        """Get the description, decoding it."""
+        return self.decode_string(self.desc)
+
+    def mapDeltas(self, apply_fn: Callable[[RcsFileDelta], None]) -> None:
+        """Call apply_fn on every delta, in file order."""
+        for delta in self.deltas:
+            apply_fn(delta)
@@ -0,0 +1,244 @@
+"""
+revision_texts.py: Ways of storing page and revision texts.
+
+Created by AB Tech on 2026-10-16.
+This file is part of the https://github.com/ABTech/twiki-to-mediawiki-xml
+
+Copyright (C) 2022-present  AB Tech, Carnegie Mellon University
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# Pages store their texts in one of these modes:
+#
+# full: page["twiki_txt"] and every revision["text"] hold the text.
+# blobs: page["text_blobs"] maps the SHA-256 of each distinct text to the
+#        text, and page["twiki_txt_blob"] and every revision["text_blob"]
+#        hold the ID of their text. The head revision usually has the same
+#        text as the .txt file and reverts repeat older texts, so each of
+#        these is only stored once.
+# deltas: the head revision and any revision that could only be checked out
+#         with co hold their text, the other trunk revisions only hold the
+#         RCS edit script (revision["edit_script"]) that turns the text of
+#         the next newer revision into theirs, like in the ,v file. Texts are
+#         reconstructed when needed with RevisionTexts.
+
+from collections import OrderedDict
+from hashlib import sha256
+from math import isqrt
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from twiki_to_mediawiki_xml.rcs import (apply_rcs_edit_script,
+                                        make_rcs_edit_script)
+
+TEXT_MODES = ("full", "blobs", "deltas")
+REVISION_TEXTS_CACHE_SIZE = 32
+
+
+def get_text_blob_id(text: str) -> str:
+    """Get the ID of a text blob (the SHA-256 of its UTF-8)."""
+    return sha256(text.encode("utf-8")).hexdigest()
+
+
+def add_text_blob(text_blobs: Dict[str, str], text: str) -> str:
+    """Add a text to text_blobs if it is not there, returning its ID."""
+    blob_id = get_text_blob_id(text)
+    text_blobs.setdefault(blob_id, text)
+    return blob_id
+
+
+def iter_revisions(page: dict) -> Iterator[dict]:
+    """Iterate over the revisions of a page (if any)."""
+    if "revisions" in page:
+        yield from page["revisions"]["deltas"]
+
+
+def get_twiki_txt(page: dict) -> Optional[str]:
+    """Get the .txt text of a page in any mode."""
+    if "twiki_txt_blob" in page:
+        return page["text_blobs"][page["twiki_txt_blob"]]
+    return page.get("twiki_txt")
+
+
+def get_revision_text(page: dict, revision: dict) -> Optional[str]:
+    """Get the text of a revision, or None if it holds an edit script."""
+    if "text_blob" in revision:
+        return page["text_blobs"][revision["text_blob"]]
+    return revision.get("text")
+
+
+def has_edit_scripts(page: dict) -> bool:
+    """Check if any revision of a page holds an edit script."""
+    return any("edit_script" in revision for revision in iter_revisions(page))
+
+
+def get_trunk(revisions: dict) -> List[dict]:
+    """Get the trunk revisions, newest (the head) first."""
+    revisions_by_name = {revision["revision"]: revision
+                         for revision in revisions["deltas"]}
+    trunk = []
+    name = revisions["head"]
+    while name in revisions_by_name:
+        trunk.append(revisions_by_name.pop(name))
+        name = trunk[-1]["next"]
+    return trunk
+
+
+def iter_trunk_texts(trunk: List[dict]) -> Iterator[Tuple[dict, str]]:
+    """Yield (revision, text) for trunk revisions, newest first."""
+    text = None
+    for revision in trunk:
+        if "text" in revision:
+            text = revision["text"]
+        elif text is None:
+            raise ValueError(f"No text to apply the edit script of revision "
+                             f"{revision['revision']} to")
+        else:
+            text = apply_rcs_edit_script(text, revision["edit_script"])
+        yield (revision, text)
+
+
+class RevisionTexts():  # pylint: disable=too-few-public-methods
+    """Get the texts of the revisions of a page in full or deltas mode.
+
+    Texts in deltas mode are reconstructed from the nearest newer text that
+    is available. On first use the trunk is walked once to keep every
+    sqrt(n)th text, and recently reconstructed texts are kept in a bounded
+    LRU cache, so getting every text in either order applies each edit
+    script about once while keeping O(sqrt(n)) texts.
+    """
+
+    def __init__(self, revisions: dict,
+                 cache_size: int = REVISION_TEXTS_CACHE_SIZE):
+        """Initialize with the revisions of a page."""
+        self.trunk = get_trunk(revisions)
+        self.positions = {revision["revision"]: position
+                          for position, revision in enumerate(self.trunk)}
+        self.step = max(1, isqrt(len(self.trunk)))
+        self.cache_size = max(cache_size, self.step)
+        self.checkpoints = None
+        self.cache = OrderedDict()
+
+    def get_text(self, revision: dict) -> str:
+        """Get the text of a revision."""
+        if "text" in revision:
+            return revision["text"]
+        name = revision["revision"]
+        if name in self.cache:
+            self.cache.move_to_end(name)
+            return self.cache[name]
+        if name not in self.positions:
+            raise ValueError(f"Revision {name} with an edit script is not "
+                             "on the trunk")
+        if self.checkpoints is None:
+            self.checkpoints = {
+                position: text for position, (_, text)
+                in enumerate(iter_trunk_texts(self.trunk))
+                if position % self.step == 0}
+
+        # Start from the nearest newer cached text or checkpoint
+        position = self.positions[name]
+        start = position - 1
+        while (start % self.step != 0 and
+               self.trunk[start]["revision"] not in self.cache):
+            start -= 1
+        if self.trunk[start]["revision"] in self.cache:
+            text = self.cache[self.trunk[start]["revision"]]
+        else:
+            text = self.checkpoints[start]
+        for trunk_revision in self.trunk[start + 1:position + 1]:
+            if "text" in trunk_revision:
+                text = trunk_revision["text"]
+            else:
+                text = apply_rcs_edit_script(text,
+                                             trunk_revision["edit_script"])
+            self.cache[trunk_revision["revision"]] = text
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return text
+
+
+def store_text_blobs(page: dict) -> None:
+    """Move the texts of a page in full mode into its text blobs."""
+    text_blobs = page.setdefault("text_blobs", {})
+    if "twiki_txt" in page:
+        page["twiki_txt_blob"] = add_text_blob(text_blobs,
+                                               page.pop("twiki_txt"))
+    for revision in iter_revisions(page):
+        if "text" in revision:
+            revision["text_blob"] = add_text_blob(text_blobs,
+                                                  revision.pop("text"))
+
+
+def resolve_text_blobs(page: dict) -> None:
+    """Put the texts of a page in blobs mode back in full mode.
+
+    Revisions with the same text share the same string.
+    """
+    if "text_blobs" not in page:
+        return
+    text_blobs = page.pop("text_blobs")
+    if "twiki_txt_blob" in page:
+        page["twiki_txt"] = text_blobs[page.pop("twiki_txt_blob")]
+    for revision in iter_revisions(page):
+        if "text_blob" in revision:
+            revision["text"] = text_blobs[revision.pop("text_blob")]
+
+
+def map_page_texts(page: dict, func: Callable[[str], str]) -> None:
+    """Replace every text of a page with func(text), in any mode.
+
+    func is called once per distinct text, except for the trunk in deltas
+    mode, where it is called for each revision while walking the trunk and
+    new edit scripts are made between the new texts.
+    """
+    if "text_blobs" in page:
+        text_blobs = {}
+        new_blob_ids = {
+            blob_id: add_text_blob(text_blobs, func(text))
+            for blob_id, text in page["text_blobs"].items()
+        }
+        page["text_blobs"] = text_blobs
+        if "twiki_txt_blob" in page:
+            page["twiki_txt_blob"] = new_blob_ids[page["twiki_txt_blob"]]
+        for revision in iter_revisions(page):
+            if "text_blob" in revision:
+                revision["text_blob"] = new_blob_ids[revision["text_blob"]]
+        return
+
+    new_texts = {}
+
+    def get_new_text(text: str) -> str:
+        if text not in new_texts:
+            new_texts[text] = func(text)
+        return new_texts[text]
+
+    if "twiki_txt" in page:
+        page["twiki_txt"] = get_new_text(page["twiki_txt"])
+    trunk = []
+    if has_edit_scripts(page):
+        trunk = get_trunk(page["revisions"])
+        newer_text = None
+        for revision, text in iter_trunk_texts(trunk):
+            new_text = func(text)
+            if "edit_script" in revision:
+                revision["edit_script"] = make_rcs_edit_script(newer_text,
+                                                               new_text)
+            else:
+                revision["text"] = new_text
+            newer_text = new_text
+    trunk_names = {revision["revision"] for revision in trunk}
+    for revision in iter_revisions(page):
+        if "text" in revision and revision["revision"] not in trunk_names:
+            revision["text"] = get_new_text(revision["text"])
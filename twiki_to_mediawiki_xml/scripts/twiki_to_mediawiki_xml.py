@@ -25,17 +25,26 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 import argparse
 import sys
 import traceback
-from datetime import datetime
-from json import dumps
+from contextlib import contextmanager
 from logging import getLogger
+from os import devnull
 from os.path import normpath
-from shutil import which
+from typing import IO, TYPE_CHECKING, Iterator, Optional
 
-from twiki_to_mediawiki_xml import __version__
-from twiki_to_mediawiki_xml.mediawiki_xml_exporter import MediaWikiXMLExporter
-from twiki_to_mediawiki_xml.twiki_parser import TWikiParser
-from twiki_to_mediawiki_xml.twiki_to_mediawiki_format import \
-    TWikiToMediaWikiFormat
+from twiki_to_mediawiki_xml import get_version
+from twiki_to_mediawiki_xml.pages_json import (PAGES_FORMATS, dump_pages,
+                                               load_pages)
+
+if TYPE_CHECKING:
+    from twiki_to_mediawiki_xml.stats import Stats
+
+# The CLI is run once per topic by some wrapper scripts, so each command only
+# imports the modules it uses (the parser, format, exporter and validation
+# modules pull in editrcs, lxml and more) and the version is only looked up
+# for --version. So the choices of options are listed here, not imported.
+# benchmarks/bench_import_time.py checks how long starting each command takes.
+
+# pylint: disable=import-outside-toplevel
 
 logger = getLogger(__name__)
 
@@ -47,7 +56,54 @@ under certain conditions; for details see LICENSE and README.md.
 """
 
 
-# pylint: disable=too-many-statements
+class VersionAction(argparse.Action):
+    """Print the version and exit, looking it up only then."""
+
+    def __init__(self, option_strings: list, dest: str = argparse.SUPPRESS,
+                 default: str = argparse.SUPPRESS, **kwargs):
+        """Initialize the action, which takes no arguments."""
+        super().__init__(option_strings=option_strings, dest=dest,
+                         default=default, nargs=0, **kwargs)
+
+    def __call__(self, parser: argparse.ArgumentParser, *args) -> None:
+        """Print the version and exit."""
+        version = get_version()
+        if version is None:
+            version = "(not installed)"
+        parser.exit(message=f"{parser.prog} {version}\n")
+
+
+@contextmanager
+def open_out_file(out_path: Optional[str], quiet: bool,
+                  binary: bool = False,
+                  stats: Optional["Stats"] = None) -> Iterator[IO]:
+    """Open the output file (UTF-8), stdout, or nowhere if quiet.
+
+    Bytes written are counted in stats (if given).
+    """
+    if out_path is not None or quiet:
+        path = devnull if out_path is None else normpath(out_path)
+        if binary:
+            with open(path, "wb") as out_file:
+                yield wrap_out_file(out_file, stats)
+        else:
+            with open(path, "w", encoding="utf-8") as out_file:
+                yield wrap_out_file(out_file, stats)
+    elif binary:
+        yield wrap_out_file(sys.stdout.buffer, stats)
+    else:
+        yield wrap_out_file(sys.stdout, stats)
+
+
+def wrap_out_file(out_file: IO, stats: Optional["Stats"]) -> IO:
+    """Count the bytes written to a file in stats (if given)."""
+    if stats is None:
+        return out_file
+    from twiki_to_mediawiki_xml.stats import CountingWriter
+    return CountingWriter(out_file, stats)
+
+
+# pylint: disable=too-many-branches,too-many-locals,too-many-statements
 def main() -> int:
     """Convert a TWiki to MediaWiki XML."""
     parser = argparse.ArgumentParser(
@@ -57,93 +113,220 @@ def main() -> int:
                         choices=[
                             'twiki_parser',
                             'twiki_to_mediawiki_format',
-                            'mediawiki_xml_exporter'
+                            'mediawiki_xml_exporter',
+                            'convert',
+                            'validate'
                         ],
-                        help='Which tool to run')
+                        help='Which tool to run (convert runs all three in '
+                             'one process without intermediate JSON, '
+                             'validate reports problems in parsed pages)')
     parser.add_argument('in_path',  type=str,
                         help='Input directory or file path')
     parser.add_argument('-b', '--base-page-url', action='store',
                         help='URL of MediaWiki base page.')
     parser.add_argument('-c', '--co-path', action='store',
                         help='Path to co binary')
+    parser.add_argument('--cache-dir', type=str,
+                        help='Directory to cache parsed pages in, reused '
+                             'until the page files change')
+    parser.add_argument('--checkout', type=str, default='python',
+                        choices=['python', 'co', 'verify'],
+                        help='How to check out revisions: apply RCS deltas '
+                             'in-process (falling back to co), always use '
+                             'co, or apply deltas and verify against co '
+                             '(defaults python)')
+    parser.add_argument('--co-concurrency', type=int, default=1,
+                        help='Number of co processes to run at once (per '
+                             'worker process, 0 for one per CPU, defaults 1)')
     parser.add_argument('-d', '--db-name', action='store',
                         help='Name of MediaWiki database.')
+    parser.add_argument('-f', '--format', type=str, default='json',
+                        choices=PAGES_FORMATS,
+                        help='Format of pages output, a JSON array or one '
+                             'JSON page per line (defaults json)')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='Number of worker processes (0 for one per CPU, '
+                             'defaults 1)')
     parser.add_argument('-o', '--out-path',  type=str,
                         help='Output to file (UTF-8) instead of stdout')
     parser.add_argument('-p', '--page-replace-path',  type=str,
                         help='Path to page name replacement CSV file')
+    parser.add_argument('--profile', type=str, metavar='DIR',
+                        help='Profile each stage with cProfile in one '
+                             'process, writing STAGE.prof and a STAGE.txt '
+                             'summary of the hottest functions to DIR')
+    parser.add_argument('--progress', type=float, metavar='SECONDS',
+                        help='Write the pages done, pages/s and an ETA to '
+                             'stderr at most every SECONDS')
     parser.add_argument('-q', '--quiet', action='store_true',
                         help='Don\'t output the result, just run')
+    parser.add_argument('--report-format', type=str, default='json',
+                        choices=['json', 'csv'],
+                        help='Format of the validate report (defaults json)')
+    parser.add_argument('--raw-rcs', action='store_true',
+                        help='Keep the raw .txt,v file and RCS strings of '
+                             'each page in the parser output')
     parser.add_argument('-s', '--site-name', action='store',
                         help='Name of MediaWiki site.')
+    parser.add_argument('--stats-out', type=str,
+                        help='Write the time spent in each stage and page, '
+                             'co calls, bytes read and written and pages, '
+                             'revisions, moves and redirects exported as '
+                             'JSON to this path')
+    shards_group = parser.add_mutually_exclusive_group()
+    shards_group.add_argument('--shards', type=int,
+                              help='Split the XML dump into this many files '
+                                   'of about equal size, named after the '
+                                   'output path (dump-1.xml, ...)')
+    shards_group.add_argument('--max-bytes', type=int,
+                              help='Split the XML dump into files of up to '
+                                   'about this many bytes, named after the '
+                                   'output path (dump-1.xml, ...)')
     parser.add_argument('-t', '--migration-timestamp', action='store',
                         help='Timestamp to use for migrations (defaults now).')
+    parser.add_argument('--texts', type=str, default='full',
+                        choices=['full', 'blobs', 'deltas'],
+                        help='How the parser stores page and revision texts: '
+                             'in full, once per distinct text by hash, or as '
+                             'the head text and RCS edit scripts (defaults '
+                             'full)')
     parser.add_argument('-u', '--migration-username', action='store',
                         help='Username to use for migrations.')
-    if __version__ is not None:
-        parser.add_argument('--version', action='version',
-                            version=f"%(prog)s {__version__}")
+    parser.add_argument('--validate', type=str, default='full',
+                        choices=['off', 'fast', 'full'],
+                        help='Which checks to run on parsed pages, logging '
+                             'them while parsing or reporting them with '
+                             'validate (defaults full)')
+    parser.add_argument('--version', action=VersionAction,
+                        help="show program's version number and exit")
     args = parser.parse_args()
 
     norm_in_path = normpath(args.in_path)
+    if (args.command in ('mediawiki_xml_exporter', 'convert') and
+            (args.base_page_url is None or args.db_name is None or
+             args.site_name is None)):
+        parser.error(f"{args.command} requires "
+                     "--base-page-url, --db-name, and --site-name.")
+    sharded = args.shards is not None or args.max_bytes is not None
+    if sharded and args.out_path is None:
+        parser.error("--shards and --max-bytes require --out-path.")
 
-    out = ""
+    if args.profile is not None and args.jobs != 1:
+        logger.warning("Profiling runs everything in one process (-j 1)")
+        args.jobs = 1
+    from twiki_to_mediawiki_xml.stats import Stats
+    stats = Stats(args.progress,
+                  None if args.profile is None else normpath(args.profile))
+    out_pages = None
+    out_exporter = None
     try:
-        if args.command == 'twiki_parser':
-            co_path = which("co")
+        if (args.command in ('twiki_to_mediawiki_format', 'convert') and
+                args.page_replace_path is None):
+            raise Exception("Missing required --page-replace-path!")
+
+        if args.command in ('twiki_parser', 'convert'):
+            from shutil import which
+            co_path = args.co_path
             if co_path is None:
+                co_path = which("co")
+            if co_path is None and args.checkout != 'python':
                 raise Exception("Could not find co executable, please specify "
                                 "--co-path!")
+            if co_path is None:
+                logger.warning("Could not find co executable, revisions that "
+                               "cannot be checked out in-process will fail")
+            from twiki_to_mediawiki_xml.twiki_parser import TWikiParser
             cmd_args = [norm_in_path, co_path]
-            cmd_kwargs = {}
-            parser = TWikiParser(*cmd_args, **cmd_kwargs)
-            parser.run()
-            out = parser.get_pages()
-            out_processed = dumps(out, indent=4)
-        elif args.command == 'twiki_to_mediawiki_format':
-            if args.page_replace_path is None:
-                raise Exception("Missing required --page-replace-path!")
+            cmd_kwargs = {"checkout": args.checkout, "jobs": args.jobs,
+                          "texts": args.texts, "raw_rcs": args.raw_rcs,
+                          "validate": args.validate,
+                          "co_concurrency": args.co_concurrency,
+                          "stats": stats}
+            if args.cache_dir is not None:
+                cmd_kwargs["cache_dir"] = normpath(args.cache_dir)
+            twiki_parser = TWikiParser(*cmd_args, **cmd_kwargs)
+            out_pages = twiki_parser.iter_pages()
+
+        if args.command in ('twiki_to_mediawiki_format', 'convert'):
+            from twiki_to_mediawiki_xml.twiki_to_mediawiki_format import \
+                TWikiToMediaWikiFormat
             norm_page_replace_path = normpath(args.page_replace_path)
             cmd_args = [
                 norm_in_path,
                 norm_page_replace_path
             ]
-            cmd_kwargs = {}
-            exporter = TWikiToMediaWikiFormat(*cmd_args, **cmd_kwargs)
-            exporter.run()
-            out = exporter.get_mediawiki_pages()
-            out_processed = dumps(out, indent=4)
-        elif args.command == 'mediawiki_xml_exporter':
-            if (args.base_page_url is None or args.db_name is None or
-                    args.site_name is None):
-                parser.error("mediawiki_xml_exporter requires "
-                             "--base-page-url, --db-name, and --site-name.")
+            cmd_kwargs = {"jobs": args.jobs, "stats": stats}
+            if out_pages is not None:
+                # Pages stream from the parser, after the page names and
+                # parents are read from the .txt files
+                cmd_args[0] = None
+                cmd_kwargs["twiki_pages"] = out_pages
+                cmd_kwargs["twiki_page_names"] = \
+                    twiki_parser.iter_page_names()
+            formatter = TWikiToMediaWikiFormat(*cmd_args, **cmd_kwargs)
+            out_pages = formatter.iter_mediawiki_pages()
+
+        if args.command in ('mediawiki_xml_exporter', 'convert'):
+            from twiki_to_mediawiki_xml.mediawiki_xml_exporter import \
+                MediaWikiXMLExporter
             cmd_args = [
                 norm_in_path,
                 args.site_name,
                 args.db_name,
                 args.base_page_url
             ]
-            cmd_kwargs = {}
+            from datetime import datetime
+            cmd_kwargs = {"stats": stats}
             if args.migration_username is not None:
                 cmd_kwargs["migration_username"] = args.migration_username
             if args.migration_timestamp is not None:
                 cmd_kwargs["migration_timestamp"] = (
                     datetime.strptime(args.migration_timestamp))
-            exporter = MediaWikiXMLExporter(*cmd_args, **cmd_kwargs)
-            exporter.run()
-            out_processed = exporter.get_xml_str()
+            if out_pages is not None and sharded:
+                # Shards are sized before they are written, so keep the
+                # pages (not their JSON)
+                cmd_args[0] = None
+                cmd_kwargs["mediawiki_pages"] = list(out_pages)
+            elif out_pages is not None:
+                # Pages stream from the formatter, which finds their names
+                # first
+                cmd_args[0] = None
+                cmd_kwargs["page_names"] = formatter.find_page_names()
+                cmd_kwargs["num_pages"] = formatter.num_pages
+                cmd_kwargs["mediawiki_pages"] = out_pages
+            out_exporter = MediaWikiXMLExporter(*cmd_args, **cmd_kwargs)
 
-        if args.out_path is not None:
-            norm_out_path = normpath(args.out_path)
-            with open(norm_out_path, "w",  encoding="utf-8") as out_file:
-                out_file.write(out_processed)
-        elif args.out_path is None and not args.quiet:
-            print(out_processed)
+        if args.command == 'validate':
+            from twiki_to_mediawiki_xml.validation import (TWikiValidator,
+                                                           dump_report)
+            validator = TWikiValidator(args.validate, args.jobs)
+            with open_out_file(args.out_path, args.quiet) as out_file:
+                dump_report(validator.iter_findings(load_pages(norm_in_path)),
+                            out_file, args.report_format)
+        elif out_exporter is not None and sharded:
+            out_exporter.write_xml_shards(normpath(args.out_path),
+                                          args.shards, args.max_bytes,
+                                          args.jobs)
+        elif out_exporter is not None:
+            # Stream XML to the file page by page
+            with open_out_file(args.out_path, args.quiet, binary=True,
+                               stats=stats) as out_file:
+                out_exporter.write_xml(out_file)
+        else:
+            with open_out_file(args.out_path, args.quiet,
+                               stats=stats) as out_file:
+                dump_pages(out_pages, out_file, args.format)
 
     except Exception as error:  # pylint: disable=broad-except
         logger.error('%s\n\n%s', repr(error), traceback.format_exc())
         return 1
+    finally:
+        # Also written if the run fails, to see how far it got
+        if args.stats_out is not None:
+            with open(normpath(args.stats_out), "w",
+                      encoding="utf-8") as stats_file:
+                stats.dump(stats_file)
+        stats.dump_profiles()
 
     return 0
 
@@ -0,0 +1,298 @@
+"""
+stats.py: Timings and counters of a run.
+
+Created by AB Tech on 2026-10-16.
+This file is part of the https://github.com/ABTech/twiki-to-mediawiki-xml
+
+Copyright (C) 2022-present  AB Tech, Carnegie Mellon University
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# Stats collects where a run spends its time. Stages (parse, format.text,
+# export.pages, ...) add up the wall time of each of their pages, or of the
+# whole stage for stages that are not run page by page. Counters add up
+# things like co calls, their latency and bytes read and written.
+#
+# Pages handled by worker processes are counted in the worker, which hands
+# what it collected back with take() to be merged into the parent's Stats.
+# Parsing is timed in the parent as the time waited for each page.
+#
+# With a progress interval, a line with the pages done, pages/s and an ETA
+# is written to stderr at most once per interval.
+#
+# With a profile directory, each stage is also run under its own cProfile
+# profiler (only while the stage itself runs, not the code consuming its
+# pages), and dump_profiles() writes a .prof file and a text summary of the
+# hottest functions per stage. Only the process creating the Stats is
+# profiled, and cProfile is only imported when profiling.
+
+import sys
+from contextlib import contextmanager
+from datetime import timedelta
+from json import dump
+from os import makedirs
+from os.path import join
+from time import perf_counter
+from typing import BinaryIO, Dict, Iterable, Iterator, Optional, TextIO, Union
+
+STATS_SLOWEST_PAGES = 10
+PROFILE_TOP_FUNCTIONS = 30
+
+
+class Stats():  # pylint: disable=too-many-instance-attributes
+    """Timings and counters of a run."""
+
+    def __init__(self, progress_interval: Optional[float] = None,
+                 profile_dir: Optional[str] = None):
+        """Start timing the run.
+
+        A progress line is written every progress_interval seconds (if set).
+        Stages are profiled for profile_dir (if set).
+        """
+        self.progress_interval = progress_interval
+        self.profile_dir = profile_dir
+        self.profilers = {}
+        self.active_profiler = None
+        self.start = perf_counter()
+        self.last_progress = self.start
+        self.stages: Dict[str, dict] = {}
+        self.counters: Dict[str, Union[int, float]] = {}
+        self.stage_starts: Dict[str, float] = {}
+        self.totals: Dict[str, int] = {}
+
+    def __getstate__(self) -> dict:
+        """Pickle empty for a worker process, which does not write progress.
+
+        Workers hand back what they collect with take().
+        """
+        state = self.__dict__.copy()
+        state.update(progress_interval=None, profile_dir=None, profilers={},
+                     active_profiler=None, stages={}, counters={},
+                     stage_starts={}, totals={})
+        return state
+
+    def start_worker(self) -> None:
+        """Start afresh in a worker process, even if forked, like pickled."""
+        self.__dict__.update(self.__getstate__())
+
+    def add(self, counter: str, value: Union[int, float] = 1) -> None:
+        """Add to a counter.
+
+        Counters are not locked, so each counter must only be added to from
+        one thread (like co_calls from the co pool's thread).
+        """
+        self.counters[counter] = self.counters.get(counter, 0) + value
+
+    def get_stage(self, stage: str) -> dict:
+        """Get the timings of a stage, adding it if it is new."""
+        if stage not in self.stages:
+            self.stages[stage] = {"seconds": 0.0, "pages": 0,
+                                  "page_seconds": {}}
+        return self.stages[stage]
+
+    def set_total(self, stage: str, total: int) -> None:
+        """Set how many pages a stage will handle, for the ETA."""
+        self.totals[stage] = total
+
+    @contextmanager
+    def profile(self, stage: str) -> Iterator[None]:
+        """Profile a stage while in the context (if profiling).
+
+        A stage run inside another one is only added to the inner stage's
+        profile.
+        """
+        if self.profile_dir is None:
+            yield
+            return
+        if stage not in self.profilers:
+            # pylint: disable=import-outside-toplevel
+            from cProfile import Profile
+            self.profilers[stage] = Profile()
+        profiler = self.profilers[stage]
+        outer_profiler = self.active_profiler
+        if outer_profiler is not None:
+            outer_profiler.disable()
+        self.active_profiler = profiler
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            self.active_profiler = outer_profiler
+            if outer_profiler is not None:
+                outer_profiler.enable()
+
+    @contextmanager
+    def stage(self, stage: str) -> Iterator[None]:
+        """Time a stage that is not run page by page."""
+        start = perf_counter()
+        try:
+            with self.profile(stage):
+                yield
+        finally:
+            self.get_stage(stage)["seconds"] += perf_counter() - start
+
+    @contextmanager
+    def page(self, stage: str, page_name: str) -> Iterator[None]:
+        """Time a page of a stage."""
+        start = perf_counter()
+        try:
+            with self.profile(stage):
+                yield
+        finally:
+            self.add_page(stage, page_name, perf_counter() - start)
+
+    def iter_pages(self, stage: str, pages: Iterable[dict]) -> Iterator[dict]:
+        """Yield pages, timing how long each one takes to get."""
+        pages = iter(pages)
+        while True:
+            start = perf_counter()
+            try:
+                with self.profile(stage):
+                    page = next(pages)
+            except StopIteration:
+                self.get_stage(stage)["seconds"] += perf_counter() - start
+                return
+            self.add_page(stage, page["page_name"], perf_counter() - start)
+            yield page
+
+    def add_page(self, stage: str, page_name: str, seconds: float) -> None:
+        """Add the time of a page to a stage."""
+        entry = self.get_stage(stage)
+        entry["seconds"] += seconds
+        entry["pages"] += 1
+        page_seconds = entry["page_seconds"]
+        page_seconds[page_name] = page_seconds.get(page_name, 0.0) + seconds
+        self.stage_starts.setdefault(stage, perf_counter() - seconds)
+        self.write_progress(stage)
+
+    def take(self) -> dict:
+        """Get what was collected so far and start again (in workers)."""
+        taken = {"stages": self.stages, "counters": self.counters}
+        self.stages = {}
+        self.counters = {}
+        return taken
+
+    def merge(self, taken: dict) -> None:
+        """Add what was taken from another Stats (like a worker's)."""
+        for counter, value in taken["counters"].items():
+            self.add(counter, value)
+        for stage, other_entry in taken["stages"].items():
+            entry = self.get_stage(stage)
+            entry["seconds"] += other_entry["seconds"]
+            entry["pages"] += other_entry["pages"]
+            for page_name, seconds in other_entry["page_seconds"].items():
+                entry["page_seconds"][page_name] = (
+                    entry["page_seconds"].get(page_name, 0.0) + seconds)
+            if other_entry["pages"] > 0:
+                self.stage_starts.setdefault(
+                    stage, perf_counter() - other_entry["seconds"])
+                self.write_progress(stage)
+
+    def write_progress(self, stage: str) -> None:
+        """Write a progress line for a stage if the interval has passed."""
+        now = perf_counter()
+        if (self.progress_interval is None or
+                now - self.last_progress < self.progress_interval):
+            return
+        self.last_progress = now
+        pages = self.stages[stage]["pages"]
+        elapsed = now - self.stage_starts[stage]
+        rate = pages / elapsed if elapsed > 0 else 0.0
+        total = self.totals.get(stage)
+        line = f"{stage}: {pages}"
+        if total is not None:
+            line += f"/{total}"
+        line += f" pages, {rate:.1f} pages/s"
+        if total is not None and rate > 0:
+            eta = timedelta(seconds=round(max(total - pages, 0) / rate))
+            line += f", ETA {eta}"
+        print(line, file=sys.stderr, flush=True)
+
+    def to_dict(self) -> dict:
+        """Get the timings and counters as JSON-serializable data."""
+        stages = {}
+        for stage, entry in self.stages.items():
+            slowest = sorted(entry["page_seconds"].items(),
+                             key=lambda item: item[1],
+                             reverse=True)[:STATS_SLOWEST_PAGES]
+            stages[stage] = {
+                "seconds": round(entry["seconds"], 6),
+                "pages": entry["pages"],
+                "slowest_pages": [[page_name, round(seconds, 6)]
+                                  for page_name, seconds in slowest],
+                "page_seconds": {page_name: round(seconds, 6)
+                                 for page_name, seconds
+                                 in entry["page_seconds"].items()},
+            }
+        counters = {counter: round(value, 6) if isinstance(value, float)
+                    else value
+                    for counter, value in sorted(self.counters.items())}
+        return {
+            "seconds": round(perf_counter() - self.start, 6),
+            "stages": stages,
+            "counters": counters,
+        }
+
+    def dump(self, out_file: TextIO) -> None:
+        """Write the timings and counters to a file as JSON."""
+        dump(self.to_dict(), out_file, indent=4)
+        out_file.write("\n")
+
+    def dump_profiles(self) -> None:
+        """Write a .prof file and a text summary per profiled stage.
+
+        The summary lists the functions that took the most time themselves
+        and including what they called.
+        """
+        if self.profile_dir is None:
+            return
+        # pylint: disable=import-outside-toplevel
+        from pstats import SortKey
+        from pstats import Stats as ProfileStats
+        makedirs(self.profile_dir, exist_ok=True)
+        for stage, profiler in self.profilers.items():
+            profile_path = join(self.profile_dir, stage)
+            profiler.dump_stats(f"{profile_path}.prof")
+            with open(f"{profile_path}.txt", "w",
+                      encoding="utf-8") as out_file:
+                stats = ProfileStats(profiler, stream=out_file)
+                stats.sort_stats(SortKey.TIME).print_stats(
+                    PROFILE_TOP_FUNCTIONS)
+                stats.sort_stats(SortKey.CUMULATIVE).print_stats(
+                    PROFILE_TOP_FUNCTIONS)
+
+
+class CountingWriter():
+    """Wrap a file, counting the bytes written to it as bytes_written."""
+
+    def __init__(self, out_file: Union[TextIO, BinaryIO], stats: Stats):
+        """Initialize wrapping out_file (text files are UTF-8)."""
+        self.out_file = out_file
+        self.stats = stats
+
+    def write(self, data: Union[str, bytes]) -> int:
+        """Write data to the file, counting it."""
+        if isinstance(data, bytes):
+            self.stats.add("bytes_written", len(data))
+        elif data.isascii():
+            self.stats.add("bytes_written", len(data))
+        else:
+            self.stats.add("bytes_written", len(data.encode("utf-8")))
+        return self.out_file.write(data)
+
+    def flush(self) -> None:
+        """Flush the file."""
+        self.out_file.flush()
@@ -21,47 +21,207 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
+from contextlib import closing, nullcontext
 from glob import glob
 from logging import getLogger
-from os.path import basename, exists, splitext
-from re import MULTILINE, findall, sub
-from shlex import split
-from subprocess import check_output  # nosec B404
-from typing import List, Sequence
-
-from deepdiff import DeepDiff
-from editrcs import ParseRcs
+from os.path import basename, exists, getsize, splitext
+from re import MULTILINE, Match
+from re import compile as re_compile
+from typing import Iterator, List, Optional, Sequence, Set, Tuple, Union
+
+from editrcs import ParseRcs, Rcs, RcsError
+
+from twiki_to_mediawiki_xml import get_version
+from twiki_to_mediawiki_xml.co_pool import CoPool
+from twiki_to_mediawiki_xml.parallel import imap_ordered, resolve_jobs
+from twiki_to_mediawiki_xml.rcs import iter_rcs_trunk_texts, normalize_newlines
+from twiki_to_mediawiki_xml.rcs_file import RcsFile
+from twiki_to_mediawiki_xml.revision_texts import TEXT_MODES, store_text_blobs
+from twiki_to_mediawiki_xml.stats import Stats
+from twiki_to_mediawiki_xml.validation import TWikiValidator
 
 SKIP_REVISIONS_DEFAULT = ("SiteStatistics", "UserListHeader", "WebLeftBar",
                           "WebStatistics")
+# python: apply RCS deltas in-process, using co only as a fallback
+# co: check out every revision with co
+# verify: apply RCS deltas in-process and compare every revision against co
+CHECKOUT_MODES = ("python", "co", "verify")
+
+# TWiki writes TOPICINFO and TOPICPARENT METAs at the start of a topic and
+# the other METAs (FORM, FIELD, FILEATTACHMENT, ...) at the end, so usually
+# only those lines need to be searched.
+TWIKI_META = re_compile(r'^%META:(.*)\{(.*)\}%', MULTILINE)
+TWIKI_META_PREFIX = "%META:"
+
+# TWiki META attributes are name="value" pairs. Values cannot contain quotes:
+# older TWikis write ", newlines and % as %_Q_%, %_N_% and %_P_%, newer ones
+# write any of "%\r\n{} as % and two hex digits.
+TWIKI_ATTRIBUTE = re_compile(r'([^\s=]+)=(?:"([^"]*)"|(\S*))')
+TWIKI_ATTRIBUTE_ESCAPE = re_compile(r'%_([QNP])_%|%(22|25|0[aAdD]|7[bBdD])')
+TWIKI_ATTRIBUTE_ESCAPES = {"Q": '"', "N": "\n", "P": "%"}
 
 logger = getLogger(__name__)
 
+_WORKER_PARSER = None
+
+
+def _init_parser_worker(parser: "TWikiParser") -> None:
+    """Set the parser used by a worker process."""
+    global _WORKER_PARSER  # pylint: disable=global-statement
+    _WORKER_PARSER = parser
+    _WORKER_PARSER.stats.start_worker()
+
+
+def _parse_metadata_worker(twiki_txt_path: str) -> Tuple[dict, dict]:
+    """Parse TWiki data file metadata in a worker process.
+
+    Returns the page and the stats collected while parsing it.
+    """
+    page = _WORKER_PARSER.parse_metadata_cached(twiki_txt_path)
+    return (page, _WORKER_PARSER.stats.take())
 
+
+# pylint: disable=too-many-instance-attributes,too-many-public-methods
 class TWikiParser():
     """Convert TWiki to JSON."""
 
-    def __init__(self,
+    def __init__(self,  # pylint: disable=too-many-arguments
                  twiki_data_web_path: str,
-                 co_path: str,
-                 skip_revisions: Sequence[str] = SKIP_REVISIONS_DEFAULT):
-        """Initialize the TWiki convertor class."""
+                 co_path: Optional[str],
+                 skip_revisions: Sequence[str] = SKIP_REVISIONS_DEFAULT,
+                 checkout: str = "python",
+                 jobs: int = 1,
+                 cache_dir: Optional[str] = None,
+                 texts: str = "full",
+                 raw_rcs: bool = False,
+                 validate: str = "full",
+                 co_concurrency: int = 1,
+                 stats: Optional[Stats] = None):
+        """Initialize the TWiki convertor class.
+
+        texts is how page and revision texts are stored (see
+        revision_texts.py). The raw .txt,v file and RCS strings are only kept
+        if raw_rcs is set. Pages are validated at the validate level, logging
+        findings as warnings. Up to co_concurrency co processes are run at
+        once (per worker process). Timings and counters are added to stats
+        (if given).
+        """
+        if checkout not in CHECKOUT_MODES:
+            raise ValueError(f"Unknown checkout mode {checkout}")
+        if co_path is None and checkout != "python":
+            raise ValueError(f"Checkout mode {checkout} requires co")
+        if texts not in TEXT_MODES:
+            raise ValueError(f"Unknown texts mode {texts}")
         self.twiki_data_web_path = twiki_data_web_path
         self.skip_revisions = skip_revisions
         self.co_path = co_path
+        self.checkout = checkout
+        self.jobs = resolve_jobs(jobs)
+        self.texts = texts
+        self.raw_rcs = raw_rcs
+        self.validate = validate
+        self.validator = TWikiValidator(validate)
+        self.stats = Stats() if stats is None else stats
+        self.co_pool = None
+        if co_path is not None:
+            self.co_pool = CoPool(co_path, co_concurrency, self.stats)
+        self.parse_cache = None
+        if cache_dir is not None:
+            # Imported here since only the parse cache needs it (and sqlite3)
+            # pylint: disable=import-outside-toplevel
+            from twiki_to_mediawiki_xml.parse_cache import ParseCache
+            self.parse_cache = ParseCache(cache_dir,
+                                          self.get_cache_settings())
 
         self.twiki_txt_paths = []
         self.twiki_pages = []
 
     def run(self) -> None:
         """Run the conversion."""
-        # Find all of the page files
-        self.twiki_txt_paths = self.find_data_paths()
+        for page_metadata in self.iter_pages():
+            self.twiki_pages.append(page_metadata)
+
+    def iter_pages(self) -> Iterator[dict]:
+        """Run the conversion, yielding pages as they are converted."""
+        # Find all of the page files (unless iter_page_names found them)
+        if len(self.twiki_txt_paths) == 0:
+            self.twiki_txt_paths = self.find_data_paths()
+        self.stats.set_total("parse", len(self.twiki_txt_paths))
+        yield from self.stats.iter_pages("parse", self.iter_parsed_pages())
 
-        # Convert metadata
+    def iter_page_names(self) -> Iterator[dict]:
+        """Yield the name and parents of each page, in the order parsed.
+
+        Only the .txt files are read, so this is much faster than parsing.
+        Pages have only page_name and metas, which has only TOPICPARENT.
+        """
+        self.twiki_txt_paths = self.find_data_paths()
         for twiki_txt_path in self.twiki_txt_paths:
-            page_metadata = self.parse_metadata(twiki_txt_path)
-            self.twiki_pages.append(page_metadata)
+            with open(twiki_txt_path, "r", encoding="cp1252") as file_txt:
+                meta_strs = self.find_twiki_meta_strs(file_txt.read())
+            page = {
+                "page_name": splitext(basename(twiki_txt_path))[0],
+                "metas": {}
+            }
+            if "TOPICPARENT" in meta_strs:
+                page["metas"]["TOPICPARENT"] = self.parse_twiki_meta_str(
+                    "TOPICPARENT", meta_strs["TOPICPARENT"])
+            yield page
+
+    def iter_parsed_pages(self) -> Iterator[dict]:
+        """Parse the pages found, yielding them in order."""
+        if self.jobs > 1:
+            for page, worker_stats in imap_ordered(
+                    _parse_metadata_worker,
+                    self.twiki_txt_paths,
+                    self.jobs,
+                    initializer=_init_parser_worker,
+                    initargs=(self,)):
+                self.stats.merge(worker_stats)
+                yield page
+        elif self.co_pool is not None:
+            with closing(self.co_pool):
+                if self.checkout == "python":
+                    yield from map(self.parse_metadata_cached,
+                                   self.twiki_txt_paths)
+                else:
+                    yield from self.iter_pages_prefetching(
+                        self.twiki_txt_paths)
+        else:
+            yield from map(self.parse_metadata_cached, self.twiki_txt_paths)
+
+    def iter_pages_prefetching(self,
+                               twiki_txt_paths: List[str]) -> Iterator[dict]:
+        """Parse pages while prefetching the co checkouts of the next ones.
+
+        Pages ahead are prefetched until about two checkouts per co process
+        are waiting, so co keeps running while a page is being parsed.
+        """
+        ahead = 0
+        for position, twiki_txt_path in enumerate(twiki_txt_paths):
+            ahead = max(ahead, position + 1)
+            while (ahead < len(twiki_txt_paths) and
+                   self.co_pool.pending() < 2 * self.co_pool.concurrency):
+                self.prefetch_checkouts(twiki_txt_paths[ahead])
+                ahead += 1
+            yield self.parse_metadata_cached(twiki_txt_path)
+
+    def prefetch_checkouts(self, twiki_txt_path: str) -> None:
+        """Start the co checkouts of a page that has not been parsed yet."""
+        twiki_v_path = f'{twiki_txt_path},v'
+        page_name = splitext(basename(twiki_txt_path))[0]
+        if not exists(twiki_v_path) or page_name in self.skip_revisions:
+            return
+        if self.parse_cache is not None:
+            file_key = self.parse_cache.get_file_key(twiki_txt_path)
+            if self.parse_cache.has(twiki_txt_path, file_key):
+                return
+        try:
+            with RcsFile(twiki_v_path) as rcs:
+                revs = [delta.getRevision() for delta in rcs.deltas]
+        except RcsError:
+            return  # Reported when the page is parsed
+        self.co_pool.prefetch(twiki_v_path, revs)
 
     def get_pages(self) -> List[dict]:
         """Get all converted pages."""
@@ -71,6 +231,43 @@ class TWikiParser():
         """Find TWiki data paths in input folder."""
         return glob(f'./{self.twiki_data_web_path}/*.txt')
 
+    def get_cache_settings(self) -> dict:
+        """Get the settings that change the output of parse_metadata."""
+        return {
+            "version": get_version(),
+            "skip_revisions": list(self.skip_revisions),
+            "checkout": self.checkout,
+            "texts": self.texts,
+            "raw_rcs": self.raw_rcs,
+            "validate": self.validate,
+        }
+
+    def parse_metadata_cached(self, twiki_txt_path: str) -> dict:
+        """Parse TWiki data file metadata using the parse cache (if any)."""
+        if self.parse_cache is None:
+            return self.parse_metadata(twiki_txt_path)
+
+        file_key = self.parse_cache.get_file_key(twiki_txt_path)
+        entry = self.parse_cache.get(twiki_txt_path, file_key)
+        if entry is not None:
+            # Repeat any warnings from when the page was parsed
+            self.stats.add("cache_hits")
+            for level, msg in entry["log"]:
+                logger.log(level, "%s", msg)
+            return entry["page"]
+
+        # pylint: disable=import-outside-toplevel
+        from twiki_to_mediawiki_xml.parse_cache import LogCapture
+        log_capture = LogCapture()
+        logger.addFilter(log_capture)
+        try:
+            page = self.parse_metadata(twiki_txt_path)
+        finally:
+            logger.removeFilter(log_capture)
+        self.parse_cache.put(twiki_txt_path, file_key,
+                             {"page": page, "log": log_capture.records})
+        return page
+
     def parse_metadata(self, twiki_txt_path: str) -> dict:
         """Parse TWiki data file metadata."""
         # Filename and topic name
@@ -87,49 +284,88 @@ class TWikiParser():
             logger.warning('No revision file for %s', page["twiki_txt_path"])
 
         # Read page
+        self.stats.add("bytes_read", getsize(page["twiki_txt_path"]))
         with open(page["twiki_txt_path"], "r", encoding="cp1252") as file_txt:
             page["twiki_txt"] = file_txt.read()
 
-        # Read revision page
-        if "twiki_v_path" in page:
-            with open(page["twiki_v_path"], "r", encoding="cp1252") as file_v:
-                page["twiki_v"] = file_v.read()
+        # Read revision page (only kept as text if raw_rcs is set, otherwise
+        # the revisions are parsed from the memory-mapped file)
+        twiki_v = None
+        if "twiki_v_path" in page and self.raw_rcs:
+            with open(page["twiki_v_path"], "r", encoding="cp1252",
+                      newline="") as file_v:
+                twiki_v = file_v.read()
+            page["twiki_v"] = twiki_v
 
         # Process METAs
         page["meta_strs"] = self.find_twiki_meta_strs(page["twiki_txt"])
         page["metas"] = self.parse_twiki_meta_strs(page["meta_strs"])
 
-        # Some checks for METAs
-        self.check_metas(page["page_name"], page["metas"])
-
         # Process revisions
-        if "twiki_v" in page and page["page_name"] in self.skip_revisions:
+        if ("twiki_v_path" in page and
+                page["page_name"] in self.skip_revisions):
             logger.warning("Skipping revisions for %s", page["page_name"])
-        elif "twiki_v" in page:
+        elif "twiki_v_path" in page:
+            self.stats.add("bytes_read", getsize(page["twiki_v_path"]))
             page["revisions"] = self.parse_twiki_revisions(
-                page["twiki_v"],
+                twiki_v,
                 page["twiki_v_path"],
-                self.co_path)
+                self.co_path,
+                checkout=self.checkout,
+                raw_rcs=self.raw_rcs,
+                edit_scripts=self.texts == "deltas",
+                co_pool=self.co_pool)
 
-            # Some checks for revisions
-            self.check_revisions(page["page_name"], page["revisions"],
-                                 page["twiki_txt"], page["metas"])
+        # Some checks for METAs and revisions
+        for finding in self.validator.validate_page(page, self.validate):
+            logger.warning("%s", finding["message"])
+
+        if self.texts == "blobs":
+            store_text_blobs(page)
 
         return page
 
     @staticmethod
-    def find_twiki_meta_strs(twiki_txt: dict) -> dict:
+    def find_twiki_meta_strs(twiki_txt: str) -> dict:
         """Find TWiki META data on a page."""
         topic_metas_strs = {}
-        topic_metas_strs_list = findall(r'^%META:(.*)\{(.*)\}%',
-                                        twiki_txt, flags=MULTILINE)
-        for meta_str_list in topic_metas_strs_list:
-            topic_metas_strs[meta_str_list[0]] = (
-                topic_metas_strs.get(meta_str_list[0], []) +
-                [meta_str_list[1]]
-            )
+        head_end, tail_start = TWikiParser.find_twiki_meta_blocks(twiki_txt)
+        if TWIKI_META_PREFIX in twiki_txt[head_end:tail_start]:
+            # A META in the body, search everything
+            regions = ((0, len(twiki_txt)),)
+        else:
+            regions = ((0, head_end), (tail_start, len(twiki_txt)))
+        for start, end in regions:
+            for meta in TWIKI_META.finditer(twiki_txt, start, end):
+                topic_metas_strs.setdefault(meta[1], []).append(meta[2])
         return topic_metas_strs
 
+    @staticmethod
+    def find_twiki_meta_blocks(twiki_txt: str) -> Tuple[int, int]:
+        """Find where the META lines at the start and end of a page are.
+
+        Returns the end of the lines at the start and the start of the lines
+        at the end (both len(twiki_txt) if there are none at the end).
+        """
+        head_end = 0
+        while twiki_txt.startswith(TWIKI_META_PREFIX, head_end):
+            head_end = twiki_txt.find("\n", head_end) + 1
+            if head_end == 0:
+                return (len(twiki_txt), len(twiki_txt))
+
+        tail_start = len(twiki_txt)
+        line_end = tail_start
+        if twiki_txt.endswith("\n"):
+            line_end -= 1
+        while line_end > head_end:
+            line_start = max(twiki_txt.rfind("\n", head_end, line_end) + 1,
+                             head_end)
+            if not twiki_txt.startswith(TWIKI_META_PREFIX, line_start):
+                break
+            tail_start = line_start
+            line_end = line_start - 1
+        return (head_end, tail_start)
+
     @staticmethod
     def parse_twiki_meta_strs(metas_strs: dict) -> dict:
         """Parse TWiki META data from an object of strings."""
@@ -155,40 +391,73 @@ class TWikiParser():
         In the form of: 'attr1="val1" attr2="val2" attr3="val3"'
         """
         twiki_object = {}
-        # Split preserving spaces in quoted strings (note: \ will become \\)
-        twiki_object_attr_strs = split(twiki_object_str, posix=True)
-        for twiki_object_attr_str in twiki_object_attr_strs:
-            # Split only first '=' to ensure no split in value string
-            twiki_object_attr = twiki_object_attr_str.split('=', 1)
-            twiki_object_attr_name = twiki_object_attr[0]
-            # Strip only outer '""
-            twiki_object_attr_val = sub(r'^\"(.*)\"$', r'\1',
-                                        twiki_object_attr[1])
-            twiki_object[twiki_object_attr_name] = twiki_object_attr_val
+        for attr in TWIKI_ATTRIBUTE.finditer(twiki_object_str):
+            attr_val = attr[2] if attr[2] is not None else attr[3]
+            if "%" in attr_val:
+                attr_val = TWIKI_ATTRIBUTE_ESCAPE.sub(
+                    TWikiParser.decode_twiki_attribute_escape, attr_val)
+            twiki_object[attr[1]] = attr_val
         return twiki_object
 
     @staticmethod
-    def check_metas(page_name: str, metas: dict, rev: str = None) -> None:
-        """Check parsed TWiki META data."""
-        if "TOPICINFO" not in metas:
-            logger.warning(
-                'META TOPICINFO missing for %s rev %s', page_name, rev)
-        elif len(metas["TOPICINFO"]) > 1:
-            logger.warning(
-                'Multiple META TOPICINFO for %s rev %s', page_name, rev)
-        for meta, vals in metas.items():
-            for val in vals:
-                if len(val) == 0:
-                    logger.warning('A META %s is empty for %s rev %s',
-                                   meta, page_name, rev)
+    def decode_twiki_attribute_escape(escape: Match) -> str:
+        """Decode an escaped character in a TWiki attribute value."""
+        if escape[1] is not None:
+            return TWIKI_ATTRIBUTE_ESCAPES[escape[1]]
+        return chr(int(escape[2], 16))
 
     @staticmethod
+    # pylint: disable=too-many-arguments
     def parse_twiki_revisions(
-            twiki_v: str,
+            twiki_v: Optional[str],
+            twiki_v_path: str,
+            co_path: Optional[str],
+            checkout: str = "python",
+            raw_rcs: bool = False,
+            edit_scripts: bool = False,
+            co_pool: Optional[CoPool] = None) -> dict:
+        """Parse TWiki revisions.
+
+        The revisions are parsed from twiki_v with editrcs if it is given,
+        otherwise twiki_v_path is memory-mapped with RcsFile. The RCS strings
+        of raw_rcs need editrcs, so the file is read if twiki_v is not given.
+        If edit_scripts is set, trunk revisions other than the head keep their
+        RCS edit script instead of their text (see revision_texts.py).
+        Revisions are checked out with co_pool, or a pool of one co process
+        if it is not given.
+        """
+        if co_pool is None and co_path is not None:
+            with closing(CoPool(co_path)) as page_co_pool:
+                return TWikiParser.parse_twiki_revisions(
+                    twiki_v, twiki_v_path, co_path, checkout, raw_rcs,
+                    edit_scripts, page_co_pool)
+        if twiki_v is None and raw_rcs:
+            with open(twiki_v_path, "r", encoding="cp1252",
+                      newline="") as file_v:
+                twiki_v = file_v.read()
+        if twiki_v is not None:
+            rcs_context = nullcontext(ParseRcs(twiki_v))
+        else:
+            rcs_context = RcsFile(twiki_v_path)
+        with rcs_context as rcs:
+            return TWikiParser.parse_rcs_revisions(
+                rcs, twiki_v_path, co_pool, checkout, raw_rcs, edit_scripts)
+
+    @staticmethod
+    # pylint: disable=too-many-arguments,too-many-branches
+    def parse_rcs_revisions(
+            rcs: Union[Rcs, RcsFile],
             twiki_v_path: str,
-            co_path: str) -> dict:
-        """Parse TWiki revisions."""
-        rcs = ParseRcs(twiki_v)
+            co_pool: Optional[CoPool],
+            checkout: str = "python",
+            raw_rcs: bool = False,
+            edit_scripts: bool = False) -> dict:
+        """Parse TWiki revisions from a parsed RCS file.
+
+        Every revision that needs co is prefetched from co_pool first, so
+        the checkouts of a page run concurrently. Texts, logs and the
+        description have their line endings normalized like the .txt file.
+        """
         deltas = []
         revisions = {
             "head": rcs.getHead(),
@@ -197,10 +466,11 @@ class TWikiParser():
             "symbols": rcs.getSymbols(),
             "locks": rcs.getLocks(),
             "comment": rcs.getComment(),
-            "desc": rcs.getDesc(),
-            "rcs_string": rcs.toString(),
-            "deltas": [],
+            "desc": normalize_newlines(rcs.getDesc()),
         }
+        if raw_rcs:
+            revisions["rcs_string"] = rcs.toString()
+        revisions["deltas"] = []
         rcs.mapDeltas(deltas.append)
         for delta in deltas:
             revision = {
@@ -211,62 +481,87 @@ class TWikiParser():
                 "state": delta.getState(),
                 "branches": delta.getBranches(),
                 "next": delta.getNext(),  # Previous for trunks
-                "log": delta.getLog(),
-                "delta_string": delta.deltaToString(),
-                "delta_text_string": delta.deltaTextToString(),
+                "log": normalize_newlines(delta.getLog()),
             }
+            if raw_rcs:
+                revision["delta_string"] = delta.deltaToString()
+                revision["delta_text_string"] = delta.deltaTextToString()
             revisions["deltas"].append(revision)
-        # textFromDiff and textToDiff from editrcs error, so we use co
+        all_revs = [revision["revision"] for revision in revisions["deltas"]]
+        if checkout == "verify":
+            TWikiParser.prefetch_co(co_pool, twiki_v_path, all_revs)
+        applied = set()
+        if checkout != "co":
+            # textFromDiff from editrcs errors, so we apply the deltas
+            # ourselves and use co for anything we can't (like branches)
+            applied = TWikiParser.apply_rcs_deltas(
+                rcs, revisions, twiki_v_path, co_pool, checkout, edit_scripts)
+        co_revs = [rev for rev in all_revs if rev not in applied]
+        TWikiParser.prefetch_co(co_pool, twiki_v_path, co_revs)
         for revision in revisions["deltas"]:
-            rev, path = revision["revision"], twiki_v_path
-            cmd = [co_path, "-q", f"-p{rev}", path]
-            revision["text"] = check_output(cmd, text=True,  # nosec B603
-                                            encoding="cp1252")
-            revision["meta_strs"] = TWikiParser.find_twiki_meta_strs(
-                revision["text"])
-            revision["metas"] = TWikiParser.parse_twiki_meta_strs(
-                revision["meta_strs"])
+            rev = revision["revision"]
+            if rev not in applied:
+                TWikiParser.set_revision_text(
+                    revision, co_pool.checkout(twiki_v_path, rev))
         return revisions
 
     @staticmethod
-    def check_revisions(page_name: str, revisions: dict,
-                        twiki_txt: str, metas: dict) -> None:
-        """Check parsed revision TWiki data."""
-        # Check head is not on branch
-        if revisions["branch"] is not None:
-            logger.warning(
-                'Revisions on branch for %s', page_name)
-
-        # Some checks for revisions
-        for i, revision in enumerate(revisions["deltas"]):
-            # Check METAs
-            TWikiParser.check_metas(page_name, revision["metas"],
-                                    rev=revision["revision"])
-
-            if revisions["head"] == revision["revision"]:
-                # Check latest revision matches txt
-                if twiki_txt != revision["text"]:
-                    logger.warning(
-                        'Head rev (%s) txt not equal to current data for %s',
-                        revision["revision"], page_name)
-                # Check latest revision matches metas
-                if len(DeepDiff(metas, revision["metas"])) > 0:
-                    logger.warning(
-                        'Head rev (%s) metas not equal to current data for %s',
-                        revision["revision"], page_name)
-
-            # Check for current branch
-            if len(revision["branches"]) > 0:
-                logger.warning(
-                    'Revision %s has branches for %s',
-                    revision["revision"],
-                    page_name)
-
-            # Check for duplicates
-            for j, revision2 in enumerate(revisions["deltas"]):
-                if (i != j and
-                        revision["revision"] == revision2["revision"]):
-                    logger.warning(
-                        'Duplicate revision %s for %s',
-                        revision["revision"],
-                        page_name)
+    # pylint: disable=too-many-arguments
+    def apply_rcs_deltas(
+            rcs: Union[Rcs, RcsFile],
+            revisions: dict,
+            twiki_v_path: str,
+            co_pool: Optional[CoPool],
+            checkout: str = "python",
+            edit_scripts: bool = False) -> Set[str]:
+        """Set the texts of the trunk revisions by applying the RCS deltas.
+
+        Each text is used (and, if edit_scripts is set, swapped for its edit
+        script unless it is the head) before the next one is made, so only
+        one text is held at a time. Returns the revisions set, which is none
+        of them if the deltas could not be applied.
+        """
+        revisions_by_rev = {}
+        for revision in revisions["deltas"]:
+            revisions_by_rev.setdefault(revision["revision"], revision)
+        applied = set()
+        try:
+            for rev, text, edit_script in iter_rcs_trunk_texts(
+                    rcs, edit_scripts):
+                revision = revisions_by_rev[rev]
+                if (checkout == "verify" and
+                        text != co_pool.checkout(twiki_v_path, rev)):
+                    logger.warning('Rev %s of %s does not match co',
+                                   rev, twiki_v_path)
+                TWikiParser.set_revision_text(revision, text)
+                if edit_script is not None:
+                    del revision["text"]
+                    revision["edit_script"] = edit_script
+                applied.add(rev)
+        except RcsError as error:
+            logger.warning('Could not apply RCS deltas for %s, using co: '
+                           '%s', twiki_v_path, error)
+            for rev in applied:
+                for key in ("text", "meta_strs", "metas", "edit_script"):
+                    revisions_by_rev[rev].pop(key, None)
+            applied = set()
+        return applied
+
+    @staticmethod
+    def prefetch_co(co_pool: Optional[CoPool], twiki_v_path: str,
+                    revs: List[str]) -> None:
+        """Start the co checkouts of revisions (if any)."""
+        if len(revs) == 0:
+            return
+        if co_pool is None:
+            raise RcsError(f"Cannot check out {twiki_v_path} rev {revs[0]} "
+                           "without co")
+        co_pool.prefetch(twiki_v_path, revs)
+
+    @staticmethod
+    def set_revision_text(revision: dict, text: str) -> None:
+        """Set the text of a revision and the METAs found in it."""
+        revision["text"] = text
+        revision["meta_strs"] = TWikiParser.find_twiki_meta_strs(text)
+        revision["metas"] = TWikiParser.parse_twiki_meta_strs(
+            revision["meta_strs"])
@@ -21,43 +21,157 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
-from json import load
-from typing import List
+from os.path import getsize
+from typing import Dict, Iterable, Iterator, List, Optional, Set
 
+from twiki_to_mediawiki_xml.pages_json import load_pages
+from twiki_to_mediawiki_xml.stats import Stats
+from twiki_to_mediawiki_xml.twiki_to_mediawiki_format.formatting import \
+    TwikiToMediaWikiFormatting
 from twiki_to_mediawiki_xml.twiki_to_mediawiki_format.page_names_replace import \
     TwikiToMediaWikiPageNamesReplace  # noqa: E501
 from twiki_to_mediawiki_xml.twiki_to_mediawiki_format.subpages import \
     TwikiToMediaWikiSubpages
 
 
+# pylint: disable=too-many-instance-attributes
 class TWikiToMediaWikiFormat():
     """Convert TWiki to MediaWiki formatting."""
 
-    def __init__(self, twiki_json_path: str, page_names_csv_path: str):
-        """Initialize converting TWiki to MediaWiki formatting."""
+    def __init__(self,  # pylint: disable=too-many-arguments
+                 twiki_json_path: Optional[str],
+                 page_names_csv_path: str,
+                 twiki_pages: Optional[Iterable[dict]] = None,
+                 jobs: int = 1,
+                 stats: Optional[Stats] = None,
+                 twiki_page_names: Optional[Iterable[dict]] = None):
+        """Initialize converting TWiki to MediaWiki formatting.
+
+        Pages are read from twiki_json_path unless twiki_pages is given. If
+        twiki_page_names (the name and parents of each page, see
+        get_page_names) is also given, the page names are read from it and
+        twiki_pages is only read once. Text formatting uses jobs worker
+        processes. Timings and counters are added to stats (if given).
+        """
         self.twiki_json_path = twiki_json_path
         self.page_names_csv_path = page_names_csv_path
+        self.jobs = jobs
+        self.stats = Stats() if stats is None else stats
 
-        self.twiki_json = None
+        self.twiki_json = twiki_pages
+        self.twiki_page_names = twiki_page_names
         self.mediawiki_pages = None
 
+        self.page_names_replace = None
+        self.subpages_conversion = None
+        self.new_page_names = None
+        self.num_pages = 0
+        self.mediawiki_page_names = None
+
     def run(self) -> None:
         """Run the conversion."""
         # Read JSON
-        with open(self.twiki_json_path, "r", encoding="utf-8") as file_txt:
-            self.twiki_json = load(file_txt)
+        self.twiki_json = list(self.load_twiki_pages())
 
         # replace page names (titles)
-        page_names_replace = TwikiToMediaWikiPageNamesReplace(
-            self.twiki_json,
-            self.page_names_csv_path)
-        page_names_replace.run()
-        self.mediawiki_pages = page_names_replace.get_pages()
+        with self.stats.stage("format.page_names"):
+            page_names_replace = TwikiToMediaWikiPageNamesReplace(
+                self.twiki_json,
+                self.page_names_csv_path)
+            page_names_replace.run()
+            self.mediawiki_pages = page_names_replace.get_pages()
 
         # subpages
-        subpages_conversion = TwikiToMediaWikiSubpages(self.mediawiki_pages)
-        subpages_conversion.run()
-        self.mediawiki_pages = subpages_conversion.get_pages()
+        with self.stats.stage("format.subpages"):
+            subpages_conversion = TwikiToMediaWikiSubpages(
+                self.mediawiki_pages)
+            subpages_conversion.run()
+            self.mediawiki_pages = subpages_conversion.get_pages()
+
+        # text formatting
+        formatting = TwikiToMediaWikiFormatting([], self.jobs)
+        self.stats.set_total("format.text", len(self.mediawiki_pages))
+        self.mediawiki_pages = list(self.stats.iter_pages(
+            "format.text", formatting.iter_pages(self.mediawiki_pages)))
+
+    def iter_mediawiki_pages(self) -> Iterator[dict]:
+        """Run the conversion, yielding pages as they are converted.
+
+        The page names are found first (see find_page_names), then pages
+        are converted as they are read, so only one page at a time is held
+        in memory.
+        """
+        if self.new_page_names is None:
+            self.find_page_names()
+
+        # Convert pages
+        formatting = TwikiToMediaWikiFormatting([], self.jobs)
+        self.stats.set_total("format.text", self.num_pages)
+        yield from self.stats.iter_pages("format.text", formatting.iter_pages(
+            self.rename_pages(self.page_names_replace,
+                              self.subpages_conversion,
+                              self.new_page_names)))
+
+    def find_page_names(self) -> Set[str]:
+        """Find the new names of the pages, returning the set of them.
+
+        The page names and parents are read from twiki_page_names if it was
+        given, otherwise from a first read of the pages.
+        """
+        self.page_names_replace = TwikiToMediaWikiPageNamesReplace(
+            [],
+            self.page_names_csv_path)
+        self.subpages_conversion = TwikiToMediaWikiSubpages([])
+
+        # Find parents with the replaced page names
+        with self.stats.stage("format.page_names"):
+            self.page_names_replace.load_names()
+            replaced_names = []
+            for page_i, page_names in enumerate(self.load_twiki_page_names()):
+                self.page_names_replace.replace_page_names(page_names,
+                                                           warn=False)
+                self.subpages_conversion.add_page(page_i, page_names)
+                replaced_names.append(page_names["page_name"])
+            self.num_pages = len(replaced_names)
+        with self.stats.stage("format.subpages"):
+            self.new_page_names = \
+                self.subpages_conversion.resolve_page_names()
+            for page_i, new_page_name in self.new_page_names.items():
+                replaced_names[page_i] = new_page_name
+            self.mediawiki_page_names = set(replaced_names)
+        return self.mediawiki_page_names
+
+    def rename_pages(self,
+                     page_names_replace: TwikiToMediaWikiPageNamesReplace,
+                     subpages_conversion: TwikiToMediaWikiSubpages,
+                     new_page_names: Dict[int, str]) -> Iterator[dict]:
+        """Read the TWiki pages again, replacing names as they are read."""
+        for page_i, page in enumerate(self.load_twiki_pages()):
+            page_names_replace.replace_page_names(page)
+            if page_i in new_page_names:
+                subpages_conversion.rename_page(page, new_page_names[page_i])
+            yield page
+
+    def load_twiki_page_names(self) -> Iterator[dict]:
+        """Read the names and parents of the TWiki pages."""
+        if self.twiki_page_names is not None:
+            return iter(self.twiki_page_names)
+        return map(self.get_page_names, self.load_twiki_pages())
+
+    def load_twiki_pages(self) -> Iterator[dict]:
+        """Read the TWiki pages, unless they were given."""
+        if self.twiki_json is not None:
+            return iter(self.twiki_json)
+        self.stats.add("bytes_read", getsize(self.twiki_json_path))
+        return load_pages(self.twiki_json_path)
+
+    @staticmethod
+    def get_page_names(page: dict) -> dict:
+        """Copy only the page name and parents of a page."""
+        page_names = {"page_name": page["page_name"], "metas": {}}
+        if "TOPICPARENT" in page["metas"]:
+            page_names["metas"]["TOPICPARENT"] = page["metas"]["TOPICPARENT"]
+        return TwikiToMediaWikiPageNamesReplace.copy_page(page_names)
 
     def get_mediawiki_pages(self) -> List[dict]:
         """Return the converted pages."""
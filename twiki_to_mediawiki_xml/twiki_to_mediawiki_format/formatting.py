@@ -0,0 +1,62 @@
+"""
+formatting.py: TWiki to MediaWiki text formatting of pages.
+
+Created by AB Tech on 2026-10-16.
+This file is part of the https://github.com/ABTech/twiki-to-mediawiki-xml
+
+Copyright (C) 2022-present  AB Tech, Carnegie Mellon University
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from typing import Iterable, Iterator, List
+
+from twiki_to_mediawiki_xml.parallel import imap_ordered, resolve_jobs
+from twiki_to_mediawiki_xml.revision_texts import map_page_texts
+from twiki_to_mediawiki_xml.twiki_to_mediawiki_format.replace_rules import \
+    text_formatting
+
+
+class TwikiToMediaWikiFormatting():
+    """Convert the text of TWiki pages and revisions to Wikitext."""
+
+    def __init__(self, twiki_pages: List[dict], jobs: int = 1):
+        """Initialize text formatting of pages (in-place).
+
+        With more than one job, pages are formatted in a process pool one
+        page per task, since every revision of a page is converted.
+        """
+        self.mediawiki_pages = list(twiki_pages)
+        self.jobs = resolve_jobs(jobs)
+
+    def run(self) -> None:
+        """Run the text formatting."""
+        self.mediawiki_pages = list(self.iter_pages(self.mediawiki_pages))
+
+    def iter_pages(self, pages: Iterable[dict]) -> Iterator[dict]:
+        """Format pages, yielding them in order."""
+        if self.jobs > 1:
+            return imap_ordered(self.format_page, pages, self.jobs,
+                                chunksize=1)
+        return map(self.format_page, pages)
+
+    @staticmethod
+    def format_page(page: dict) -> dict:
+        """Format the text and revision texts of a page."""
+        map_page_texts(page, text_formatting)
+        return page
+
+    def get_pages(self) -> List[dict]:
+        """Return the formatted pages."""
+        return self.mediawiki_pages
@@ -21,7 +21,6 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
-from copy import deepcopy
 from csv import reader
 from logging import getLogger
 from typing import List
@@ -32,46 +31,74 @@ logger = getLogger(__name__)
 class TwikiToMediaWikiPageNamesReplace():
     """Replace TWiki style page names with MediaWiki style page names."""
 
-    def __init__(self, twiki_pages: List[dict], names_path: dict):
-        """Initialize conversion to MediaWiki page names."""
+    def __init__(self, twiki_pages: List[dict], names_path: dict,
+                 copy_pages: bool = False):
+        """Initialize conversion to MediaWiki page names.
+
+        Pages are renamed in-place unless copy_pages is set, in which case
+        only the parts of each page that are changed are copied.
+        """
         self.names_path = names_path
-        self.mediawiki_pages = deepcopy(twiki_pages)
+        if copy_pages:
+            self.mediawiki_pages = [self.copy_page(page)
+                                    for page in twiki_pages]
+        else:
+            self.mediawiki_pages = list(twiki_pages)
 
         self.names = {}
 
     def run(self) -> None:
         """Run the page name replacement."""
+        self.load_names()
+        for page in self.mediawiki_pages:
+            self.replace_page_names(page)
+
+    def load_names(self) -> None:
+        """Load the page name replacements."""
         with open(self.names_path, "r", encoding="utf-8") as file_names:
             key_values = list(reader(file_names))
             for key_value in key_values:
                 key, value = key_value[0], key_value[1]
                 self.names[key] = value
 
-        for page in self.mediawiki_pages:
-            page_name = page["page_name"]
-            if page_name not in self.names:
+    def replace_page_names(self, page: dict, warn: bool = True) -> None:
+        """Replace the name and parent name of a single page in-place."""
+        page_name = page["page_name"]
+        if page_name not in self.names:
+            if warn:
                 logger.warning(
                     'Missing page name replacement for %s', page_name)
-            else:
-                new_page_name = self.names[page_name]
-                if new_page_name != page_name:
-                    page["old_page_name"] = page_name
-                    page["page_name"] = new_page_name
-
-            # And topic parent
-            if "TOPICPARENT" in page["metas"]:
-                for parent in page["metas"]["TOPICPARENT"]:
-                    old_parent_name = parent["name"]
-                    if old_parent_name not in self.names:
+        else:
+            new_page_name = self.names[page_name]
+            if new_page_name != page_name:
+                page["old_page_name"] = page_name
+                page["page_name"] = new_page_name
+
+        # And topic parent
+        if "TOPICPARENT" in page["metas"]:
+            for parent in page["metas"]["TOPICPARENT"]:
+                old_parent_name = parent["name"]
+                if old_parent_name not in self.names:
+                    if warn:
                         logger.warning(
                             'Missing parent page name replacement %s',
                             old_parent_name)
-                    else:
-                        new_parent_name = self.names[old_parent_name]
-                        if new_parent_name != old_parent_name:
-                            parent["old_name"] = old_parent_name
-                            parent["name"] = new_parent_name
+                else:
+                    new_parent_name = self.names[old_parent_name]
+                    if new_parent_name != old_parent_name:
+                        parent["old_name"] = old_parent_name
+                        parent["name"] = new_parent_name
 
     def get_pages(self) -> List[dict]:
         """Return the converted pages."""
         return self.mediawiki_pages
+
+    @staticmethod
+    def copy_page(page: dict) -> dict:
+        """Copy a page deep enough to rename it and its parents."""
+        page = dict(page)
+        if "TOPICPARENT" in page["metas"]:
+            page["metas"] = dict(page["metas"])
+            page["metas"]["TOPICPARENT"] = [
+                dict(parent) for parent in page["metas"]["TOPICPARENT"]]
+        return page
@@ -34,26 +34,97 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 # obvious how they translate to Python (I don't know PCRE). These should be
 # tested. -pnaseck
 
-from re import sub
+# The Perl script applies its rules to one line at a time. Here the rules
+# are compiled once and applied to the whole text: a few inline passes for
+# markup, images and emphasis, then one pass over the start of every line
+# for headings, bullets, numbering, definitions and anchors. Lines are
+# classified by their indent (three spaces or one tab per level) instead of
+# having a rule for every level.
 
+from re import MULTILINE, Match
+from re import compile as re_compile
 
-def text_formatting(to_convert: str):
-    """Convert TWiki page content to Wikitext."""
-    # pylint: disable=line-too-long
-
-    out = to_convert
-
-    # LatexModePlugin -> Extension:Math
-    out = sub(r'%\$(.*?)\$%', r"<math>$1<\/math>", out)
+# pylint: disable=line-too-long
+# The leading lookaheads let the regex engine skip to the characters a rule
+# can start with instead of trying every alternative at every position.
+MARKUP_RULE = re_compile(
+    r'(?=[%<!])'
+    r'(?:%\$(?P<math>.*?)\$%'  # LatexModePlugin -> Extension:Math
+    r'|<(?P<dot>/?)dot>'  # DirectedGraphPlugin -> Extension:GraphViz
+    r'|<(?P<verbatim>/?)verbatim>'  # <verbatim>
+    r'|(?P<nop><nop>|!(?=[A-Z]\w+?[A-Z])))')  # remove <nop> and ! in front of Twiki words  # noqa: E501
+
+IMAGE_RULE = re_compile(r'<img .*?src="Media:(.+?)".*?/>')  # inline images
+IMAGE_LINK_RULES = (
+    re_compile(r'\[\[\s*(.+?)\s*\|\s*\[\[File:(.*?)\]\]\s*\]\]'),  # external links around images  # noqa: E501
+    re_compile(r'\[\s*(.+?)\s+\[\[File:(.*?)\]\]\s*\]'),  # internal links around images  # noqa: E501
+)
+
+EMPHASIS_RULE = re_compile(
+    r'(?=[*_=])(?<![^\s(])'  # at the start of a line or after a space or (
+    r'(?:\*(?P<bold>\S+?|\S[^\n]*?\S)\*'
+    r'|__(?P<bold_italic>\S+?|\S[^\n]*?\S)__'
+    r'|_(?P<italic>\S+?|\S[^\n]*?\S)_'
+    r'|==(?P<bold_fixed>\S+?|\S[^\n]*?\S)=='
+    r'|=(?P<fixed>\S+?|\S[^\n]*?\S)=)'
+    r'(?=$|[\s).,:;!?])', MULTILINE)
+EMPHASIS_MARKUP = {
+    "bold": ("'''", "'''"),
+    "bold_italic": ("'''''", "'''''"),
+    "italic": ("''", "''"),
+    "bold_fixed": ("'''<tt>", "</tt>'''"),
+    "fixed": ("<tt>", "</tt>"),
+}
+
+LINE_RULE = re_compile(
+    r'^(?:---(?P<heading>\+{1,6})(?P<title>[^\n\r]*)'  # ---+ H1 to ---++++++ H6  # noqa: E501
+    r'|(?P<indent>(?:[ ]{3})+|\t+)'
+    r'(?:(?P<bullet>\*)[ ]|(?P<number>[0-9]\.?)[ ]|\$[ ](?P<term>[^:\n]*))'
+    r'|[ \t]*#(?P<anchor>\S+)[ \t\r]*$)', MULTILINE)
+# pylint: enable=line-too-long
+
+
+def replace_markup(match: Match) -> str:
+    """Replace TWiki plugin and escaping markup."""
+    if match.lastgroup == "math":
+        return f"<math>{match['math']}</math>"
+    if match.lastgroup == "dot":
+        return f"<{match['dot']}graphviz>"
+    if match.lastgroup == "verbatim":
+        return f"<{match['verbatim']}pre>"
+    return ""
+
+
+def replace_emphasis(match: Match) -> str:
+    """Replace TWiki bold, italic and monospaced text."""
+    start, end = EMPHASIS_MARKUP[match.lastgroup]
+    return f"{start}{match[match.lastgroup]}{end}"
+
+
+def replace_line(match: Match) -> str:
+    """Replace the start of a TWiki heading, list, definition or anchor."""
+    if match["heading"] is not None:
+        level = "=" * len(match["heading"])
+        return f"{level}{match['title']} {level}"
+    if match["anchor"] is not None:
+        return f'<div id="{match["anchor"]}"></div>'
+    indent = match["indent"]
+    depth = len(indent) if indent[0] == "\t" else len(indent) // 3
+    if match["bullet"] is not None:
+        return f"{'*' * depth} "
+    if match["number"] is not None:
+        return f"{'#' * depth} "
+    if depth > 1:
+        return match[0]
+    # There must be a better MW convention
+    return f"; {match['term']} "
 
-    # DirectedGraphPlugin -> Extension:GraphViz
-    out = sub(r'<(\/?)dot>', r"<$1graphviz>", out)
 
-    # <verbatim>
-    out = sub(r'<(\/?)verbatim>', r"<$1pre>", out)
+def text_formatting(to_convert: str) -> str:
+    """Convert TWiki page content to Wikitext."""
+    # pylint: disable=line-too-long
 
-    # Anchors
-    out = sub(r'^\s*#(\S+)\s*$', r'<div id="<nop>$1"><\/div>', out)  # replace anchors with empty div's  # noqa: E501
+    out = MARKUP_RULE.sub(replace_markup, to_convert)
 
     # Interwikis
     # q#s/\[\[$iwSitePattern:$iwPagePattern\]\]/makeLink("$1:$2")/ge#,
@@ -70,70 +141,20 @@ def text_formatting(to_convert: str):
     # WikiWords
     # out = sub(r'$web\.([A-Z][${man}]*)', r"makeLink($1)", out)  # $web.WikiWord -> link  # noqa: E501
     # out = sub(r'([A-Z][${man}]*)\.($wwPattern)', r"<nop>$1.<nop>$2", out)  # OtherWebName.WikiWord -> <nop>OtherWebName.<nop>WikiWord  # noqa: E501
-    out = sub(r'<nop>([A-Z]{1}\w+?[A-Z]{1})', r"!$1", out)  # change <nop> to ! in front of Twiki words.  # noqa: E501
     # out = sub(r'(?:^|(?<=[\s\(]))($wwPattern)', r"makeLink($1,spaceWikiWord($1))", out)  # WikiWord -> link  # noqa: E501
-    out = sub(r'!([A-Z]{1}\w+?[A-Z]{1})', r"$1", out)  # remove ! in front of Twiki words.  # noqa: E501
-    out = sub(r'<nop>', r"", out)  # remove <nop>
 
     # Images (attachments only) and links wrapped around images
-    out = sub(r'<img .*?src="Media:(.+?)".*?\/>', r"[[File:$1]]", out)  # inline images  # noqa: E501
-    out = sub(r'\[\[\s*(.+?)\s*\|\s*\[\[File:(.*?)\]\]\s*\]\]', r"[[File:$2|link=$1]]", out)  # external links around images  # noqa: E501
-    out = sub(r'\[\s*(.+?)\s+\[\[File:(.*?)\]\]\s*\]', r"[[File:$2|link=$1]]", out)  # internal links around images  # noqa: E501
-
-    # Formatting
-    out = sub(r'(^|[\s\(])\*(\S+?|\S[^\n]*?\S)\*($|(?=[\s\)\.\,\:\;\!\?]))', r"\1'''\2'''", out)  # bold  # noqa: E501
-    out = sub(r'(^|[\s\(])\_\_(\S+?|\S[^\n]*?\S)\_\_($|(?=[\s\)\.\,\:\;\!\?]))', r"\1'''''\2'''''", out)  # italic bold  # noqa: E501
-    out = sub(r'(^|[\s\(])\_(\S+?|\S[^\n]*?\S)\_($|(?=[\s\)\.\,\:\;\!\?]))', r"\1''\2''", out)  # italic  # noqa: E501
-    out = sub(r'/(^|[\s\(])==(\S+?|\S[^\n]*?\S)==($|(?=[\s\)\.\,\:\;\!\?]))', r"1'''<tt>\2<\/tt>'''", out)  # monospaced bold  # noqa: E501
-    out = sub(r'/(^|[\s\(])=(\S+?|\S[^\n]*?\S)=($|(?=[\s\)\.\,\:\;\!\?]))', r"\1<tt>\2<\/tt>", out)  # monospaced  # noqa: E501
-    out = sub(r'/(^|[\n\r])---\+\+\+\+\+\+([^\n\r]*)', r"\1======\2 ======", out)  # H6  # noqa: E501
-    out = sub(r'/(^|[\n\r])---\+\+\+\+\+([^\n\r]*)', r"\1=====\2 =====", out)  # H5  # noqa: E501
-    out = sub(r'/(^|[\n\r])---\+\+\+\+([^\n\r]*)', r"\1====\2 ====", out)  # H4
-    out = sub(r'/(^|[\n\r])---\+\+\+([^\n\r]*)', r"\1===\2 ===", out)  # H3
-    out = sub(r'/(^|[\n\r])---\+\+([^\n\r]*)', r"\1==\2 ==", out)  # H2
-    out = sub(r'/(^|[\n\r])---\+([^\n\r]*)', r"\1=\2 =", out)  # H1
-
-    # Bullets
-    out = sub(r'(^|[\n\r])[ ]{3}\* ', r"$1\* ", out)  # level 1 bullet
-    out = sub(r'(^|[\n\r])[\t]{1}\* ', r"$1\* ", out)  # level 1 bullet: Handle single tabs (from twiki .txt files)  # noqa: E501
-    out = sub(r'(^|[\n\r])[ ]{6}\* ', r"$1\*\* ", out)  # level 2 bullet
-    out = sub(r'(^|[\n\r])[\t]{2}\* ', r"$1\*\* ", out)  # level 1 bullet: Handle double tabs  # noqa: E501
-    out = sub(r'(^|[\n\r])[ ]{9}\* ', r"$1\*\*\* ", out)  # level 3 bullet
-    out = sub(r'(^|[\n\r])[\t]{3}\* ', r"$1\*\*\* ", out)  # level 3 bullet: Handle tabbed version  # noqa: E501
-    out = sub(r'(^|[\n\r])[ ]{12}\* ', r"$1\*\*\*\* ", out)  # level 4 bullet
-    out = sub(r'(^|[\n\r])[ ]{15}\* ', r"$1\*\*\*\*\* ", out)  # level 5 bullet
-    out = sub(r'(^|[\n\r])[ ]{18}\* ', r"$1\*\*\*\*\*\* ", out)  # level 6 bullet  # noqa: E501
-    out = sub(r'(^|[\n\r])[ ]{21}\* ', r"$1\*\*\*\*\*\*\* ", out)  # level 7 bullet  # noqa: E501
-    out = sub(r'(^|[\n\r])[ ]{24}\* ', r"$1\*\*\*\*\*\*\*\* ", out)  # level 8 bullet  # noqa: E501
-    out = sub(r'(^|[\n\r])[ ]{27}\* ', r"$1\*\*\*\*\*\*\*\*\* ", out)  # level 9 bullet  # noqa: E501
-    out = sub(r'(^|[\n\r])[ ]{30}\* ', r"$1\*\*\*\*\*\*\*\*\*\* ", out)  # level 10 bullet  # noqa: E501
-
-    # Numbering
-    out = sub(r'(^|[\n\r])[ ]{3}[0-9]\.? ', r"$1\# ", out)  # level 1 bullet
-    out = sub(r'(^|[\n\r])[\t]{1}[0-9]\.? ', r"$1\# ", out)  # level 1 bullet: handle 1 tab  # noqa: E501
-    out = sub(r'(^|[\n\r])[ ]{6}[0-9]\.? ', r"$1\#\# ", out)  # level 2 bullet
-    out = sub(r'(^|[\n\r])[\t]{2}[0-9]\.? ', r"$1\#\# ", out)  # level 2 bullet: handle 2 tabs  # noqa: E501
-    out = sub(r'(^|[\n\r])[ ]{9}[0-9]\.? ', r"$1\#\#\# ", out)  # level 3 bullet  # noqa: E501
-    out = sub(r'(^|[\n\r])[\t]{3}[0-9]\.? ', r"$1\#\#\# ", out)  # level 3 bullet: handle 3 tabs  # noqa: E501
-    out = sub(r'(^|[\n\r])[ ]{12}[0-9]\.? ', r"$1\#\#\#\# ", out)  # level 4 bullet  # noqa: E501
-    out = sub(r'(^|[\n\r])[ ]{15}[0-9]\.? ', r"$1\#\#\#\#\# ", out)  # level 5 bullet  # noqa: E501
-    out = sub(r'(^|[\n\r])[ ]{18}[0-9]\.? ', r"$1\#\#\#\#\#\# ", out)  # level 6 bullet  # noqa: E501
-    out = sub(r'(^|[\n\r])[ ]{21}[0-9]\.? ', r"$1\#\#\#\#\#\#\# ", out)  # level 7 bullet  # noqa: E501
-    out = sub(r'(^|[\n\r])[ ]{24}[0-9]\.? ', r"$1\#\#\#\#\#\#\#\# ", out)  # level 8 bullet  # noqa: E501
-    out = sub(r'(^|[\n\r])[ ]{27}[0-9]\.? ', r"$1\#\#\#\#\#\#\#\#\# ", out)  # level 9 bullet  # noqa: E501
-    out = sub(r'(^|[\n\r])[ ]{30}[0-9]\.? ', r"$1\#\#\#\#\#\#\#\#\#\# ", out)  # level 10 bullet  # noqa: E501
-
-    # Definitions
-    # There must be a better MW convention
-    out = sub(r'(^|[\n\r])[ ]{3}\$ ([^\:]*)', r"$1\; $2 ", out)  # $ definition: term  # noqa: E501
+    if "<img " in out:
+        out = IMAGE_RULE.sub(r"[[File:\1]]", out)
+    if "[[File:" in out:
+        for rule in IMAGE_LINK_RULES:
+            out = rule.sub(r"[[File:\2|link=\1]]", out)
+
+    out = EMPHASIS_RULE.sub(replace_emphasis, out)
+    out = LINE_RULE.sub(replace_line, out)
 
     # Lookup variable
     # q#s/%$varPattern%/getTwikiVar($1,'')/ge#,
     # q#s/%$varPattern(\{.*?\})%/getTwikiVar($1,$2)/ge#
 
     return out
-
-
-# pylint: disable=line-too-long
-TEST = "This is normal.<br /><br />This is a new paragraph.<br /><br />This text is normal. *This text is bolded.* _This text is italicized. *This text is both.* *This text is also both.**_ <u>This text is underlined. *This text is bold & underlined. <i>This text is ital and underlined. <b>This is all three!</b></i></u><br /><br /><br /><b>This is bold</b><br /><br /><b>This is still bold.</b><br /><br /><br />OK"  # noqa: E501
-print(text_formatting(TEST))
@@ -21,9 +21,8 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
-from copy import deepcopy
 from logging import getLogger
-from typing import List
+from typing import Dict, List
 
 logger = getLogger(__name__)
 
@@ -31,47 +30,96 @@ logger = getLogger(__name__)
 class TwikiToMediaWikiSubpages():
     """Convert TWiki parents to MediaWiki subpages."""
 
-    def __init__(self, twiki_pages: List[dict]):
-        """Initialize conversion to MediaWiki subpages."""
-        self.mediawiki_pages = deepcopy(twiki_pages)
+    def __init__(self, twiki_pages: List[dict], copy_pages: bool = False):
+        """Initialize conversion to MediaWiki subpages.
+
+        Pages are renamed in-place unless copy_pages is set, in which case
+        each page is shallow copied (only its names are changed).
+        """
+        if copy_pages:
+            self.mediawiki_pages = [dict(page) for page in twiki_pages]
+        else:
+            self.mediawiki_pages = list(twiki_pages)
+
+        self.children = {}
+        self.children_by_index = {}
 
     def run(self) -> None:
         """Run the subpage conversion."""
-        children = {}
-        children_by_index = {}
         for page_i, page in enumerate(self.mediawiki_pages):
-            if ("TOPICPARENT" in page["metas"] and
-                    len(page["metas"]["TOPICPARENT"]) > 0):
-                if len(page["metas"]["TOPICPARENT"]) > 1:
-                    logger.warning('Page %s has multiple TOPICPARENT, using '
-                                   'first one.', page["page_name"])
-                parent_name = page["metas"]["TOPICPARENT"][0]["name"]
-                if "." in parent_name:
-                    parent_name = parent_name.split(".")[1]
-                page_name = page["page_name"]
-                if page_name == parent_name:
-                    logger.warning("Ignoring parent topic of same name for %s",
-                                   parent_name)
-                elif page_name.startswith("User:"):
-                    logger.warning("Ignoring parent topic of %s for %s since "
-                                   "it is a user page",
-                                   parent_name, page_name)
-                elif parent_name != 'WebHome':
-                    children[page_name] = parent_name
-                    children_by_index[page_name] = page_i
-        for child_name, parent_name in children.items():
-            reverse_path = [child_name, parent_name]
-            next_parent = parent_name
-            while next_parent in children:
-                next_parent = children[next_parent]
-                reverse_path.append(next_parent)
-            names_path = reverse_path[::-1]
-            new_page_name = self.page_to_subpage(names_path)
-            page = self.mediawiki_pages[children_by_index[child_name]]
-            if "old_page_name" not in page:
-                # If page was not already renamed, this is now a rename
-                page["old_page_name"] = page["page_name"]
-            page["page_name"] = new_page_name
+            self.add_page(page_i, page)
+        for page_i, new_page_name in self.resolve_page_names().items():
+            self.rename_page(self.mediawiki_pages[page_i], new_page_name)
+
+    def add_page(self, page_i: int, page: dict) -> None:
+        """Record the parent of the page at index page_i."""
+        if ("TOPICPARENT" in page["metas"] and
+                len(page["metas"]["TOPICPARENT"]) > 0):
+            if len(page["metas"]["TOPICPARENT"]) > 1:
+                logger.warning('Page %s has multiple TOPICPARENT, using '
+                               'first one.', page["page_name"])
+            parent_name = page["metas"]["TOPICPARENT"][0]["name"]
+            if "." in parent_name:
+                parent_name = parent_name.split(".")[1]
+            page_name = page["page_name"]
+            if page_name == parent_name:
+                logger.warning("Ignoring parent topic of same name for %s",
+                               parent_name)
+            elif page_name.startswith("User:"):
+                logger.warning("Ignoring parent topic of %s for %s since "
+                               "it is a user page",
+                               parent_name, page_name)
+            elif parent_name != 'WebHome':
+                self.children[page_name] = parent_name
+                self.children_by_index[page_name] = page_i
+
+    def resolve_page_names(self) -> Dict[int, str]:
+        """Return the new subpage names of added pages by index.
+
+        Each name is made once from its parent's, so this takes linear time
+        however deep the parents go. A TOPICPARENT cycle is broken (and
+        logged) by ignoring the parent of the first page found again.
+        """
+        subpage_names = {}
+        for child_name in list(self.children):
+            self.resolve_subpage_name(child_name, subpage_names)
+        return {self.children_by_index[child_name]: subpage_names[child_name]
+                for child_name in self.children}
+
+    def resolve_subpage_name(self, page_name: str,
+                             subpage_names: Dict[str, str]) -> None:
+        """Add the subpage names of a page and its unresolved ancestors."""
+        # Walk up to a resolved page, a page without a parent or a cycle
+        path = []
+        on_path = set()
+        name = page_name
+        while name in self.children and name not in subpage_names:
+            if name in on_path:
+                cycle = path[path.index(name):] + [name]
+                logger.warning("Ignoring parent topic %s of %s to break the "
+                               "TOPICPARENT cycle %s", self.children[name],
+                               name, " -> ".join(cycle))
+                del self.children[name]
+                break
+            path.append(name)
+            on_path.add(name)
+            name = self.children[name]
+
+        # Name each page on the way back down after its parent
+        for child_name in reversed(path):
+            if child_name in self.children:
+                parent_name = self.children[child_name]
+                subpage_names[child_name] = self.page_to_subpage(
+                    [subpage_names.get(parent_name, parent_name),
+                     child_name])
+
+    @staticmethod
+    def rename_page(page: dict, new_page_name: str) -> None:
+        """Rename a page to its subpage name in-place."""
+        if "old_page_name" not in page:
+            # If page was not already renamed, this is now a rename
+            page["old_page_name"] = page["page_name"]
+        page["page_name"] = new_page_name
 
     def get_pages(self) -> List[dict]:
         """Return the converted pages."""
@@ -0,0 +1,202 @@
+"""
+validation.py: Validate parsed TWiki pages.
+
+Created by AB Tech on 2026-10-16.
+This file is part of the https://github.com/ABTech/twiki-to-mediawiki-xml
+
+Copyright (C) 2022-present  AB Tech, Carnegie Mellon University
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# Checks are functions that take a parsed page and yield findings, a dict
+# with a category, page, revision (or None) and message. They are registered
+# with a level: fast checks only look at the page and the revision list,
+# full checks also look at the metas of every revision and compare the head
+# revision's metas with DeepDiff. Other checks can be added with
+# register_check. DeepDiff is slow to import and only needed when a head
+# revision's text differs from the .txt file, so it is imported when used.
+
+from collections import Counter
+from csv import DictWriter
+from functools import partial
+from json import dumps
+from typing import Callable, Iterable, Iterator, List, Optional, TextIO
+
+from twiki_to_mediawiki_xml.parallel import imap_ordered, resolve_jobs
+from twiki_to_mediawiki_xml.revision_texts import (get_revision_text,
+                                                   get_twiki_txt)
+
+VALIDATE_LEVELS = ("off", "fast", "full")
+REPORT_FORMATS = ("json", "csv")
+REPORT_FIELDS = ("category", "page", "revision", "message")
+
+CHECKS: List[tuple] = []
+
+
+def register_check(level: str) -> Callable:
+    """Register a check to run at a validation level (fast or full)."""
+    if level not in VALIDATE_LEVELS[1:]:
+        raise ValueError(f"Unknown validation level {level}")
+
+    def register(check: Callable[[dict], Iterator[dict]]) -> Callable:
+        CHECKS.append((level, check))
+        return check
+    return register
+
+
+def make_finding(category: str, page: dict, revision: Optional[str],
+                 msg: str, *args) -> dict:
+    """Make a finding, formatting msg with args like logging."""
+    return {
+        "category": category,
+        "page": page["page_name"],
+        "revision": revision,
+        "message": msg % args,
+    }
+
+
+def check_metas(page: dict, metas: dict,
+                rev: Optional[str] = None) -> Iterator[dict]:
+    """Check parsed TWiki META data."""
+    page_name = page["page_name"]
+    if "TOPICINFO" not in metas:
+        yield make_finding("topicinfo_missing", page, rev,
+                           'META TOPICINFO missing for %s rev %s',
+                           page_name, rev)
+    elif len(metas["TOPICINFO"]) > 1:
+        yield make_finding("topicinfo_multiple", page, rev,
+                           'Multiple META TOPICINFO for %s rev %s',
+                           page_name, rev)
+    for meta, vals in metas.items():
+        for val in vals:
+            if len(val) == 0:
+                yield make_finding("meta_empty", page, rev,
+                                   'A META %s is empty for %s rev %s',
+                                   meta, page_name, rev)
+
+
+@register_check("fast")
+def check_page_metas(page: dict) -> Iterator[dict]:
+    """Check the META data of the current page."""
+    yield from check_metas(page, page["metas"])
+
+
+@register_check("fast")
+def check_revision_list(page: dict) -> Iterator[dict]:
+    """Check for branches, duplicate revisions and the head text."""
+    if "revisions" not in page:
+        return
+    page_name = page["page_name"]
+    revisions = page["revisions"]
+
+    # Check head is not on branch
+    if revisions["branch"] is not None:
+        yield make_finding("revisions_on_branch", page, None,
+                           'Revisions on branch for %s', page_name)
+
+    revision_counts = Counter(revision["revision"]
+                              for revision in revisions["deltas"])
+    for revision in revisions["deltas"]:
+        rev = revision["revision"]
+
+        # Check latest revision matches txt
+        if (revisions["head"] == rev and
+                get_twiki_txt(page) != get_revision_text(page, revision)):
+            yield make_finding(
+                "head_txt_mismatch", page, rev,
+                'Head rev (%s) txt not equal to current data for %s',
+                rev, page_name)
+
+        # Check for current branch
+        if len(revision["branches"]) > 0:
+            yield make_finding("revision_branches", page, rev,
+                               'Revision %s has branches for %s',
+                               rev, page_name)
+
+        # Check for duplicates
+        if revision_counts[rev] > 1:
+            yield make_finding("duplicate_revision", page, rev,
+                               'Duplicate revision %s for %s', rev, page_name)
+
+
+@register_check("full")
+def check_revision_metas(page: dict) -> Iterator[dict]:
+    """Check the META data of every revision against the current page."""
+    if "revisions" not in page:
+        return
+    page_name = page["page_name"]
+    revisions = page["revisions"]
+    for revision in revisions["deltas"]:
+        rev = revision["revision"]
+        yield from check_metas(page, revision["metas"], rev)
+
+        # Check latest revision matches metas (only needed if the texts
+        # differ, since the metas are parsed from them)
+        if (revisions["head"] == rev and
+                get_twiki_txt(page) != get_revision_text(page, revision)):
+            # pylint: disable=import-outside-toplevel
+            from deepdiff import DeepDiff
+            if len(DeepDiff(page["metas"], revision["metas"])) > 0:
+                yield make_finding(
+                    "head_metas_mismatch", page, rev,
+                    'Head rev (%s) metas not equal to current data for %s',
+                    rev, page_name)
+
+
+class TWikiValidator():
+    """Validate parsed TWiki pages."""
+
+    def __init__(self, level: str = "full", jobs: int = 1):
+        """Initialize validation at a level (off, fast or full)."""
+        if level not in VALIDATE_LEVELS:
+            raise ValueError(f"Unknown validation level {level}")
+        self.level = level
+        self.jobs = resolve_jobs(jobs)
+
+    def iter_findings(self, pages: Iterable[dict]) -> Iterator[dict]:
+        """Validate pages, yielding findings in page order."""
+        validate_page = partial(self.validate_page, level=self.level)
+        if self.jobs > 1:
+            page_findings = imap_ordered(validate_page, pages, self.jobs)
+        else:
+            page_findings = map(validate_page, pages)
+        for findings in page_findings:
+            yield from findings
+
+    @staticmethod
+    def validate_page(page: dict, level: str = "full") -> List[dict]:
+        """Run the checks of a level (and the levels below) on a page."""
+        if level == "off":
+            return []
+        levels = VALIDATE_LEVELS[1:VALIDATE_LEVELS.index(level) + 1]
+        findings = []
+        for check_level, check in CHECKS:
+            if check_level in levels:
+                findings.extend(check(page))
+        return findings
+
+
+def dump_report(findings: Iterable[dict], out_file: TextIO,
+                report_format: str = "json") -> None:
+    """Write findings to a file as JSON or CSV."""
+    if report_format == "csv":
+        writer = DictWriter(out_file, fieldnames=REPORT_FIELDS)
+        writer.writeheader()
+        writer.writerows(findings)
+    elif report_format == "json":
+        out_file.write(dumps(list(findings), indent=4))
+        out_file.write("\n")
+    else:
+        raise ValueError(f"Unknown report format {report_format}")